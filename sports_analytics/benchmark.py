@@ -0,0 +1,799 @@
+"""
+Micro-benchmarks for the feature / prediction pipeline.
+
+Usage:
+    python benchmark.py                 # run every benchmark
+    python benchmark.py team_long       # run only one of them
+
+Each benchmark builds a synthetic multi-league, multi-season match table
+(no API token needed), times the current implementation against the old
+one and checks that both give the same output.
+"""
+
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from math import exp, factorial
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+from src.features import (
+    FORM_FEATURES,
+    build_match_feature_table,
+    prepare_base_matches,
+    select_feature_window,
+    _build_team_long,
+    _add_rolling_form_features,
+)
+from src.advanced_model import build_dataset
+from src.team_registry import TeamRegistry, compact_feature_table
+from src.serving_index import FeatureIndex
+from src.xg_utils import (
+    build_xg_context_from_feature_df,
+    calibrate_goal_expectancy,
+    calibrate_goal_expectancy_batch,
+    compute_match_lambdas,
+    compute_match_lambdas_batch,
+    match_outcome_probabilities_batch,
+    poisson_outcome_probs_batch,
+)
+from src.markets import ScoreGridCache, scoreline_markets
+from src.football_data_api import (
+    AsyncFootballDataClient,
+    FootballDataClient,
+    TokenBucket,
+    _build_headers,
+    fetch_competition_matches_df,
+    fetch_competition_matches_df_async,
+    fetch_competition_matches_many,
+    matches_json_to_df,
+)
+from src.http_cache import ResponseCache
+from src.model_artifacts import FlatForest, current_rss_mb, export_flat_forest
+from src.schedule_cache import ScheduleCache
+
+
+# -------------------------------------------------------------------------
+# Synthetic data
+# -------------------------------------------------------------------------
+
+
+def make_synthetic_matches(
+    n_leagues: int = 4,
+    n_seasons: int = 8,
+    n_teams: int = 20,
+    seed: int = 42,
+) -> pd.DataFrame:
+    """
+    Double round-robin seasons for several leagues.
+    Defaults give 4 * 8 * 380 = 12160 finished matches.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+
+    for league in range(n_leagues):
+        teams = [f"L{league} Team {t:02d}" for t in range(n_teams)]
+        for season in range(n_seasons):
+            start = pd.Timestamp(f"{2015 + season}-08-01", tz="UTC")
+            fixtures = [(h, a) for h in teams for a in teams if h != a]
+            rng.shuffle(fixtures)
+            for i, (home, away) in enumerate(fixtures):
+                rows.append(
+                    {
+                        "date": start + pd.Timedelta(hours=6 * i),
+                        "league": f"L{league}",
+                        "home_team": home,
+                        "away_team": away,
+                        "home_goals": int(rng.poisson(1.5)),
+                        "away_goals": int(rng.poisson(1.1)),
+                        "status": "FINISHED",
+                        "season": 2015 + season,
+                    }
+                )
+
+    return pd.DataFrame(rows)
+
+
+def _timeit(fn: Callable, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _report(name: str, old_s: float, new_s: float) -> None:
+    print(
+        f"{name:<32} old={old_s * 1000:9.1f} ms  new={new_s * 1000:9.1f} ms  "
+        f"speedup={old_s / new_s:6.1f}x"
+    )
+
+
+# -------------------------------------------------------------------------
+# Reference (pre-optimization) implementations
+# -------------------------------------------------------------------------
+
+
+def _legacy_build_team_long(df: pd.DataFrame) -> pd.DataFrame:
+    rows = []
+    for idx, row in df.iterrows():
+        rows.append(
+            {
+                "match_idx": idx,
+                "date": row["date"],
+                "team": row["home_team"],
+                "is_home": 1,
+                "goals_for": row["home_goals"],
+                "goals_against": row["away_goals"],
+                "result": 1 if row["home_goals"] > row["away_goals"] else (0 if row["home_goals"] == row["away_goals"] else -1),
+            }
+        )
+        rows.append(
+            {
+                "match_idx": idx,
+                "date": row["date"],
+                "team": row["away_team"],
+                "is_home": 0,
+                "goals_for": row["away_goals"],
+                "goals_against": row["home_goals"],
+                "result": 1 if row["away_goals"] > row["home_goals"] else (0 if row["away_goals"] == row["home_goals"] else -1),
+            }
+        )
+    team_df = pd.DataFrame(rows)
+    return team_df.sort_values(["team", "date"]).reset_index(drop=True)
+
+
+def _legacy_add_rolling_form_features(team_df: pd.DataFrame, n_games: int = 5) -> pd.DataFrame:
+    def _weighted_avg_points(x: np.ndarray) -> float:
+        n = len(x)
+        if n == 0:
+            return 0.0
+        weights = np.arange(1, n + 1, dtype=float)
+        return float((x * weights).sum() / weights.sum())
+
+    def _apply_group(g: pd.DataFrame) -> pd.DataFrame:
+        g = g.sort_values("date")
+        g["goals_for_avg"] = g["goals_for"].shift(1).rolling(n_games, min_periods=1).mean()
+        g["goals_against_avg"] = g["goals_against"].shift(1).rolling(n_games, min_periods=1).mean()
+        g["goal_diff_avg"] = (g["goals_for"] - g["goals_against"]).shift(1).rolling(n_games, min_periods=1).mean()
+        g["win_rate"] = g["result"].shift(1).eq(1).rolling(n_games, min_periods=1).mean()
+        g["points"] = g["result"].map({1: 3, 0: 1, -1: 0})
+        g["points_avg"] = g["points"].shift(1).rolling(n_games, min_periods=1).mean()
+        g["momentum"] = g["points"].shift(1).rolling(n_games, min_periods=1).sum()
+        g["clean_sheet_rate"] = g["goals_against"].shift(1).eq(0).rolling(n_games, min_periods=1).mean()
+        g["conceded_avg"] = g["goals_against"].shift(1).rolling(n_games, min_periods=1).mean()
+        g["weighted_points"] = (
+            g["points"].shift(1).rolling(n_games, min_periods=1).apply(_weighted_avg_points, raw=True)
+        )
+        return g
+
+    return team_df.groupby("team", group_keys=False).apply(_apply_group)
+
+
+def _legacy_poisson_outcome_probs(lambda_home: float, lambda_away: float, max_goals: int = 8):
+    def _pmf(k: int, lamb: float) -> float:
+        if lamb <= 0:
+            return 0.0
+        return exp(-lamb) * (lamb**k) / factorial(k)
+
+    p_home = p_draw = p_away = 0.0
+    for gh in range(0, max_goals + 1):
+        ph = _pmf(gh, lambda_home)
+        for ga in range(0, max_goals + 1):
+            p = ph * _pmf(ga, lambda_away)
+            if gh > ga:
+                p_home += p
+            elif gh == ga:
+                p_draw += p
+            else:
+                p_away += p
+    total = p_home + p_draw + p_away
+    return p_home / total, p_draw / total, p_away / total
+
+
+def _legacy_xg_team_strengths(df: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    league_home_for = float(df["home_goals_for_avg"].mean())
+    league_away_for = float(df["away_goals_for_avg"].mean())
+    teams = {}
+    all_teams = pd.unique(pd.concat([df["home_team"], df["away_team"]], ignore_index=True).dropna())
+    for team in all_teams:
+        home_rows = df[df["home_team"] == team]
+        away_rows = df[df["away_team"] == team]
+        home_for = float(home_rows["home_goals_for_avg"].mean())
+        home_against = float(home_rows["home_goals_against_avg"].mean())
+        away_for = float(away_rows["away_goals_for_avg"].mean())
+        away_against = float(away_rows["away_goals_against_avg"].mean())
+        teams[team] = {
+            "att_home": home_for / league_home_for,
+            "att_away": away_for / league_away_for,
+            "def_home": league_away_for / home_against,
+            "def_away": league_home_for / away_against,
+        }
+    return teams
+
+
+# -------------------------------------------------------------------------
+# Benchmarks
+# -------------------------------------------------------------------------
+
+
+def bench_team_long(matches: pd.DataFrame) -> None:
+    base = prepare_base_matches(matches)
+    base["match_idx"] = base.index
+
+    old = _legacy_build_team_long(base)
+    new = _build_team_long(base)
+    pd.testing.assert_frame_equal(old, new)
+
+    _report(
+        f"_build_team_long ({len(base)} matches)",
+        _timeit(lambda: _legacy_build_team_long(base), repeat=1),
+        _timeit(lambda: _build_team_long(base)),
+    )
+
+
+def bench_rolling_form(matches: pd.DataFrame) -> None:
+    base = prepare_base_matches(matches)
+    base["match_idx"] = base.index
+    team_df = _build_team_long(base)
+
+    for n_games in (1, 5, 10):
+        old = _legacy_add_rolling_form_features(team_df.copy(), n_games=n_games)
+        new = _add_rolling_form_features(team_df.copy(), n_games=n_games)
+        np.testing.assert_array_equal(old.index.to_numpy(), new.index.to_numpy())
+        for col in FORM_FEATURES:
+            np.testing.assert_allclose(
+                old[col].to_numpy(dtype=float),
+                new[col].to_numpy(dtype=float),
+                rtol=1e-12,
+                atol=1e-12,
+                err_msg=f"{col} (n_games={n_games})",
+            )
+
+    _report(
+        f"_add_rolling_form_features ({len(team_df)} rows)",
+        _timeit(lambda: _legacy_add_rolling_form_features(team_df.copy()), repeat=1),
+        _timeit(lambda: _add_rolling_form_features(team_df.copy())),
+    )
+
+
+def bench_multi_window(matches: pd.DataFrame) -> None:
+    windows = [3, 5, 7, 10]
+
+    def _per_window():
+        return [build_match_feature_table(matches, n_games=n) for n in windows]
+
+    def _multi():
+        multi = build_match_feature_table(matches, windows=windows)
+        return [select_feature_window(multi, n) for n in windows]
+
+    for old, new in zip(_per_window(), _multi()):
+        pd.testing.assert_frame_equal(old, new)
+
+    _report(
+        f"feature build, windows={windows}",
+        _timeit(_per_window),
+        _timeit(_multi),
+    )
+
+
+def bench_compact_table(matches: pd.DataFrame) -> None:
+    _, _, feat_df, _ = build_dataset(matches, competition_code="PL")
+    registry = TeamRegistry()
+    compact = compact_feature_table(feat_df, registry, "PL")
+
+    before_mb = feat_df.memory_usage(deep=True).sum() / 2**20
+    after_mb = compact.memory_usage(deep=True).sum() / 2**20
+    print(f"{'feature table memory':<32} old={before_mb:9.2f} MB  new={after_mb:9.2f} MB")
+
+    team = feat_df["home_team"].iloc[0]
+    team_id = registry.team_id("PL", team)
+    old = feat_df[feat_df["home_team"] == team]
+    new = compact[compact["home_team_id"] == team_id]
+    np.testing.assert_array_equal(old.index.to_numpy(), new.index.to_numpy())
+
+    home_names = feat_df["home_team"]
+    home_ids = compact["home_team_id"].to_numpy()
+    _report(
+        "team mask (str vs int16 id)",
+        _timeit(lambda: home_names == team, repeat=20),
+        _timeit(lambda: home_ids == team_id, repeat=20),
+    )
+
+
+def bench_serving_lookup(matches: pd.DataFrame) -> None:
+    _, _, feat_df, _ = build_dataset(matches, competition_code="PL")
+    registry = TeamRegistry()
+    compact = compact_feature_table(feat_df, registry, "PL")
+    index = FeatureIndex(compact, registry.ids("PL"))
+
+    teams = feat_df["home_team"].unique()
+
+    def _scan():
+        for team in teams:
+            feat_df[feat_df["home_team"] == team].sort_values("date").iloc[-1]
+
+    def _lookup():
+        for team in teams:
+            index.home_row(team)
+
+    for team in teams[:5]:
+        old = feat_df[feat_df["home_team"] == team].sort_values("date").iloc[-1]
+        assert old["match_idx"] == index.home_row(team)["match_idx"]
+
+    _report(f"latest home row x{len(teams)} teams", _timeit(_scan), _timeit(_lookup))
+    build_s = _timeit(lambda: FeatureIndex(compact, registry.ids("PL")))
+    print(f"{'FeatureIndex build (per load)':<32} {build_s * 1000:9.1f} ms")
+
+
+def bench_poisson(matches: pd.DataFrame) -> None:
+    rng = np.random.default_rng(0)
+    lambda_home = rng.uniform(0.3, 3.5, len(matches))
+    lambda_away = rng.uniform(0.3, 3.0, len(matches))
+
+    def _loop():
+        return np.array(
+            [_legacy_poisson_outcome_probs(lh, la) for lh, la in zip(lambda_home, lambda_away)]
+        )
+
+    def _batch():
+        return np.column_stack(poisson_outcome_probs_batch(lambda_home, lambda_away))
+
+    np.testing.assert_allclose(_loop(), _batch(), rtol=0, atol=1e-12)
+
+    _report(
+        f"Poisson H/D/A ({len(matches)} matches)",
+        _timeit(_loop, repeat=1),
+        _timeit(_batch),
+    )
+
+
+def bench_xg_context(matches: pd.DataFrame) -> None:
+    _, _, feat_df, _ = build_dataset(matches, competition_code="PL")
+
+    old = _legacy_xg_team_strengths(feat_df)
+    new = build_xg_context_from_feature_df(feat_df)["teams"]
+    assert list(old) == list(new)
+    for team, strengths in old.items():
+        for key, value in strengths.items():
+            np.testing.assert_allclose(value, new[team][key], rtol=1e-12, err_msg=f"{team} {key}")
+
+    _report(
+        f"xG context ({feat_df['home_team'].nunique()} teams)",
+        _timeit(lambda: _legacy_xg_team_strengths(feat_df)),
+        _timeit(lambda: build_xg_context_from_feature_df(feat_df)),
+    )
+
+
+def bench_markets(matches: pd.DataFrame) -> None:
+    rng = np.random.default_rng(0)
+    n = 380  # one season of fixtures
+    lambda_home = rng.uniform(0.8, 2.2, n)
+    lambda_away = rng.uniform(0.6, 1.8, n)
+
+    cache = ScoreGridCache()
+
+    def _all_markets():
+        return [scoreline_markets(lh, la, cache=cache) for lh, la in zip(lambda_home, lambda_away)]
+
+    cold = _timeit(_all_markets, repeat=1)
+    warm = _timeit(_all_markets)
+    _report(f"markets x{n} fixtures (cold vs warm)", cold, warm)
+    print(f"{'score grid cache':<32} entries={len(cache)} hits={cache.hits} misses={cache.misses}")
+
+
+def bench_xg_table(matches: pd.DataFrame) -> None:
+    _, _, feat_df, _ = build_dataset(matches, competition_code="PL")
+
+    def _rows():
+        out = []
+        for _, row in feat_df.iterrows():
+            lam_home, lam_away = calibrate_goal_expectancy(
+                float(row["home_xg_ability"]), float(row["away_xg_ability"])
+            )
+            out.append((lam_home, lam_away, *_legacy_poisson_outcome_probs(lam_home, lam_away)))
+        return np.array(out)
+
+    def _batch():
+        lam_home, lam_away = calibrate_goal_expectancy_batch(
+            feat_df["home_xg_ability"].to_numpy(dtype=float),
+            feat_df["away_xg_ability"].to_numpy(dtype=float),
+        )
+        probs = match_outcome_probabilities_batch(lam_home, lam_away)
+        return np.column_stack([lam_home, lam_away, probs["H"], probs["D"], probs["A"]])
+
+    np.testing.assert_allclose(_rows(), _batch(), rtol=0, atol=1e-12)
+
+    _report(
+        f"xG table λ + H/D/A ({len(feat_df)} rows)",
+        _timeit(_rows, repeat=1),
+        _timeit(_batch),
+    )
+
+
+def bench_skellam(matches: pd.DataFrame) -> None:
+    from scipy.stats import skellam
+
+    rng = np.random.default_rng(0)
+    n = len(matches)
+    cases = {
+        "league λ": (rng.uniform(0.3, 3.0, n), rng.uniform(0.3, 2.5, n)),
+        "cup mismatch λ": (rng.uniform(3.0, 7.0, n), rng.uniform(0.2, 1.0, n)),
+    }
+
+    for label, (lambda_home, lambda_away) in cases.items():
+        exact = np.column_stack(
+            [
+                skellam.sf(0, lambda_home, lambda_away),
+                skellam.pmf(0, lambda_home, lambda_away),
+                skellam.cdf(-1, lambda_home, lambda_away),
+            ]
+        )
+        grid_s = _timeit(lambda: poisson_outcome_probs_batch(lambda_home, lambda_away))
+        skel_s = _timeit(
+            lambda: poisson_outcome_probs_batch(lambda_home, lambda_away, method="skellam")
+        )
+        grid_err = np.abs(np.column_stack(poisson_outcome_probs_batch(lambda_home, lambda_away)) - exact).max()
+        skel_err = np.abs(
+            np.column_stack(poisson_outcome_probs_batch(lambda_home, lambda_away, method="skellam")) - exact
+        ).max()
+
+        _report(f"grid vs skellam, {label}", grid_s, skel_s)
+        print(f"{'  max abs error vs exact':<32} grid={grid_err:9.2e}     skellam={skel_err:9.2e}")
+
+
+def _train_forest(matches: pd.DataFrame):
+    from sklearn.ensemble import RandomForestClassifier
+
+    X, y, _, feature_cols = build_dataset(matches, competition_code="PL")
+    model = RandomForestClassifier(n_estimators=400, class_weight="balanced", random_state=42, n_jobs=-1)
+    model.fit(X, y)
+    model.set_params(n_jobs=1)  # sequential predict_proba: deterministic sum order
+    return model, X, feature_cols
+
+
+def bench_model_load(matches: pd.DataFrame) -> None:
+    from joblib import dump, load
+
+    model, X, feature_cols = _train_forest(matches)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        joblib_path = os.path.join(tmp, "model.joblib")
+        flat_path = os.path.join(tmp, "model_flat")
+        dump(model, joblib_path)
+        FlatForest.from_sklearn(model, feature_cols).save(flat_path)
+
+        # RSS first, before the timing loop leaves freed arenas behind
+        gc.collect()
+        rss = current_rss_mb()
+        flat = FlatForest.load(flat_path)
+        flat_mb = current_rss_mb() - rss
+        rss = current_rss_mb()
+        kept = load(joblib_path)
+        joblib_mb = current_rss_mb() - rss
+        del kept
+
+        np.testing.assert_array_equal(model.predict_proba(X[:500]), flat.predict_proba(X[:500]))
+
+        _report(
+            f"model load ({model.n_estimators} trees)",
+            _timeit(lambda: load(joblib_path)),
+            _timeit(lambda: FlatForest.load(flat_path)),
+        )
+        print(f"{'  RSS growth after load':<32} joblib={joblib_mb:7.1f} MB    mmap={flat_mb:7.1f} MB")
+
+
+def bench_fixtures_batch(matches: pd.DataFrame) -> None:
+    model, X, _ = _train_forest(matches)
+    _, _, feat_df, _ = build_dataset(matches, competition_code="PL")
+    xg_ctx = build_xg_context_from_feature_df(feat_df)
+
+    season = X.iloc[-380:]
+    home_teams = feat_df.loc[season.index, "home_team"].tolist()
+    away_teams = feat_df.loc[season.index, "away_team"].tolist()
+
+    def _per_fixture():
+        out = []
+        for i in range(len(season)):
+            proba = model.predict_proba(season.iloc[[i]])[0]
+            lam_home, lam_away = compute_match_lambdas(home_teams[i], away_teams[i], xg_ctx)
+            out.append((*proba, *_legacy_poisson_outcome_probs(lam_home, lam_away)))
+        return np.array(out)
+
+    def _batched():
+        proba = model.predict_proba(season)
+        lam_home, lam_away = compute_match_lambdas_batch(home_teams, away_teams, xg_ctx)
+        return np.column_stack([proba, *poisson_outcome_probs_batch(lam_home, lam_away)])
+
+    np.testing.assert_allclose(_per_fixture(), _batched(), rtol=0, atol=1e-12)
+
+    _report(
+        f"fixtures RF + Poisson x{len(season)}",
+        _timeit(_per_fixture, repeat=1),
+        _timeit(_batched),
+    )
+
+
+def bench_predict_row(matches: pd.DataFrame) -> None:
+    model, X, feature_cols = _train_forest(matches)
+    flat = export_flat_forest(model, feature_cols, X[:500])
+
+    rows = X.iloc[-100:]
+    vectors = rows.to_numpy()
+
+    def _sklearn_rows():
+        return np.vstack([model.predict_proba(rows.iloc[[i]]) for i in range(len(rows))])
+
+    def _flat_rows():
+        return np.vstack([flat.predict_proba_rows(v) for v in vectors])
+
+    np.testing.assert_array_equal(_sklearn_rows(), _flat_rows())
+
+    old_s, new_s = _timeit(_sklearn_rows, repeat=1), _timeit(_flat_rows)
+    _report(f"single-row predict x{len(rows)}", old_s, new_s)
+    print(
+        f"{'  per request':<32} sklearn={old_s / len(rows) * 1e6:8.0f} us  "
+        f"flat={new_s / len(rows) * 1e6:8.0f} us"
+    )
+
+
+def bench_predict_batch(matches: pd.DataFrame, n_rows: int = 20000, chunk: int = 1000) -> None:
+    """/predict_batch scoring at PREDICT_BATCH_MAX rows: one call vs 1k-row chunks."""
+    import tracemalloc
+
+    model, X, feature_cols = _train_forest(matches)
+    flat = export_flat_forest(model, feature_cols, X[:500])
+    rows = np.resize(X.to_numpy(dtype=np.float32), (n_rows, X.shape[1]))
+
+    def _one_call():
+        return flat.predict_proba_rows(rows)
+
+    def _chunked():
+        return np.vstack([flat.predict_proba(rows[i:i + chunk]) for i in range(0, n_rows, chunk)])
+
+    np.testing.assert_array_equal(_one_call(), _chunked())
+
+    peaks = {}
+    for name, fn in (("one", _one_call), ("chunked", _chunked)):
+        tracemalloc.start()
+        fn()
+        peaks[name] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    _report(f"batch predict x{n_rows}", _timeit(_one_call), _timeit(_chunked))
+    print(f"{'  peak memory':<32} one call={peaks['one']:7.1f} MB  chunked={peaks['chunked']:7.1f} MB")
+
+
+def _serve_matches_api(matches: pd.DataFrame, latency_s: float = 0.03):
+    """
+    Local stand-in for football-data.org /competitions/{code}/matches on a
+    background thread. Returns (server, base_url, stats); stats counts TCP
+    connections.
+    """
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    stats = {"connections": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def setup(self):
+            super().setup()
+            stats["connections"] += 1
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            code = url.path.rstrip("/").split("/")[-2]
+            season = int(parse_qs(url.query)["season"][0])
+            rows = matches[(matches["league"] == code) & (matches["season"] == season)]
+            body = json.dumps(
+                {
+                    "competition": {"code": code},
+                    "matches": [
+                        {
+                            "utcDate": r.date.isoformat(),
+                            "status": r.status,
+                            "homeTeam": {"name": r.home_team},
+                            "awayTeam": {"name": r.away_team},
+                            "score": {"fullTime": {"home": r.home_goals, "away": r.away_goals}},
+                        }
+                        for r in rows.itertuples()
+                    ],
+                }
+            ).encode()
+            time.sleep(latency_s)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}", stats
+
+
+def bench_api_client(matches: pd.DataFrame) -> None:
+    import requests
+
+    os.environ.setdefault("FOOTBALL_DATA_API_TOKEN", "benchmark")
+    server, base_url, stats = _serve_matches_api(matches)
+    jobs = [(league, season) for league in sorted(matches["league"].unique()) for season in (2020, 2021, 2022)]
+
+    def _sequential():
+        out = []
+        for code, season in jobs:
+            response = requests.get(
+                f"{base_url}/competitions/{code}/matches",
+                headers=_build_headers(),
+                params={"season": season},
+                timeout=15,
+            )
+            out.append(matches_json_to_df(response.json()))
+        return out
+
+    client = FootballDataClient(base_url=base_url, requests_per_minute=6000)
+
+    def _pooled():
+        return fetch_competition_matches_many(jobs, status=None, client=client)
+
+    old_s = _timeit(_sequential)
+    old_conns = stats["connections"]
+    stats["connections"] = 0
+    new_s = _timeit(_pooled)
+    _report(f"fetch {len(jobs)} seasons (30 ms RTT)", old_s, new_s)
+    print(f"{'  TCP connections (3 runs)':<32} requests.get={old_conns:5d}    session={stats['connections']:5d}")
+
+    for old_df, new_df in zip(_sequential(), _pooled()):
+        pd.testing.assert_frame_equal(old_df, new_df)
+
+    client.close()
+    server.shutdown()
+
+
+def bench_http_cache(matches: pd.DataFrame) -> None:
+    os.environ.setdefault("FOOTBALL_DATA_API_TOKEN", "benchmark")
+    server, base_url, _ = _serve_matches_api(matches)
+    # finished past seasons: cached forever after the first fetch
+    jobs = [(league, season) for league in sorted(matches["league"].unique()) for season in (2020, 2021, 2022)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(tmp)
+        client = FootballDataClient(base_url=base_url, requests_per_minute=6000, cache=cache)
+
+        def _fetch():
+            return fetch_competition_matches_many(jobs, status="FINISHED", client=client)
+
+        cold = _fetch()
+        misses = cache.misses
+        warm_s = _timeit(_fetch)
+        for old_df, new_df in zip(cold, _fetch()):
+            pd.testing.assert_frame_equal(old_df, new_df)
+
+        warm_misses = cache.misses - misses
+        client.cache = None
+        _report(f"refetch {len(jobs)} past seasons", _timeit(_fetch), warm_s)
+        print(f"{'  cache counters':<32} misses(cold)={misses}  hits={cache.hits}  misses(warm)={warm_misses}")
+        client.close()
+
+    server.shutdown()
+
+
+def bench_schedule_cache(matches: pd.DataFrame) -> None:
+    import asyncio
+
+    os.environ.setdefault("FOOTBALL_DATA_API_TOKEN", "benchmark")
+    server, base_url, _ = _serve_matches_api(matches)
+    n_requests = 20  # simultaneous page loads of the same league's fixtures
+    code, season = matches["league"].iloc[0], int(matches["season"].max())
+
+    client = FootballDataClient(base_url=base_url, requests_per_minute=6000)
+
+    def _blocking():
+        return [
+            fetch_competition_matches_df(code, season, status=None, client=client)
+            for _ in range(n_requests)
+        ]
+
+    async def _single_flight():
+        async_client = AsyncFootballDataClient(base_url=base_url, bucket=TokenBucket(6000))
+        cache = ScheduleCache(ttl_s=60)
+
+        def _fetch():
+            return fetch_competition_matches_df_async(code, season, status=None, client=async_client)
+
+        try:
+            return await asyncio.gather(*(cache.get(code, season, _fetch) for _ in range(n_requests)))
+        finally:
+            await async_client.aclose()
+
+    for old_df, new_df in zip(_blocking(), asyncio.run(_single_flight())):
+        pd.testing.assert_frame_equal(old_df, new_df)
+
+    _report(
+        f"fixtures fetch x{n_requests} concurrent",
+        _timeit(_blocking),
+        _timeit(lambda: asyncio.run(_single_flight())),
+    )
+    client.close()
+    server.shutdown()
+
+
+_STARTUP_CHILD = """
+import sys
+import main
+heavy = sorted(m for m in ("sklearn", "scipy", "joblib") if m in sys.modules)
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    assert client.get("/health").status_code == 200
+    print(",".join(heavy) or "-")
+"""
+
+
+def bench_startup(matches: pd.DataFrame) -> None:
+    """Cold process: import main + startup event + first /health, eager vs lazy."""
+
+    def _first_response(lazy: str) -> str:
+        env = dict(os.environ, FOOTY_LAZY_STARTUP=lazy)
+        out = subprocess.run(
+            [sys.executable, "-c", _STARTUP_CHILD],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env, capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip().splitlines()[-1]
+
+    results = {}
+
+    def _run(lazy: str):
+        results[lazy] = _first_response(lazy)
+
+    eager_s = _timeit(lambda: _run("0"))
+    lazy_s = _timeit(lambda: _run("1"))
+    _report("time to first /health", eager_s, lazy_s)
+    print(f"{'  heavy modules at import':<32} eager={results['0']}  lazy={results['1']}")
+
+
+BENCHMARKS: Dict[str, Callable[[pd.DataFrame], None]] = {
+    "team_long": bench_team_long,
+    "rolling_form": bench_rolling_form,
+    "multi_window": bench_multi_window,
+    "compact_table": bench_compact_table,
+    "serving_lookup": bench_serving_lookup,
+    "poisson": bench_poisson,
+    "xg_context": bench_xg_context,
+    "markets": bench_markets,
+    "xg_table": bench_xg_table,
+    "skellam": bench_skellam,
+    "model_load": bench_model_load,
+    "fixtures_batch": bench_fixtures_batch,
+    "predict_row": bench_predict_row,
+    "predict_batch": bench_predict_batch,
+    "api_client": bench_api_client,
+    "http_cache": bench_http_cache,
+    "schedule_cache": bench_schedule_cache,
+    "startup": bench_startup,
+}
+
+
+def main() -> None:
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    matches = make_synthetic_matches()
+    print(f"Synthetic matches: {len(matches)}\n")
+    for name in selected:
+        BENCHMARKS[name](matches)
+
+
+if __name__ == "__main__":
+    main()
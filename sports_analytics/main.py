@@ -1,28 +1,41 @@
-from typing import List, Optional
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional
+import copy
+import json
 import os
+import threading
+import time
 
+import numpy as np
 import pandas as pd
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from joblib import load, dump
-
-
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, model_validator
 
 from src.data_loader import load_matches, get_data_path
-from src.features import build_match_feature_table
-from src.football_data_api import fetch_competition_matches_df, FootballDataApiError
-from src.advanced_model import train_match_outcome_model, build_dataset
-from src.season_utils import get_current_season, get_training_seasons
+from src.features import TeamFormState, append_match_feature_rows
+from src.football_data_api import (
+    close_async_client,
+    fetch_competition_matches_df,
+    fetch_competition_matches_df_async,
+    FootballDataApiError,
+)
+from src.advanced_model import (
+    build_dataset_from_feature_table,
+    build_feature_table_cached,
+)
+from src.season_utils import get_current_season
+from src.markets import scoreline_markets
+from src.model_registry import ModelRegistry, ServingEntry
+from src.model_artifacts import FlatForest, current_rss_mb, feature_schema_hash
+from src.response_cache import JsonResponseCache, Key
+from src.schedule_cache import ScheduleCache
+from src.training_jobs import TrainingJobConflict, TrainingJobManager
 
 from src.xg_utils import (
-    calibrate_goal_expectancy,
-    match_outcome_probabilities,  # se ainda estiver usando em outros lugares
-    build_xg_context_from_feature_df,
-    compute_match_lambdas,
-    poisson_outcome_probs,
+    compute_match_lambdas_batch,
+    poisson_outcome_probs_batch,
 )
 
 
@@ -33,14 +46,61 @@ from src.xg_utils import (
 # Modelo "genérico" atual em memória (último treino, qualquer liga)
 MODEL_PATH = "models/advanced_model_generic.joblib"
 FEATURE_COLS_PATH = "models/advanced_model_feature_cols_generic.txt"
+# Mesmo modelo em arrays .npy planos (abertos com mmap, páginas compartilhadas entre workers)
+FLAT_MODEL_PATH = "models/advanced_model_generic_flat"
 
 # CSV local default (para debug / fallback, se quiser)
 DATA_FILENAME = "matches_pl_2023.csv"
+DATA_COMPETITION_CODE = "PL"
+
+# Quantos pares (liga, temporada) ficam carregados em memória ao mesmo tempo
+MAX_RESIDENT_MODELS = int(os.environ.get("FOOTY_MAX_RESIDENT_MODELS", "4"))
+
+# Processos para os jobs de treino (0 = thread no próprio processo, p/ debug)
+TRAIN_PROCESSES = int(os.environ.get("FOOTY_TRAIN_PROCESSES", "1"))
+
+# Por quantos segundos os fixtures SCHEDULED de uma liga/temporada são reaproveitados
+SCHEDULE_TTL_S = float(os.environ.get("FOOTY_SCHEDULE_TTL", "120"))
+
+# Startup preguiçoso: o app aceita requests de imediato e a entrada padrão
+# (modelo + CSV local) é carregada numa thread de warm-up (0 = tudo no startup)
+LAZY_STARTUP = os.environ.get("FOOTY_LAZY_STARTUP", "1") != "0"
+
+# Quanto um request que depende da entrada padrão espera o warm-up antes do 503
+WARMUP_WAIT_S = float(os.environ.get("FOOTY_WARMUP_WAIT_S", "30"))
+
+# Respostas JSON prontas de /teams e /fixtures_* (LRU) e se vão com gzip
+RESPONSE_CACHE_ENTRIES = int(os.environ.get("FOOTY_RESPONSE_CACHE_ENTRIES", "256"))
+RESPONSE_GZIP = os.environ.get("FOOTY_RESPONSE_GZIP", "1") != "0"
+
+# /predict_batch: máximo de confrontos por chamada, a partir de quantos a
+# resposta vai em NDJSON (streaming) em vez de um único JSON e quantos pares
+# são pontuados por vez (limita a memória do predict_proba por bloco)
+PREDICT_BATCH_MAX = int(os.environ.get("FOOTY_PREDICT_BATCH_MAX", "20000"))
+PREDICT_BATCH_STREAM_MIN = int(os.environ.get("FOOTY_PREDICT_BATCH_STREAM_MIN", "1000"))
+PREDICT_BATCH_CHUNK = int(os.environ.get("FOOTY_PREDICT_BATCH_CHUNK", "1000"))
+
+# Até quantas linhas /predict* usa o FlatForest.predict_proba_rows; acima
+# disso, predict_proba (soma árvore a árvore, memória menor por linha)
+PREDICT_ROWS_FAST_MAX = 64
 
 # Estrutura em memória
-_model = None  # modelo carregado
-_feature_cols: List[str] = []  # lista de colunas de features (na ordem usada no treino)
-_feature_df: Optional[pd.DataFrame] = None  # feature table completa (todas as partidas da liga)
+# Modelos + feature tables por (liga, temporada), carregados sob demanda (LRU)
+_registry = ModelRegistry(max_entries=MAX_RESIDENT_MODELS)
+
+# Entrada "padrão": modelo genérico do disco + CSV local no startup, depois o
+# último /train_model. Usada quando o request não informa competition_code.
+_default_entry: Optional[ServingEntry] = None
+
+# Fixtures SCHEDULED por (liga, temporada): TTL + uma única busca por chave em andamento
+_schedule_cache = ScheduleCache(ttl_s=SCHEDULE_TTL_S)
+
+# Corpos já serializados por (endpoint, params, versão do modelo, versão da feature table)
+_response_cache = JsonResponseCache(max_entries=RESPONSE_CACHE_ENTRIES, compress=RESPONSE_GZIP)
+
+# Warm-up da entrada padrão (ver _warm_up): liveness != readiness em /health
+_ready = threading.Event()
+_warmup = {"state": "pending", "started_at": None, "elapsed_ms": None, "error": None}
 
 
 # =============================================================================
@@ -87,6 +147,53 @@ class FixturesWithPredictionsResponse(BaseModel):
     fixtures: List[FixtureWithPrediction]
 
 
+class CorrectScoreProb(BaseModel):
+    home_goals: int
+    away_goals: int
+    prob: float
+
+
+class TotalsLine(BaseModel):
+    line: float
+    over: float
+    under: float
+
+
+class BttsProbs(BaseModel):
+    yes: float
+    no: float
+
+
+class AsianHandicapLine(BaseModel):
+    line: float  # handicap do mandante (-1.0 = mandante "dá" um gol)
+    home: float
+    push: float
+    away: float
+
+
+class FixtureMarkets(BaseModel):
+    utc_date: str
+    match_id: int
+    competition_code: str
+    season: int
+    matchday: Optional[int] = None
+    home_team: str
+    away_team: str
+    lambda_home: float
+    lambda_away: float
+
+    # Mercados derivados da grade de placares Poisson (None se não há xG para o confronto)
+    outcome: Optional[OutcomeProbs] = None
+    correct_score: List[CorrectScoreProb] = []
+    totals: List[TotalsLine] = []
+    btts: Optional[BttsProbs] = None
+    asian_handicap: List[AsianHandicapLine] = []
+
+
+class FixturesMarketsResponse(BaseModel):
+    fixtures: List[FixtureMarkets]
+
+
 class PredictionResponse(BaseModel):
     home_team: str
     away_team: str
@@ -95,6 +202,58 @@ class PredictionResponse(BaseModel):
     probabilities: OutcomeProbs
 
 
+class PredictPair(BaseModel):
+    home_team: str
+    away_team: str
+    competition_code: Optional[str] = None  # None = entrada padrão (último treino)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _from_sequence(cls, value):
+        # aceita também ["Home", "Away"] ou ["Home", "Away", "PL"], mais enxuto em lotes grandes
+        if isinstance(value, (list, tuple)):
+            if len(value) not in (2, 3):
+                raise ValueError("par deve ser [home_team, away_team] ou [home_team, away_team, competition_code]")
+            return dict(zip(("home_team", "away_team", "competition_code"), value))
+        return value
+
+
+class PredictBatchRequest(BaseModel):
+    pairs: List[PredictPair]
+    season: Optional[int] = None  # temporada do modelo; se None, a mais recente
+
+
+class BatchPrediction(BaseModel):
+    home_team: str
+    away_team: str
+    competition_code: Optional[str] = None
+    home_top_scorer_goals: Optional[float] = None
+    away_top_scorer_goals: Optional[float] = None
+    probabilities: Optional[OutcomeProbs] = None  # RandomForest, como em /predict
+    lambda_home: Optional[float] = None
+    lambda_away: Optional[float] = None
+    xg_probabilities: Optional[OutcomeProbs] = None  # Poisson via xG
+    error: Optional[str] = None  # ex.: time sem histórico; o resto do lote segue
+
+
+class PredictBatchResponse(BaseModel):
+    predictions: List[BatchPrediction]
+
+
+class RefreshRequest(BaseModel):
+    competition_code: str  # e.g., "PL", "BSA"
+    season: Optional[int] = None  # se None, usamos get_current_season
+
+
+class RefreshResponse(BaseModel):
+    message: str
+    competition_code: str
+    season: int
+    new_matches: int
+    n_rows: int
+    elapsed_ms: float
+
+
 class TrainResponse(BaseModel):
     message: str
     competition_code: str
@@ -105,6 +264,22 @@ class TrainResponse(BaseModel):
     feature_cols_path: str
 
 
+class TrainJobStatus(BaseModel):
+    job_id: str
+    status: str  # queued | running | succeeded | failed
+    stage: str
+    progress: float
+    competition_code: str
+    season: int
+    n_past_seasons: int
+    n_games: int
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[TrainResponse] = None
+    error: Optional[str] = None
+
+
 # =============================================================================
 # FastAPI app + CORS
 # =============================================================================
@@ -130,57 +305,159 @@ app.add_middleware(
 # =============================================================================
 
 
-def _load_model_and_features_from_disk() -> None:
+def _load_model_and_features_from_disk(entry: ServingEntry) -> None:
     """
     Tenta carregar um modelo e a lista de feature columns do disco
-    (genéricos; último treino realizado).
-    """
-    global _model, _feature_cols
-
-    if os.path.exists(MODEL_PATH):
-        _model = load(MODEL_PATH)
-        print(f"[startup] Modelo carregado de {MODEL_PATH}")
-    else:
-        print(f"[startup] Modelo {MODEL_PATH} não encontrado; será treinado via /train_model.")
+    (genéricos; último treino realizado) para a entrada padrão.
 
+    Prefere o artefato plano (FLAT_MODEL_PATH, aberto com mmap) quando o
+    schema hash dele bate com as feature cols; senão cai no joblib.
+    Reporta tempo de carga e memória residente.
+    """
     if os.path.exists(FEATURE_COLS_PATH):
         with open(FEATURE_COLS_PATH, "r", encoding="utf-8") as f:
             cols = [line.strip() for line in f if line.strip()]
-        _feature_cols = cols
-        print(f"[startup] Feature cols carregadas de {FEATURE_COLS_PATH}: {_feature_cols}")
+        entry.feature_cols = cols
+        print(f"[startup] Feature cols carregadas de {FEATURE_COLS_PATH}: {entry.feature_cols}")
     else:
         print(f"[startup] Arquivo {FEATURE_COLS_PATH} não encontrado; será preenchido no próximo treino.")
 
+    rss_before = current_rss_mb()
+    t0 = time.perf_counter()
+
+    flat = None
+    if os.path.exists(FLAT_MODEL_PATH):
+        try:
+            flat = FlatForest.load(FLAT_MODEL_PATH, mmap_mode="r")
+        except ValueError as e:
+            print(f"[startup] {e}; usando o joblib.")
+    if flat is not None:
+        if flat.schema_hash == feature_schema_hash(entry.feature_cols):
+            entry.model = flat
+            source = FLAT_MODEL_PATH
+        else:
+            print(
+                f"[startup] Schema de {FLAT_MODEL_PATH} ({flat.schema_hash}) não bate com "
+                f"{FEATURE_COLS_PATH} ({feature_schema_hash(entry.feature_cols)}); ignorando."
+            )
+
+    if entry.model is None and os.path.exists(MODEL_PATH):
+        from joblib import load
+
+        entry.model = load(MODEL_PATH)
+        source = MODEL_PATH
+
+    if entry.model is None:
+        print(f"[startup] Modelo {MODEL_PATH} não encontrado; será treinado via /train_model.")
+        return
+
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    print(
+        f"[startup] Modelo carregado de {source} em {elapsed_ms:.1f} ms "
+        f"(RSS {rss_before:.0f} MB -> {current_rss_mb():.0f} MB)"
+    )
+
 
-def _load_local_feature_df() -> None:
+def _load_local_feature_df(entry: ServingEntry) -> None:
     """
     Carrega um CSV local e gera uma feature table simplificada (sem xG),
     apenas para debug / fallback inicial. Depois de treinar via /train_model,
-    _feature_df será substituído pelo feat_df completo (com xG etc.).
+    a entrada padrão passa a ser a da liga treinada (com xG etc.).
     """
-    global _feature_df
-
     csv_path = get_data_path(DATA_FILENAME)
     if not os.path.exists(csv_path):
-        print(f"[startup] CSV local {csv_path} não encontrado. _feature_df ficará None.")
-        _feature_df = None
+        print(f"[startup] CSV local {csv_path} não encontrado. A feature table ficará None.")
+        entry.set_feature_df(None)
         return
 
     print(f"[startup] Carregando CSV local {csv_path}...")
     df = load_matches(DATA_FILENAME)
-    _feature_df = build_match_feature_table(df, n_games=5)
-    print(f"[startup] Feature table local construída com shape: {_feature_df.shape}")
+    form_df = build_feature_table_cached(df, n_games=5, competition_code=DATA_COMPETITION_CODE)
+    entry.set_feature_df(form_df, form_df=form_df, form_state=TeamFormState.from_matches(df, n_games=5))
+    print(f"[startup] Feature table local construída com shape: {entry.feature_df.shape}")
+
+
+def _resolve_entry(
+    competition_code: Optional[str] = None,
+    season: Optional[int] = None,
+) -> ServingEntry:
+    """
+    Entrada de serving para o request:
+
+    - sem competition_code: a entrada padrão (último treino / startup)
+    - com competition_code: a liga no registro (temporada pedida ou a mais
+      recente), ou a entrada padrão se ela for da mesma liga
+    """
+    if competition_code:
+        entry = _registry.get(competition_code, season)
+        if entry is not None:
+            return entry
+        if _default_entry is None or _default_entry.competition_code != competition_code.upper():
+            raise HTTPException(
+                status_code=404,
+                detail=f"Nenhum modelo para {competition_code.upper()}. Treine via /train_model.",
+            )
+
+    if not _ready.wait(WARMUP_WAIT_S):
+        raise HTTPException(
+            status_code=503,
+            detail="Modelo padrão ainda carregando (warm-up). Tente novamente em instantes.",
+        )
+    if _default_entry is None:
+        raise HTTPException(status_code=500, detail="Modelo ainda não inicializado.")
+    return _default_entry
+
+
+def _warm_up(entry: ServingEntry) -> None:
+    """
+    Carrega modelo + feature table local na entrada padrão e pré-importa o
+    scipy (modelo Poisson/Skellam dos fixtures), para que o primeiro request
+    não pague esses custos. No modo preguiçoso roda numa thread daemon; os
+    requests que dependem da entrada padrão esperam por ela (_resolve_entry).
+    """
+    _warmup.update(state="warming", started_at=time.time())
+    t0 = time.perf_counter()
+    try:
+        _load_model_and_features_from_disk(entry)
+        _load_local_feature_df(entry)
+        import scipy.special  # noqa: F401
+        import scipy.stats  # noqa: F401
+    except Exception as e:
+        _warmup.update(state="failed", error=f"{type(e).__name__}: {e}")
+        raise
+    else:
+        _warmup["state"] = "ready"
+    finally:
+        _warmup["elapsed_ms"] = (time.perf_counter() - t0) * 1000
+        _ready.set()  # mesmo em falha: ninguém fica esperando para sempre
+    print(f"[startup] Warm-up concluído em {_warmup['elapsed_ms']:.1f} ms")
 
 
 @app.on_event("startup")
 def startup_event():
     """
     Evento de startup: tenta carregar modelo + features do disco e
-    uma feature_df local (para debug). Após o primeiro /train_model,
-    _feature_df passa a usar a tabela completa (build_dataset).
+    uma feature_df local (para debug) na entrada padrão. Após o primeiro
+    /train_model, a entrada padrão passa a ser a da liga treinada; as demais
+    ligas são carregadas do disco sob demanda (_registry).
+
+    Com FOOTY_LAZY_STARTUP (padrão) a carga roda em segundo plano e o app
+    já responde; /health informa quando ele fica pronto.
     """
-    _load_model_and_features_from_disk()
-    _load_local_feature_df()
+    global _default_entry
+
+    _default_entry = ServingEntry(DATA_COMPETITION_CODE, None)
+    if LAZY_STARTUP:
+        threading.Thread(target=_warm_up, args=(_default_entry,), name="warm-up", daemon=True).start()
+    else:
+        _warm_up(_default_entry)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Fecha o pool de conexões do client assíncrono e o pool de jobs de treino."""
+    await close_async_client()
+    _train_jobs.shutdown()
 
 
 # =============================================================================
@@ -194,11 +471,16 @@ def read_root():
 
 
 @app.get("/health")
-def health_check():
+def health_check(response: Response, probe: str = Query("live", pattern="^(live|ready)$")):
     """
-    Endpoint simples de health check.
+    Health check. `status` é a liveness (o processo responde); `ready` diz se
+    o warm-up da entrada padrão terminou. Com probe=ready, responde 503
+    enquanto não estiver pronto (para readiness probes de orquestradores).
     """
-    return {"status": "healthy"}
+    ready = _warmup["state"] == "ready"
+    if probe == "ready" and not ready:
+        response.status_code = 503
+    return {"status": "healthy", "ready": ready, "warmup": dict(_warmup)}
 
 
 # =============================================================================
@@ -207,22 +489,28 @@ def health_check():
 
 
 @app.get("/teams")
-def get_teams():
+def get_teams(
+    request: Request,
+    competition_code: Optional[str] = Query(
+        None, description="Competition code, e.g. 'PL'. If omitted, the last trained model is used."
+    ),
+    season: Optional[int] = Query(None, description="Model season. If omitted, the latest one."),
+):
     """
-    Retorna a lista de times únicos presentes na feature table atual.
-
-    Observação: neste momento, usamos a feature_df carregada na memória, que
-    reflete a última liga/temporadas utilizadas. Em uma estrutura multi-liga
-    mais avançada, poderíamos ter /teams?competition_code=BSA etc.
+    Retorna a lista de times únicos presentes na feature table da liga
+    (ou da entrada padrão, se competition_code não for informado).
+    A lista só muda com a feature table: sai do _response_cache (com ETag).
     """
-    if _feature_df is None:
+    entry = _resolve_entry(competition_code, season)
+    if entry.feature_df is None:
         raise HTTPException(status_code=500, detail="Feature table não carregada ainda.")
 
-    teams = sorted(
-        set(_feature_df["home_team"].dropna().unique())
-        | set(_feature_df["away_team"].dropna().unique())
-    )
-    return {"teams": teams}
+    key = _response_cache.key("teams", entry.key, entry.model_version, entry.feature_version)
+    cached = _response_cache.get(key)
+    if cached is None:
+        body = json.dumps({"teams": entry.teams()}, ensure_ascii=False, separators=(",", ":"))
+        cached = _response_cache.put(key, body.encode("utf-8"))
+    return _response_cache.response(cached, request.headers)
 
 
 # =============================================================================
@@ -231,97 +519,115 @@ def get_teams():
 # =============================================================================
 
 
+def _home_role_features(entry: ServingEntry, team_name: str) -> Optional[dict]:
+    """
+    Features de mandante do time: a última linha em que ele jogou em casa
+    (ou, sem nenhuma, a última como visitante com as colunas mapeadas).
+    None se o time não tem histórico.
+    """
+    last = entry.feature_index.home_row(team_name)
+    if last is not None:
+        return {
+            "home_goals_for_avg": float(last["home_goals_for_avg"]),
+            "home_goals_against_avg": float(last["home_goals_against_avg"]),
+            "home_goal_diff_avg": float(last["home_goal_diff_avg"]),
+            "home_win_rate": float(last["home_win_rate"]),
+            "home_top_scorer_goals": float(last.get("home_top_scorer_goals", 0.0)),
+        }
+
+    # Se não achou como mandante, tenta como visitante e mapeia as colunas
+    last = entry.feature_index.away_row(team_name)
+    if last is None:
+        return None
+    return {
+        "home_goals_for_avg": float(last["away_goals_for_avg"]),
+        "home_goals_against_avg": float(last["away_goals_against_avg"]),
+        "home_goal_diff_avg": float(last["away_goal_diff_avg"]),
+        "home_win_rate": float(last["away_win_rate"]),
+        "home_top_scorer_goals": float(last.get("away_top_scorer_goals", 0.0)),
+    }
+
+
+def _away_role_features(entry: ServingEntry, team_name: str) -> Optional[dict]:
+    """Como _home_role_features, para o time visitante."""
+    last = entry.feature_index.away_row(team_name)
+    if last is not None:
+        return {
+            "away_goals_for_avg": float(last["away_goals_for_avg"]),
+            "away_goals_against_avg": float(last["away_goals_against_avg"]),
+            "away_goal_diff_avg": float(last["away_goal_diff_avg"]),
+            "away_win_rate": float(last["away_win_rate"]),
+            "away_top_scorer_goals": float(last.get("away_top_scorer_goals", 0.0)),
+        }
+
+    last = entry.feature_index.home_row(team_name)
+    if last is None:
+        return None
+    return {
+        "away_goals_for_avg": float(last["home_goals_for_avg"]),
+        "away_goals_against_avg": float(last["home_goals_against_avg"]),
+        "away_goal_diff_avg": float(last["home_goal_diff_avg"]),
+        "away_win_rate": float(last["home_win_rate"]),
+        "away_top_scorer_goals": float(last.get("home_top_scorer_goals", 0.0)),
+    }
+
+
+def _matchup_row(entry: ServingEntry, home_vals: dict, away_vals: dict) -> List[float]:
+    """Vetor de features do confronto, na ordem de entry.feature_cols."""
+    row = []
+    for col in entry.feature_cols:
+        if col.startswith("home_") and col in home_vals:
+            row.append(home_vals[col])
+        elif col.startswith("away_") and col in away_vals:
+            row.append(away_vals[col])
+        else:
+            # Features que não conseguimos preencher agora (ex: rank),
+            # deixamos neutro (0.0).
+            row.append(0.0)
+    return row
+
+
+def _predict_proba_rows(entry: ServingEntry, rows: List[List[float]]) -> np.ndarray:
+    """predict_proba do modelo da entrada para linhas já em ordem de feature_cols."""
+    if isinstance(entry.model, FlatForest):
+        # Caminho de baixa latência: sem DataFrame nem validação do sklearn
+        if len(rows) <= PREDICT_ROWS_FAST_MAX:
+            return entry.model.predict_proba_rows(np.asarray(rows))
+        return entry.model.predict_proba(np.asarray(rows, dtype=np.float32))
+    return entry.model.predict_proba(pd.DataFrame(rows, columns=entry.feature_cols))
+
+
 @app.get("/predict", response_model=PredictionResponse)
 def predict_match(
     home_team: str = Query(..., description="Nome exato do time mandante"),
     away_team: str = Query(..., description="Nome exato do time visitante"),
+    competition_code: Optional[str] = Query(
+        None, description="Competition code, e.g. 'PL'. If omitted, the last trained model is used."
+    ),
+    season: Optional[int] = Query(None, description="Model season. If omitted, the latest one."),
 ):
     """
     Faz a previsão da probabilidade de H/D/A para um confronto específico,
-    usando o modelo carregado em memória e a feature_df atual.
+    usando o modelo e a feature table da liga (ver _resolve_entry).
     """
-    if _model is None or _feature_df is None or not _feature_cols:
+    entry = _resolve_entry(competition_code, season)
+    if entry.model is None or entry.feature_df is None or not entry.feature_cols:
         raise HTTPException(
             status_code=500,
             detail="Modelo ou features não carregados. Treine via /train_model primeiro.",
         )
 
-    # Helper: pega última linha de features em que o time aparece como mandante
-    def _get_home_role_features(team_name: str) -> dict:
-        home_rows = _feature_df[_feature_df["home_team"] == team_name].sort_values("date")
-        if not home_rows.empty:
-            last = home_rows.iloc[-1]
-            return {
-                "home_goals_for_avg": float(last["home_goals_for_avg"]),
-                "home_goals_against_avg": float(last["home_goals_against_avg"]),
-                "home_goal_diff_avg": float(last["home_goal_diff_avg"]),
-                "home_win_rate": float(last["home_win_rate"]),
-                "home_top_scorer_goals": float(last.get("home_top_scorer_goals", 0.0)),
-            }
-
-        # Se não achou como mandante, tenta como visitante e mapeia as colunas
-        away_rows = _feature_df[_feature_df["away_team"] == team_name].sort_values("date")
-        if away_rows.empty:
+    home_vals = _home_role_features(entry, home_team)
+    away_vals = _away_role_features(entry, away_team)
+    for team_name, vals in ((home_team, home_vals), (away_team, away_vals)):
+        if vals is None:
             raise HTTPException(
                 status_code=404,
                 detail=f"Nenhum histórico encontrado para o time {team_name}",
             )
-        last = away_rows.iloc[-1]
-        return {
-            "home_goals_for_avg": float(last["away_goals_for_avg"]),
-            "home_goals_against_avg": float(last["away_goals_against_avg"]),
-            "home_goal_diff_avg": float(last["away_goal_diff_avg"]),
-            "home_win_rate": float(last["away_win_rate"]),
-            "home_top_scorer_goals": float(last.get("away_top_scorer_goals", 0.0)),
-        }
-
-    # Helper: pega última linha de features em que o time aparece como visitante
-    def _get_away_role_features(team_name: str) -> dict:
-        away_rows = _feature_df[_feature_df["away_team"] == team_name].sort_values("date")
-        if not away_rows.empty:
-            last = away_rows.iloc[-1]
-            return {
-                "away_goals_for_avg": float(last["away_goals_for_avg"]),
-                "away_goals_against_avg": float(last["away_goals_against_avg"]),
-                "away_goal_diff_avg": float(last["away_goal_diff_avg"]),
-                "away_win_rate": float(last["away_win_rate"]),
-                "away_top_scorer_goals": float(last.get("away_top_scorer_goals", 0.0)),
-            }
-
-        home_rows = _feature_df[_feature_df["home_team"] == team_name].sort_values("date")
-        if home_rows.empty:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Nenhum histórico encontrado para o time {team_name}",
-            )
-        last = home_rows.iloc[-1]
-        return {
-            "away_goals_for_avg": float(last["home_goals_for_avg"]),
-            "away_goals_against_avg": float(last["home_goals_against_avg"]),
-            "away_goal_diff_avg": float(last["home_goal_diff_avg"]),
-            "away_win_rate": float(last["home_win_rate"]),
-            "away_top_scorer_goals": float(last.get("home_top_scorer_goals", 0.0)),
-        }
-
-    home_vals = _get_home_role_features(home_team)
-    away_vals = _get_away_role_features(away_team)
-
-    # Monta um DataFrame com as colunas de features na ordem esperada
-    row = {}
-    for col in _feature_cols:
-        if col.startswith("home_") and col in home_vals:
-            row[col] = home_vals[col]
-        elif col.startswith("away_") and col in away_vals:
-            row[col] = away_vals[col]
-        else:
-            # Features que não conseguimos preencher agora (ex: rank),
-            # deixamos neutro (0.0).
-            row[col] = 0.0
-
-    X = pd.DataFrame([row], columns=_feature_cols)
 
-    proba = _model.predict_proba(X)[0]
-    classes = list(_model.classes_)  # e.g. ['A','D','H']
+    proba = _predict_proba_rows(entry, [_matchup_row(entry, home_vals, away_vals)])[0]
+    classes = list(entry.model.classes_)  # e.g. ['A','D','H']
     prob_map = {cls: float(p) for cls, p in zip(classes, proba)}
 
     home_p = prob_map.get("H", 0.0)
@@ -345,41 +651,201 @@ def predict_match(
 
 
 # =============================================================================
-# Endpoint: fixtures futuros + previsões (RF + xG)
+# Endpoint: previsão em lote (muitos confrontos numa chamada)
 # =============================================================================
 
 
-@app.get("/fixtures_with_predictions", response_model=FixturesWithPredictionsResponse)
-def get_fixtures_with_predictions(
-    competition_code: str = Query("PL", description="Competition code, e.g. 'PL'"),
-    season: Optional[int] = Query(
-        None, description="Season year, e.g. 2023. If omitted, current season is used."
-    ),
-):
+def _batch_error(pair: PredictPair, detail: str) -> dict:
+    return {
+        "home_team": pair.home_team,
+        "away_team": pair.away_team,
+        "competition_code": pair.competition_code,
+        "error": detail,
+    }
+
+
+def _score_pairs(
+    entry: ServingEntry,
+    pairs: List[PredictPair],
+    home_state: Optional[Dict[str, Optional[dict]]] = None,
+    away_state: Optional[Dict[str, Optional[dict]]] = None,
+) -> List[dict]:
     """
-    Retorna as partidas futuras (status=SCHEDULED) de uma competição
-    e, para cada fixture, calcula:
+    Previsões de uma liga: features pelo último estado de cada time (uma
+    consulta por time, não por par; home_state/away_state guardam essas
+    consultas entre blocos), um único predict_proba para todos os pares e um
+    único cálculo Poisson vetorizado.
+    """
+    home_state = {} if home_state is None else home_state
+    away_state = {} if away_state is None else away_state
+    results: List[Optional[dict]] = [None] * len(pairs)
+    scored, rows = [], []
+
+    for i, pair in enumerate(pairs):
+        if pair.home_team not in home_state:
+            home_state[pair.home_team] = _home_role_features(entry, pair.home_team)
+        if pair.away_team not in away_state:
+            away_state[pair.away_team] = _away_role_features(entry, pair.away_team)
+        home_vals, away_vals = home_state[pair.home_team], away_state[pair.away_team]
+
+        if home_vals is None or away_vals is None:
+            missing = pair.home_team if home_vals is None else pair.away_team
+            results[i] = _batch_error(pair, f"Nenhum histórico encontrado para o time {missing}")
+            continue
+        scored.append(i)
+        rows.append(_matchup_row(entry, home_vals, away_vals))
+
+    if not scored:
+        return results
+
+    rf_probs = _outcome_matrix(_predict_proba_rows(entry, rows), list(entry.model.classes_))
+
+    home_teams = [pairs[i].home_team for i in scored]
+    away_teams = [pairs[i].away_team for i in scored]
+    lambda_home, lambda_away = compute_match_lambdas_batch(home_teams, away_teams, entry.xg_context())
+    has_xg = ~(np.isnan(lambda_home) | np.isnan(lambda_away))
+    lambda_home = np.where(has_xg, lambda_home, 0.0)
+    lambda_away = np.where(has_xg, lambda_away, 0.0)
+    xg_probs = np.column_stack(poisson_outcome_probs_batch(lambda_home, lambda_away))
+
+    rf_list, xg_list = rf_probs.tolist(), xg_probs.tolist()
+    lh_list, la_list = lambda_home.tolist(), lambda_away.tolist()
+    for k, i in enumerate(scored):
+        pair = pairs[i]
+        home_p, draw_p, away_p = rf_list[k]
+        home_xg, draw_xg, away_xg = xg_list[k]
+        results[i] = {
+            "home_team": pair.home_team,
+            "away_team": pair.away_team,
+            "competition_code": entry.competition_code,
+            "home_top_scorer_goals": home_state[pair.home_team].get("home_top_scorer_goals"),
+            "away_top_scorer_goals": away_state[pair.away_team].get("away_top_scorer_goals"),
+            "probabilities": {"home": home_p, "draw": draw_p, "away": away_p},
+            "lambda_home": lh_list[k],
+            "lambda_away": la_list[k],
+            "xg_probabilities": {"home": home_xg, "draw": draw_xg, "away": away_xg},
+        }
+    return results
 
-    - Probabilidades H/D/A do modelo de classificação (RandomForest)
-    - λ_home / λ_away (expected goals, xG)
-    - Probabilidades H/D/A derivadas do modelo Poisson baseado em xG
+
+def _resolve_batch_entries(codes: List[Optional[str]], season: Optional[int]) -> Dict[Optional[str], object]:
+    """Entrada (ou mensagem de erro) de cada liga do lote, resolvida uma vez."""
+    entries: Dict[Optional[str], object] = {}
+    for code in dict.fromkeys(codes):
+        try:
+            entry = _resolve_entry(code, season)
+            if entry.model is None or entry.feature_df is None or not entry.feature_cols:
+                raise HTTPException(
+                    status_code=500,
+                    detail="Modelo ou features não carregados. Treine via /train_model primeiro.",
+                )
+        except HTTPException as e:
+            entries[code] = e.detail
+        else:
+            entries[code] = entry
+    return entries
+
+
+def _iter_batch_results(
+    pairs: List[PredictPair],
+    codes: List[Optional[str]],
+    entries: Dict[Optional[str], object],
+    chunk_size: int = PREDICT_BATCH_CHUNK,
+) -> Iterator[List[dict]]:
+    """
+    Resultados do lote, na ordem dos pares, em blocos de chunk_size: cada
+    bloco é montado e pontuado só quando pedido, então a memória do
+    predict_proba não cresce com o tamanho do lote.
+    """
+    t0 = time.perf_counter()
+    states = {code: ({}, {}) for code in entries}
+    for start in range(0, len(pairs), chunk_size):
+        groups: Dict[Optional[str], List[int]] = {}
+        for i in range(start, min(start + chunk_size, len(pairs))):
+            groups.setdefault(codes[i], []).append(i)
+
+        results: List[Optional[dict]] = [None] * (min(start + chunk_size, len(pairs)) - start)
+        for code, idx in groups.items():
+            group = [pairs[i] for i in idx]
+            entry = entries[code]
+            if isinstance(entry, ServingEntry):
+                group_results = _score_pairs(entry, group, *states[code])
+            else:
+                group_results = [_batch_error(pair, entry) for pair in group]
+            for i, item in zip(idx, group_results):
+                results[i - start] = item
+        yield results
+
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    print(f"[predict_batch] {len(pairs)} pares ({len(entries)} ligas) em {elapsed_ms:.1f} ms")
+
+
+def _ndjson_chunks(chunks: Iterator[List[dict]]) -> Iterator[bytes]:
+    """Uma previsão por linha; cada bloco de resultados vira um pedaço da resposta."""
+    for chunk in chunks:
+        yield "".join(
+            json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n" for item in chunk
+        ).encode("utf-8")
+
+
+@app.post("/predict_batch", response_model=PredictBatchResponse)
+def predict_batch(req: PredictBatchRequest, request: Request):
     """
-    if _model is None or _feature_df is None or not _feature_cols:
+    Previsões H/D/A (RandomForest) + λ e probabilidades Poisson (xG) para
+    muitos confrontos de uma vez. Cada par pode indicar a liga; pares sem
+    liga usam a entrada padrão, como /predict. Os pares são pontuados em
+    blocos de PREDICT_BATCH_CHUNK, agrupados por liga dentro de cada bloco
+    (ver _score_pairs).
+
+    A ordem da resposta é a dos pares. Um par que não pode ser previsto
+    (time sem histórico, liga não treinada) volta com `error` em vez de
+    derrubar o lote.
+
+    Lotes com PREDICT_BATCH_STREAM_MIN pares ou mais (ou com
+    Accept: application/x-ndjson) voltam em NDJSON, uma previsão por
+    linha, em streaming: cada bloco é pontuado à medida que é enviado. Os
+    demais voltam como {"predictions": [...]}.
+    """
+    if len(req.pairs) > PREDICT_BATCH_MAX:
         raise HTTPException(
-            status_code=500,
-            detail="Modelo ou features não carregados. Treine via /train_model primeiro.",
+            status_code=413,
+            detail=f"Lote com {len(req.pairs)} pares; o máximo é {PREDICT_BATCH_MAX}.",
         )
 
-    # Se a season não vier, usamos a current_season
-    if season is None:
-        season = get_current_season()
+    codes = [pair.competition_code.upper() if pair.competition_code else None for pair in req.pairs]
+    entries = _resolve_batch_entries(codes, req.season)
+    chunks = _iter_batch_results(req.pairs, codes, entries)
 
-    try:
-        df_fixtures = fetch_competition_matches_df(
+    if len(req.pairs) >= PREDICT_BATCH_STREAM_MIN or "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(_ndjson_chunks(chunks), media_type="application/x-ndjson")
+    results = [item for chunk in chunks for item in chunk]
+    body = json.dumps({"predictions": results}, ensure_ascii=False, separators=(",", ":"))
+    return Response(content=body.encode("utf-8"), media_type="application/json")
+
+
+# =============================================================================
+# Endpoint: fixtures futuros + previsões (RF + xG)
+# =============================================================================
+
+
+async def _fetch_scheduled_fixtures(competition_code: str, season: int) -> pd.DataFrame:
+    """
+    Partidas SCHEDULED da competição/temporada (erros da API viram 502).
+
+    Busca sem bloquear o event loop e passa pelo _schedule_cache: requests
+    concorrentes para a mesma liga/temporada compartilham uma única chamada
+    à API. O DataFrame retornado é compartilhado; não alterar.
+    """
+
+    async def _fetch() -> pd.DataFrame:
+        return await fetch_competition_matches_df_async(
             competition_code=competition_code,
             season=season,
             status="SCHEDULED",
         )
+
+    try:
+        return await _schedule_cache.get(competition_code, season, _fetch)
     except FootballDataApiError as e:
         raise HTTPException(
             status_code=502,
@@ -391,136 +857,177 @@ def get_fixtures_with_predictions(
             detail=f"Error fetching fixtures from upstream API: {e}",
         )
 
-    if df_fixtures.empty:
-        return FixturesWithPredictionsResponse(fixtures=[])
 
-    # ---------------------------------------------------------------
-    # Contexto de xG global calculado UMA vez, a partir de _feature_df
-    # ---------------------------------------------------------------
-    xg_ctx = build_xg_context_from_feature_df(_feature_df)
+def _fixture_match_id(row: dict) -> int:
+    """ID do jogo vindo da API (id / match_id / matchId), ou -1."""
+    if "id" in row:
+        match_id_val = row["id"]
+    elif "match_id" in row:
+        match_id_val = row["match_id"]
+    elif "matchId" in row:
+        match_id_val = row["matchId"]
+    else:
+        match_id_val = None
 
-    fixtures_out: List[FixtureWithPrediction] = []
+    if pd.isna(match_id_val):
+        match_id_val = None
 
-    for _, row in df_fixtures.iterrows():
-        home_team = row["home_team"]
-        away_team = row["away_team"]
-
-        subset = _feature_df[
-            (_feature_df["home_team"] == home_team)
-            & (_feature_df["away_team"] == away_team)
-        ].sort_values("date")
-
-        if subset.empty:
-            # Fallback: usa último jogo do mandante como mandante + último do visitante como visitante.
-            # Se um dos times (ou ambos) não tiver histórico, usamos valores neutros (0.0) em vez de pular o fixture.
-            home_rows = _feature_df[_feature_df["home_team"] == home_team].sort_values("date")
-            away_rows = _feature_df[_feature_df["away_team"] == away_team].sort_values("date")
-
-            last_home = home_rows.iloc[-1] if not home_rows.empty else None
-            last_away = away_rows.iloc[-1] if not away_rows.empty else None
-
-            # Construir uma linha sintética com base nos últimos jogos isolados quando existirem;
-            # caso contrário, preenchendo com valores neutros (0.0). Assim não perdemos jogos
-            # de times recém‑promovidos, apenas marcamos features mais "fracas".
-            synthetic = {}
-            for col in _feature_cols:
-                if col.startswith("home_"):
-                    if last_home is not None and col in last_home.index:
-                        synthetic[col] = float(last_home[col])
-                    else:
-                        synthetic[col] = 0.0
-                elif col.startswith("away_"):
-                    if last_away is not None and col in last_away.index:
-                        synthetic[col] = float(last_away[col])
-                    else:
-                        synthetic[col] = 0.0
-                else:
-                    # features que não são home_/away_ (ex.: rank_diff) podem ficar neutras
-                    synthetic[col] = 0.0
-
-            latest_row = pd.Series(synthetic)
-        else:
-            latest_row = subset.iloc[-1]
-
-        # ------------------------------
-        # 1) Probabilidades do modelo RF
-        # ------------------------------
-        X = latest_row[_feature_cols].to_frame().T
-        proba = _model.predict_proba(X)[0]
-        classes = list(_model.classes_)
-
-        prob_map = {cls: float(p) for cls, p in zip(classes, proba)}
-        home_p = prob_map.get("H", 0.0)
-        draw_p = prob_map.get("D", 0.0)
-        away_p = prob_map.get("A", 0.0)
-
-        total = home_p + draw_p + away_p
-        if total > 0:
-            home_p /= total
-            draw_p /= total
-            away_p /= total
-
-        # ==========================================================================================
-        # 2) λ_home / λ_away — cálculo via xG REAL usando feature_df + Poisson
-        # ==========================================================================================
-        lambda_home = 0.0
-        lambda_away = 0.0
-        p_home_xg = 0.0
-        p_draw_xg = 0.0
-        p_away_xg = 0.0
-
-        if xg_ctx is not None:
-            lh, la = compute_match_lambdas(home_team, away_team, xg_ctx)
-            if lh is not None and la is not None:
-                lambda_home = float(lh)
-                lambda_away = float(la)
-                p_home_xg, p_draw_xg, p_away_xg = poisson_outcome_probs(lambda_home, lambda_away)
-        
-        
-
-        # ==========================================================================================
-        # 3) Monta o objeto de resposta para o fixture
-        # ==========================================================================================
-
-        # Descobrir o campo de ID do jogo vindo da API
-        if "id" in row.index:
-            match_id_val = row["id"]
-        elif "match_id" in row.index:
-            match_id_val = row["match_id"]
-        elif "matchId" in row.index:
-            match_id_val = row["matchId"]
-        else:
-            match_id_val = None
+    return int(match_id_val) if match_id_val is not None else -1
+
+
+def _fixture_utc_date(row: dict) -> str:
+    """Data do jogo vinda da API (utc_date / utcDate / date), ou ""."""
+    if "utc_date" in row:
+        utc_date_val = row["utc_date"]
+    elif "utcDate" in row:
+        utc_date_val = row["utcDate"]
+    elif "date" in row:
+        utc_date_val = row["date"]
+    else:
+        utc_date_val = None
+
+    if pd.isna(utc_date_val):
+        utc_date_val = None
 
-        if pd.isna(match_id_val):
-            match_id_val = None
+    return str(utc_date_val) if utc_date_val is not None else ""
 
-        match_id_int = int(match_id_val) if match_id_val is not None else -1
 
-         # Descobrir o campo de data vindo da API (utc_date / utcDate / date)
-        if "utc_date" in row.index:
-           utc_date_val = row["utc_date"]
-        elif "utcDate" in row.index:
-           utc_date_val = row["utcDate"]
-        elif "date" in row.index:
-           utc_date_val = row["date"]
+def _fixture_feature_row(entry: ServingEntry, home_team: str, away_team: str) -> dict:
+    """
+    Linha de features para um confronto futuro: o último jogo com esse mesmo
+    mando, ou uma linha sintética a partir dos últimos jogos de cada time.
+    """
+    latest_row = entry.feature_index.pair_row(home_team, away_team)
+    if latest_row is not None:
+        return latest_row
+
+    # Fallback: usa último jogo do mandante como mandante + último do visitante como visitante.
+    # Se um dos times (ou ambos) não tiver histórico, usamos valores neutros (0.0) em vez de pular o fixture.
+    last_home = entry.feature_index.home_row(home_team)
+    last_away = entry.feature_index.away_row(away_team)
+
+    # Construir uma linha sintética com base nos últimos jogos isolados quando existirem;
+    # caso contrário, preenchendo com valores neutros (0.0). Assim não perdemos jogos
+    # de times recém‑promovidos, apenas marcamos features mais "fracas".
+    synthetic = {}
+    for col in entry.feature_cols:
+        if col.startswith("home_"):
+            if last_home is not None and col in last_home:
+                synthetic[col] = float(last_home[col])
+            else:
+                synthetic[col] = 0.0
+        elif col.startswith("away_"):
+            if last_away is not None and col in last_away:
+                synthetic[col] = float(last_away[col])
+            else:
+                synthetic[col] = 0.0
         else:
-           utc_date_val = None
+            # features que não são home_/away_ (ex.: rank_diff) podem ficar neutras
+            synthetic[col] = 0.0
+
+    return synthetic
 
-        if pd.isna(utc_date_val):
-           utc_date_val = None
 
-        utc_date_str = str(utc_date_val) if utc_date_val is not None else ""
+def _outcome_matrix(proba: np.ndarray, classes: List[str]) -> np.ndarray:
+    """
+    Colunas (H, D, A) de um predict_proba, normalizadas para somar 1 por
+    linha (classes ausentes no modelo ficam com 0).
+    """
+    out = np.zeros((proba.shape[0], 3), dtype=float)
+    for j, label in enumerate(("H", "D", "A")):
+        if label in classes:
+            out[:, j] = proba[:, classes.index(label)]
+
+    total = out[:, 0] + out[:, 1] + out[:, 2]
+    safe_total = np.where(total > 0, total, 1.0)
+    return out / safe_total[:, None]
+
+
+async def _cached_fixtures_response(
+    request: Request,
+    key: Key,
+    render: Callable[[], Awaitable[BaseModel]],
+) -> Response:
+    """
+    Resposta dos endpoints de fixtures via _response_cache. Os fixtures vêm
+    do _schedule_cache, então o corpo pronto vale por SCHEDULE_TTL_S (a
+    chave já muda sozinha com um modelo ou feature table novos).
+    """
+    cached = _response_cache.get(key)
+    if cached is None:
+        payload = await render()
+        cached = _response_cache.put(key, payload.model_dump_json().encode("utf-8"), ttl=SCHEDULE_TTL_S)
+    return _response_cache.response(cached, request.headers)
+
+
+async def _render_fixtures_with_predictions(
+    entry: ServingEntry, competition_code: str, season: int
+) -> FixturesWithPredictionsResponse:
+    """Corpo de /fixtures_with_predictions (ver o endpoint)."""
+    df_fixtures = await _fetch_scheduled_fixtures(competition_code, season)
+    # contexto de xG, predict_proba e Poisson: CPU, fora do event loop
+    return await run_in_threadpool(
+        _fixtures_with_predictions_payload, entry, competition_code, season, df_fixtures
+    )
+
+
+def _fixtures_with_predictions_payload(
+    entry: ServingEntry, competition_code: str, season: int, df_fixtures: pd.DataFrame
+) -> FixturesWithPredictionsResponse:
+    """Previsões RF + xG para os fixtures já buscados; roda no threadpool."""
+    if df_fixtures.empty:
+        return FixturesWithPredictionsResponse(fixtures=[])
+
+    # ---------------------------------------------------------------
+    # Contexto de xG da liga (memoizado por versão da feature table)
+    # ---------------------------------------------------------------
+    xg_ctx = entry.xg_context()
+
+    fixture_rows = df_fixtures.to_dict("records")
+    home_teams = [row["home_team"] for row in fixture_rows]
+    away_teams = [row["away_team"] for row in fixture_rows]
+    feature_rows = [
+        _fixture_feature_row(entry, home_team, away_team)
+        for home_team, away_team in zip(home_teams, away_teams)
+    ]
+
+    # ------------------------------------------------------------------
+    # 1) Probabilidades do modelo RF: uma única chamada para todos os jogos
+    # ------------------------------------------------------------------
+    X = pd.DataFrame(
+        [[latest_row[c] for c in entry.feature_cols] for latest_row in feature_rows],
+        columns=entry.feature_cols,
+    )
+    rf_probs = _outcome_matrix(entry.model.predict_proba(X), list(entry.model.classes_))
+
+    # ==========================================================================================
+    # 2) λ_home / λ_away — cálculo via xG REAL usando feature_df + Poisson (vetorizado)
+    # ==========================================================================================
+    lambda_home, lambda_away = compute_match_lambdas_batch(home_teams, away_teams, xg_ctx)
+    has_xg = ~(np.isnan(lambda_home) | np.isnan(lambda_away))
+    lambda_home = np.where(has_xg, lambda_home, 0.0)
+    lambda_away = np.where(has_xg, lambda_away, 0.0)
+    xg_probs = np.column_stack(poisson_outcome_probs_batch(lambda_home, lambda_away))
+
+    # ==========================================================================================
+    # 3) Monta o objeto de resposta para cada fixture
+    # ==========================================================================================
+    fixtures_out: List[FixtureWithPrediction] = []
+
+    for i, row in enumerate(fixture_rows):
+        latest_row = feature_rows[i]
+        home_p, draw_p, away_p = (float(p) for p in rf_probs[i])
+        p_home_xg, p_draw_xg, p_away_xg = (float(p) for p in xg_probs[i])
 
         fixtures_out.append(
             FixtureWithPrediction(
-                utc_date=utc_date_str,
-                match_id=match_id_int,
+                utc_date=_fixture_utc_date(row),
+                match_id=_fixture_match_id(row),
                 competition_code=competition_code,
                 season=int(row.get("season", season)),
                 matchday=int(row.get("matchday") or 0),
-                home_team=home_team,
-                away_team=away_team,
+                home_team=home_teams[i],
+                away_team=away_teams[i],
                 home_top_scorer_goals=float(
                     latest_row.get("home_top_scorer_goals", 0.0)
                 )
@@ -532,8 +1039,8 @@ def get_fixtures_with_predictions(
                 if not pd.isna(latest_row.get("away_top_scorer_goals", 0.0))
                 else None,
                 probabilities=OutcomeProbs(home=home_p, draw=draw_p, away=away_p),
-                lambda_home=lambda_home,
-                lambda_away=lambda_away,
+                lambda_home=float(lambda_home[i]),
+                lambda_away=float(lambda_away[i]),
                 xg_probabilities=OutcomeProbs(
                     home=p_home_xg,
                     draw=p_draw_xg,
@@ -545,103 +1052,333 @@ def get_fixtures_with_predictions(
     return FixturesWithPredictionsResponse(fixtures=fixtures_out)
 
 
-# =============================================================================
-# Endpoint: treinar modelo (multi-liga, multi-temporada)
-# =============================================================================
+@app.get("/fixtures_with_predictions", response_model=FixturesWithPredictionsResponse)
+async def get_fixtures_with_predictions(
+    request: Request,
+    competition_code: str = Query("PL", description="Competition code, e.g. 'PL'"),
+    season: Optional[int] = Query(
+        None, description="Season year, e.g. 2023. If omitted, current season is used."
+    ),
+):
+    """
+    Retorna as partidas futuras (status=SCHEDULED) de uma competição
+    e, para cada fixture, calcula:
 
+    - Probabilidades H/D/A do modelo de classificação (RandomForest)
+    - λ_home / λ_away (expected goals, xG)
+    - Probabilidades H/D/A derivadas do modelo Poisson baseado em xG
 
-@app.post("/train_model", response_model=TrainResponse)
-def train_model(req: TrainRequest):
+    Usa o modelo da liga (competition_code) no registro. O JSON pronto fica
+    no _response_cache (ETag / If-None-Match, gzip); ver _cached_fixtures_response.
     """
-    Treina o modelo avançado usando N temporadas passadas para uma liga específica
-    (competition_code). Também atualiza o modelo em memória e salva:
+    # pode carregar a liga do disco: fora do event loop
+    entry = await run_in_threadpool(_resolve_entry, competition_code, season)
+    if entry.model is None or entry.feature_df is None or not entry.feature_cols:
+        raise HTTPException(
+            status_code=500,
+            detail="Modelo ou features não carregados. Treine via /train_model primeiro.",
+        )
 
-    - modelo genérico: MODEL_PATH
-    - feature_cols: FEATURE_COLS_PATH
+    # Se a season não vier, usamos a current_season
+    if season is None:
+        season = get_current_season()
 
-    Além disso, reconstrói _feature_df usando a mesma lógica de features do
-    modelo avançado (build_dataset), incluindo xG Ability, ranks, etc.
-    """
-    global _model, _feature_cols, _feature_df
+    key = _response_cache.key(
+        "fixtures_with_predictions", (competition_code, season), entry.model_version, entry.feature_version
+    )
+    return await _cached_fixtures_response(
+        request, key, lambda: _render_fixtures_with_predictions(entry, competition_code, season)
+    )
 
-    comp = req.competition_code.upper()
-    current_season = req.season if req.season is not None else get_current_season()
 
-    seasons = get_training_seasons(current_season, req.n_past_seasons)
-    print(
-        f"[train_model] Treinando modelo para {comp} usando temporadas: "
-        f"{seasons} (n_games={req.n_games})"
+# =============================================================================
+# Endpoint: mercados (placar exato, over/under, BTTS, handicap) por fixture
+# =============================================================================
+
+
+async def _render_fixtures_markets(
+    entry: ServingEntry, competition_code: str, season: int, top_scores: int
+) -> FixturesMarketsResponse:
+    """Corpo de /fixtures_markets (ver o endpoint)."""
+    df_fixtures = await _fetch_scheduled_fixtures(competition_code, season)
+    # contexto de xG e grades de placar: CPU, fora do event loop
+    return await run_in_threadpool(
+        _fixtures_markets_payload, entry, competition_code, season, top_scores, df_fixtures
     )
 
 
+def _fixtures_markets_payload(
+    entry: ServingEntry, competition_code: str, season: int, top_scores: int, df_fixtures: pd.DataFrame
+) -> FixturesMarketsResponse:
+    """Mercados dos fixtures já buscados; roda no threadpool."""
+    fixture_rows = df_fixtures.to_dict("records")
+    home_teams = [row["home_team"] for row in fixture_rows]
+    away_teams = [row["away_team"] for row in fixture_rows]
+    lambda_home, lambda_away = compute_match_lambdas_batch(
+        home_teams, away_teams, entry.xg_context()
+    )
+    # 1X2 com o λ exato (mesmo cálculo de /fixtures_with_predictions); só os
+    # demais mercados saem da grade em cache, de λ quantizado
+    has_xg_arr = ~(np.isnan(lambda_home) | np.isnan(lambda_away))
+    outcome_probs = np.column_stack(
+        poisson_outcome_probs_batch(
+            np.where(has_xg_arr, lambda_home, 0.0), np.where(has_xg_arr, lambda_away, 0.0)
+        )
+    ).tolist()
 
-    all_dfs = []
-    for s in seasons:
-        print(f"[train_model] Buscando partidas para {comp} season {s}...")
-        try:
-            df_s = fetch_competition_matches_df(
-                competition_code=comp,
-                season=s,
-                status=None,  # pegamos todas as partidas da season
+    fixtures_out: List[FixtureMarkets] = []
+
+    for i, row in enumerate(fixture_rows):
+        lh, la = float(lambda_home[i]), float(lambda_away[i])
+        has_xg = bool(has_xg_arr[i])
+        markets = {}
+        if has_xg:
+            markets = scoreline_markets(lh, la, top_scores=top_scores)
+            p_home, p_draw, p_away = outcome_probs[i]
+            markets["outcome"] = {"home": p_home, "draw": p_draw, "away": p_away}
+
+        fixtures_out.append(
+            FixtureMarkets(
+                utc_date=_fixture_utc_date(row),
+                match_id=_fixture_match_id(row),
+                competition_code=competition_code,
+                season=int(row.get("season", season)),
+                matchday=int(row.get("matchday") or 0),
+                home_team=home_teams[i],
+                away_team=away_teams[i],
+                lambda_home=lh if has_xg else 0.0,
+                lambda_away=la if has_xg else 0.0,
+                **markets,
             )
-            if df_s is None or df_s.empty:
-                print(f"[train_model] Nenhuma partida retornada para {comp} {s}.")
-                continue
-            all_dfs.append(df_s)
-        except FootballDataApiError as e:
-            print(f"[train_model] Erro na API para {comp} {s}: {e}")
-            continue
+        )
 
-    if not all_dfs:
+    return FixturesMarketsResponse(fixtures=fixtures_out)
+
+
+@app.get("/fixtures_markets", response_model=FixturesMarketsResponse)
+async def get_fixtures_markets(
+    request: Request,
+    competition_code: str = Query("PL", description="Competition code, e.g. 'PL'"),
+    season: Optional[int] = Query(
+        None, description="Season year, e.g. 2023. If omitted, current season is used."
+    ),
+    top_scores: int = Query(10, ge=1, le=81, description="Number of correct scores returned"),
+):
+    """
+    Para cada partida futura (status=SCHEDULED), deriva da grade de placares
+    Poisson (λ_home / λ_away via xG) os mercados:
+
+    - placar exato (top_scores placares mais prováveis)
+    - over/under de gols (0.5 .. 4.5)
+    - ambos marcam (BTTS)
+    - handicap asiático do mandante (-2.5 .. +2.5)
+
+    As grades ficam em cache por (λ_home, λ_away) arredondados para 0.01
+    (src.markets): placar exato, over/under, BTTS e handicap são cotados
+    com esse λ quantizado, não com o λ_home / λ_away exibidos. O bloco
+    `outcome` (1X2) usa o λ exato e bate com os xg_probabilities de
+    /fixtures_with_predictions. O JSON pronto fica no _response_cache.
+    """
+    entry = await run_in_threadpool(_resolve_entry, competition_code, season)
+    if entry.feature_df is None:
         raise HTTPException(
-            status_code=502,
-            detail=(
-                f"Nenhuma partida encontrada nas seasons {seasons} para {comp}. "
-                "Verifique o subscription da API ou o competition_code."
-            ),
+            status_code=500,
+            detail="Features não carregadas. Treine via /train_model primeiro.",
         )
 
-    df_train = pd.concat(all_dfs, ignore_index=True)
-    print(f"[train_model] Dataset de treino combinado shape={df_train.shape}")
+    if season is None:
+        season = get_current_season()
 
-    # Treina o modelo avançado
-    model, acc, report, _, feature_cols = train_match_outcome_model(
-        df_train, n_games=req.n_games
+    key = _response_cache.key(
+        "fixtures_markets", (competition_code, season, top_scores), entry.model_version, entry.feature_version
+    )
+    return await _cached_fixtures_response(
+        request, key, lambda: _render_fixtures_markets(entry, competition_code, season, top_scores)
     )
 
-    print("[train_model] Classification report (holdout):")
-    print(report)
 
-    # Atualiza globais
-    _model = model
-    _feature_cols = feature_cols
+# =============================================================================
+# Endpoint: treinar modelo (multi-liga, multi-temporada)
+# =============================================================================
+
+
+def _publish_trained_model(result: dict) -> None:
+    """
+    Chamado quando um job de treino termina: recarrega a liga dos artefatos
+    que o job gravou e a publica (registro + entrada padrão). A entrada nova
+    já está completa (modelo, feature cols, feature table, índice) quando
+    as referências são trocadas; requests em andamento terminam com a antiga.
+    """
+    global _default_entry
 
-    # Salva modelo genérico (último treinado) + feature cols
-    os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
-    dump(_model, MODEL_PATH)
-    print(f"[train_model] Modelo salvo em {MODEL_PATH}")
+    entry = _registry.reload(result["competition_code"], result["season"])
+    _default_entry = entry
+    print(
+        f"[train_model] Modelo {entry.competition_code} {entry.season} publicado "
+        f"(feature table shape={entry.feature_df.shape})"
+    )
 
-    with open(FEATURE_COLS_PATH, "w", encoding="utf-8") as f:
-        for c in _feature_cols:
-            f.write(c + "\n")
-    print(f"[train_model] Feature cols salvas em {FEATURE_COLS_PATH}")
 
-    # Reconstrói _feature_df com a MESMA lógica do advanced_model (incluindo xG)
-    _, _, feat_df, _ = build_dataset(df_train, n_games=req.n_games)
-    _feature_df = feat_df
-    print(f"[train_model] Feature table reconstruída (build_dataset), shape={_feature_df.shape}")
+# Jobs de treino (pool de processos; FOOTY_TRAIN_PROCESSES=0 roda em thread, p/ debug)
+_train_jobs = TrainingJobManager(
+    publish=_publish_trained_model,
+    paths={
+        "model_path": MODEL_PATH,
+        "feature_cols_path": FEATURE_COLS_PATH,
+        "flat_model_path": FLAT_MODEL_PATH,
+        "models_dir": _registry.models_dir,
+    },
+    use_processes=TRAIN_PROCESSES > 0,
+    max_workers=max(TRAIN_PROCESSES, 1),
+)
 
-    # Também salvamos um modelo específico por liga/season atual (opcional)
-    league_model_path = f"models/train_league_{comp.lower()}_{current_season}.joblib"
-    dump(_model, league_model_path)
-    print(f"[train_model] Modelo específico da liga salvo em {league_model_path}")
 
-    return TrainResponse(
-        message="Modelo treinado com sucesso",
+def _train_job_status(job) -> TrainJobStatus:
+    data = job.to_dict()
+    result = data.pop("result")
+    if result is not None:
+        result = TrainResponse(
+            message="Modelo treinado com sucesso",
+            competition_code=result["competition_code"],
+            seasons_used=result["seasons_used"],
+            n_games=result["n_games"],
+            accuracy=result["accuracy"],
+            model_path=MODEL_PATH,
+            feature_cols_path=FEATURE_COLS_PATH,
+        )
+    return TrainJobStatus(**data, result=result)
+
+
+@app.post("/train_model", response_model=TrainJobStatus, status_code=202)
+def train_model(req: TrainRequest):
+    """
+    Enfileira o treino do modelo avançado usando N temporadas passadas para
+    uma liga específica (competition_code) e devolve o job (status 202).
+
+    As partidas são baixadas por uma thread do servidor (mesmo cliente e
+    mesma cota da API) e o treino roda em outro processo (src.training_jobs),
+    que salva os artefatos da liga/temporada (lidos sob demanda pelo
+    _registry). O modelo genérico (MODEL_PATH, FEATURE_COLS_PATH) é publicado
+    a partir deles, com tmp + os.replace.
+
+    409 se já houver um job ativo da mesma liga/temporada com outros
+    parâmetros.
+
+    Ao terminar, a liga é recarregada desses artefatos (feature table com a
+    mesma lógica do build_dataset, incluindo xG Ability, ranks, etc.) e
+    publicada de uma vez. Acompanhe por GET /train_jobs/{job_id}.
+    """
+    params = {
+        "competition_code": req.competition_code.upper(),
+        "season": req.season if req.season is not None else get_current_season(),
+        "n_past_seasons": req.n_past_seasons,
+        "n_games": req.n_games,
+    }
+    try:
+        job = _train_jobs.submit(params)
+    except TrainingJobConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _train_job_status(job)
+
+
+@app.get("/train_jobs/{job_id}", response_model=TrainJobStatus)
+def get_train_job(job_id: str):
+    """Status, etapa/progresso e (ao terminar) métricas de um job de treino."""
+    job = _train_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} não encontrado.")
+    return _train_job_status(job)
+
+
+# =============================================================================
+# Endpoint: atualização incremental da feature table (novas partidas)
+# =============================================================================
+
+
+def _refresh_features(req: RefreshRequest) -> RefreshResponse:
+    """Corpo (bloqueante) de /refresh_features; roda no threadpool."""
+    comp = req.competition_code.upper()
+    season = req.season if req.season is not None else get_current_season()
+
+    # a entrada da temporada cujas partidas vamos buscar (sem season: a atual,
+    # ou a mais recente treinada); nunca a tabela de outra temporada
+    entry = _resolve_entry(comp, season)
+    if req.season is not None and entry.season not in (None, season):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Nenhum modelo para {comp} {season}. Treine via /train_model.",
+        )
+    if entry.form_df is None or entry.form_state is None:
+        raise HTTPException(
+            status_code=500,
+            detail="Feature table não carregada ainda. Treine via /train_model primeiro.",
+        )
+
+    try:
+        df_new = fetch_competition_matches_df(
+            competition_code=comp,
+            season=season,
+            status="FINISHED",
+        )
+    except FootballDataApiError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Erro ao buscar partidas na API externa: {e}",
+        )
+
+    # Um refresh por entrada de cada vez, sobre uma cópia do estado rolante:
+    # form_df, form_state e a feature table só trocam juntos, no fim, e um
+    # erro no meio do caminho deixa a entrada como estava
+    with entry.refresh_lock:
+        form_state = copy.deepcopy(entry.form_state)
+        n_before = len(entry.form_df)
+        t0 = time.perf_counter()
+        try:
+            form_df = append_match_feature_rows(
+                entry.form_df, df_new, form_state, competition_code=comp
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=f"{e} Use /train_model.")
+        n_new = len(form_df) - n_before
+
+        # Sem partidas novas a tabela não muda: nada de rebuild nem versão nova
+        # (que invalidaria o cache de respostas e o contexto de xG à toa)
+        if n_new:
+            _, _, feat_df, _ = build_dataset_from_feature_table(form_df)
+            entry.set_feature_df(feat_df, form_df=form_df, form_state=form_state)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    print(
+        f"[refresh_features] {n_new} partidas novas para {comp} {season} "
+        f"em {elapsed_ms:.1f} ms; shape={entry.feature_df.shape}"
+    )
+
+    return RefreshResponse(
+        message="Feature table atualizada",
         competition_code=comp,
-        seasons_used=seasons,
-        n_games=req.n_games,
-        accuracy=float(acc),
-        model_path=MODEL_PATH,
-        feature_cols_path=FEATURE_COLS_PATH,
-    )
\ No newline at end of file
+        season=season,
+        new_matches=n_new,
+        n_rows=len(entry.feature_df),
+        elapsed_ms=elapsed_ms,
+    )
+
+
+@app.post("/refresh_features", response_model=RefreshResponse)
+async def refresh_features(req: RefreshRequest):
+    """
+    Acrescenta à feature table da liga as partidas finalizadas da season que
+    ainda não estão nela. Só as features de forma são incrementais (estado
+    rolante por time, entry.form_state, sem recalcular a janela das partidas
+    antigas); as colunas derivadas (força, xG Ability, ranking dependem das
+    médias da liga), a tabela compacta e o índice de serving são refeitos
+    sobre a tabela inteira, então o custo ainda cresce com o tamanho da
+    temporada (~50-90 ms para ~700 partidas). Sem partidas novas nada é
+    recalculado.
+
+    Não re-treina o modelo; serve para manter a tabela de serving atualizada
+    entre um /train_model e outro (ex.: depois de uma rodada no fim de semana).
+    """
+    response = await run_in_threadpool(_refresh_features, req)
+    # jogos que acabaram saem da lista de SCHEDULED; o _schedule_cache é do
+    # event loop (futures em andamento), então é invalidado aqui, não na thread
+    _schedule_cache.invalidate(response.competition_code)
+    return response
@@ -1,20 +1,22 @@
+from typing import Callable, Optional
+
 import pandas as pd
 
-from sklearn.model_selection import (
-    train_test_split,
-    StratifiedKFold,
-    cross_val_score,
-)
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import (
-    accuracy_score,
-    classification_report,
+from src.feature_cache import FeatureCache, get_feature_cache
+from src.model_artifacts import export_flat_forest
+from src.features import (
+    TeamFormState,
+    append_match_feature_rows,
+    build_match_feature_table,
+    infer_competition_code,
 )
 
-from src.features import build_match_feature_table
 
-
-def build_dataset(df: pd.DataFrame, n_games: int = 5):
+def build_dataset(
+    df: pd.DataFrame,
+    n_games: int = 5,
+    competition_code: Optional[str] = None,
+):
     """
     Constrói X, y e a lista de colunas de features a partir do DataFrame bruto
     de partidas (saído do fetch_competition_matches_df).
@@ -26,9 +28,48 @@ def build_dataset(df: pd.DataFrame, n_games: int = 5):
     ----------
     n_games : int
         Quantidade de jogos anteriores a considerar nas métricas de forma.
+    competition_code : str, opcional
+        Liga das partidas (escolhe o scorers_{code}.csv). Se None, é inferida
+        da coluna 'league'.
     """
     # Gera a feature table com N jogos anteriores
-    feat_df = build_match_feature_table(df, n_games=n_games)
+    feat_df = build_match_feature_table(
+        df, n_games=n_games, competition_code=competition_code
+    )
+    return build_dataset_from_feature_table(feat_df)
+
+
+def update_dataset(
+    form_df: pd.DataFrame,
+    new_matches: pd.DataFrame,
+    state: TeamFormState,
+    competition_code: Optional[str] = None,
+):
+    """
+    Versão incremental do build_dataset: acrescenta à feature table de forma
+    (saída do build_match_feature_table) apenas as partidas novas, usando o
+    estado rolante por time, sem refazer as janelas das partidas antigas.
+    As colunas derivadas (força, xG Ability, ranking) dependem das médias da
+    liga e são recalculadas na tabela inteira, então o total ainda é
+    O(partidas na tabela).
+
+    Retorna (X, y, feat_df, feature_cols, form_df), onde form_df é a tabela
+    de forma atualizada para ser usada no próximo update.
+    """
+    form_df = append_match_feature_rows(
+        form_df, new_matches, state, competition_code=competition_code
+    )
+    X, y, feat_df, feature_cols = build_dataset_from_feature_table(form_df)
+    return X, y, feat_df, feature_cols, form_df
+
+
+def build_dataset_from_feature_table(feat_df: pd.DataFrame):
+    """
+    Igual ao build_dataset, mas partindo de uma feature table de forma já
+    construída (build_match_feature_table ou append_match_feature_rows).
+    A tabela recebida não é alterada.
+    """
+    feat_df = feat_df.copy()
 
     # -------------------------------------------------
     # Attack / Defense strength (força ofensiva/defensiva)
@@ -166,9 +207,17 @@ def build_dataset(df: pd.DataFrame, n_games: int = 5):
             f"faltando colunas: {rank_base_cols - set(feat_df.columns)}"
         )
 
-    # -------------------------------------------------
-    # Seleção das features
-    # -------------------------------------------------
+    return select_model_features(feat_df)
+
+
+def select_model_features(feat_df: pd.DataFrame):
+    """
+    Seleciona as colunas de features do modelo em uma feature table final e
+    descarta linhas com features faltando. Retorna (X, y, feat_df, feature_cols).
+
+    Idempotente: pode ser reaplicada a uma tabela que já passou por aqui
+    (ex.: carregada do cache em disco).
+    """
     desired_feature_cols = [
         # home side - forma e gols
         "home_goals_for_avg",
@@ -236,7 +285,55 @@ def build_dataset(df: pd.DataFrame, n_games: int = 5):
     return X, y, feat_df, feature_cols
 
 
-def train_match_outcome_model(df: pd.DataFrame, n_games: int = 5):
+def build_dataset_cached(
+    df: pd.DataFrame,
+    n_games: int = 5,
+    cache: Optional[FeatureCache] = None,
+    competition_code: Optional[str] = None,
+):
+    """
+    Igual ao build_dataset, mas guarda a feature table final no cache em
+    disco (src.feature_cache), com chave = hash das partidas + parâmetros +
+    arquivo de artilheiros. Rodadas repetidas sobre as mesmas temporadas
+    apenas leem o arquivo.
+    """
+    cache = cache or get_feature_cache()
+    competition_code = competition_code or infer_competition_code(df)
+    key = cache.key(df, kind="dataset", competition_code=competition_code, n_games=n_games)
+    feat_df = cache.load_or_build(
+        key,
+        lambda: build_dataset(df, n_games=n_games, competition_code=competition_code)[2],
+    )
+    return select_model_features(feat_df)
+
+
+def build_feature_table_cached(
+    df: pd.DataFrame,
+    n_games: int = 5,
+    cache: Optional[FeatureCache] = None,
+    competition_code: Optional[str] = None,
+) -> pd.DataFrame:
+    """build_match_feature_table com o mesmo cache em disco do build_dataset_cached."""
+    cache = cache or get_feature_cache()
+    competition_code = competition_code or infer_competition_code(df)
+    key = cache.key(df, kind="form", competition_code=competition_code, n_games=n_games)
+    return cache.load_or_build(
+        key,
+        lambda: build_match_feature_table(
+            df, n_games=n_games, competition_code=competition_code
+        ),
+    )
+
+
+def train_match_outcome_model(
+    df: pd.DataFrame,
+    n_games: int = 5,
+    feat_df: Optional[pd.DataFrame] = None,
+    use_cache: bool = True,
+    competition_code: Optional[str] = None,
+    flat_path: Optional[str] = None,
+    progress: Optional[Callable[[str], None]] = None,
+):
     """
     Treina um modelo RandomForest para prever o resultado do jogo (H/D/A).
 
@@ -251,8 +348,43 @@ def train_match_outcome_model(df: pd.DataFrame, n_games: int = 5):
     n_games : int
         Quantidade de jogos anteriores a considerar nas métricas de forma.
         (padrão = 5)
+    feat_df : DataFrame, opcional
+        Feature table de forma já construída para este n_games (ex.:
+        select_feature_window de uma tabela multi-janela). Se informada,
+        `df` não é reprocessado.
+    use_cache : bool
+        Usa o cache em disco da feature table (build_dataset_cached).
+    competition_code : str, opcional
+        Liga das partidas (artilheiros); inferida da coluna 'league' se None.
+    flat_path : str, opcional
+        Se informado, exporta a floresta treinada em arrays planos
+        (model_artifacts.FlatForest) nesse diretório, depois de conferir no
+        holdout que as probabilidades batem exatamente com as do sklearn.
+    progress : callable, opcional
+        Chamado com o nome de cada etapa ao começá-la ("features",
+        "cross_validation", "holdout_fit", "export"); usado pelos jobs de
+        treino (src.training_jobs) para reportar progresso.
     """
-    X, y, feat_df, feature_cols = build_dataset(df, n_games=n_games)
+    # sklearn (~1,5 s de import, com scipy.stats) só é carregado aqui: o
+    # serving não depende dele, e o treino roda nos jobs em segundo plano
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, classification_report
+    from sklearn.model_selection import StratifiedKFold, cross_val_score, train_test_split
+
+    if progress is None:
+        progress = lambda stage: None  # noqa: E731
+
+    progress("features")
+    if feat_df is not None:
+        X, y, feat_df, feature_cols = build_dataset_from_feature_table(feat_df)
+    elif use_cache:
+        X, y, feat_df, feature_cols = build_dataset_cached(
+            df, n_games=n_games, competition_code=competition_code
+        )
+    else:
+        X, y, feat_df, feature_cols = build_dataset(
+            df, n_games=n_games, competition_code=competition_code
+        )
 
     model = RandomForestClassifier(
         n_estimators=400,
@@ -265,6 +397,7 @@ def train_match_outcome_model(df: pd.DataFrame, n_games: int = 5):
     )
 
     # Cross-validation (se o dataset permitir)
+    progress("cross_validation")
     try:
         cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
         f1_macro_scores = cross_val_score(
@@ -283,6 +416,7 @@ def train_match_outcome_model(df: pd.DataFrame, n_games: int = 5):
         print(f"[advanced_model] Cross-validation skipped: {e}")
 
     # Holdout final
+    progress("holdout_fit")
     X_train, X_test, y_train, y_test = train_test_split(
         X,
         y,
@@ -298,4 +432,9 @@ def train_match_outcome_model(df: pd.DataFrame, n_games: int = 5):
     print("Holdout accuracy:", acc)
     print(report)
 
+    if flat_path is not None:
+        progress("export")
+        export_flat_forest(model, feature_cols, X_test).save(flat_path)
+        print(f"[advanced_model] Floresta exportada em {flat_path} (idêntica ao sklearn no holdout)")
+
     return model, acc, report, (X_test, y_test), feature_cols
\ No newline at end of file
@@ -0,0 +1,165 @@
+"""
+Content-addressed on-disk cache for feature tables.
+
+Feature tables are deterministic given the raw matches and the build
+parameters, so they are stored under a key that hashes both:
+
+    models/feature_cache/<kind>_<sha256>.parquet
+
+Entries are never invalidated explicitly: different input -> different key.
+Least recently used files are evicted once the directory grows past
+max_bytes. Parquet needs pyarrow; without it the cache falls back to pickle.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+from src.data_loader import get_data_path
+
+# Bump whenever the feature logic changes, so old entries stop matching
+CACHE_VERSION = 3
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "models", "feature_cache"
+)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+try:
+    import pyarrow  # noqa: F401
+
+    _FORMAT = "parquet"
+except ImportError:
+    _FORMAT = "pkl"
+
+
+def _file_digest(path: str) -> Optional[str]:
+    """sha256 of a file's contents, or None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class FeatureCache:
+    """Directory of cached feature tables with size-bounded LRU eviction."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, df: pd.DataFrame, kind: str, competition_code: str, **params: Any) -> str:
+        """
+        Fingerprint of the raw matches + build parameters + the scorers file
+        the build will read (scorers_{competition_code}.csv).
+        """
+        h = hashlib.sha256()
+        h.update(json.dumps([str(c) for c in df.columns]).encode())
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+
+        scorer_path = get_data_path(f"scorers_{competition_code.lower()}.csv")
+        meta: Dict[str, Any] = {
+            "version": CACHE_VERSION,
+            "competition_code": competition_code,
+            "scorers": _file_digest(scorer_path),
+            **params,
+        }
+        h.update(json.dumps(meta, sort_keys=True, default=str).encode())
+        return f"{kind}_{h.hexdigest()}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{_FORMAT}")
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Cached table, or None. The directory is shared with the training
+        processes, so an entry can be evicted between any two calls here;
+        a file that vanishes is just a miss.
+        """
+        path = self._path(key)
+        try:
+            if _FORMAT == "parquet":
+                df = pd.read_parquet(path)
+            else:
+                df = pd.read_pickle(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            # Corrupted / partial entry: drop it and rebuild
+            print(f"[feature_cache] Ignoring unreadable entry {path}: {e}")
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used for eviction
+        except FileNotFoundError:  # evicted right after the read; df is still valid
+            pass
+        self.hits += 1
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.tmp{os.getpid()}_{threading.get_ident()}"
+
+        if _FORMAT == "parquet":
+            df.to_parquet(tmp_path)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)  # atomic: readers never see half a file
+
+        self._evict(keep=path)
+
+    def load_or_build(self, key: str, build: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        df = self.get(key)
+        if df is None:
+            df = build()
+            self.put(key, df)
+        return df
+
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not name.endswith((".parquet", ".pkl")):
+                continue
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:  # evicted by another process meanwhile
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+_default_cache: Optional[FeatureCache] = None
+
+
+def get_feature_cache() -> FeatureCache:
+    """Process-wide cache under models/feature_cache/."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = FeatureCache()
+    return _default_cache
@@ -1,12 +1,21 @@
+import os
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Set, Tuple
+
 import pandas as pd
 import numpy as np
 from src.data_loader import get_data_path
+from src.stats import add_result_labels
+
+# Points: win=3, draw=1, loss=0
+_POINTS = {1: 3, 0: 1, -1: 0}
 
 
-def prepare_base_matches(df: pd.DataFrame) -> pd.DataFrame:
+def prepare_base_matches(df: pd.DataFrame, overwrite_result: bool = True) -> pd.DataFrame:
     """
     Filter to finished matches, add 'result' column, sort by date.
-    result: 'H' (home win), 'D' (draw), 'A' (away win)
+    result: 'H' (home win), 'D' (draw), 'A' (away win), categorical.
+    With overwrite_result=False an existing 'result' column is kept.
     """
     df = df.copy()
 
@@ -17,16 +26,7 @@ def prepare_base_matches(df: pd.DataFrame) -> pd.DataFrame:
     df["date"] = pd.to_datetime(df["date"])
     df = df.sort_values("date").reset_index(drop=True)
 
-    def _result(row):
-        if row["home_goals"] > row["away_goals"]:
-            return "H"
-        elif row["home_goals"] < row["away_goals"]:
-            return "A"
-        else:
-            return "D"
-
-    df["result"] = df.apply(_result, axis=1)
-    return df
+    return add_result_labels(df, "result", overwrite=overwrite_result)
 
 
 def _build_team_long(df: pd.DataFrame) -> pd.DataFrame:
@@ -34,41 +34,174 @@ def _build_team_long(df: pd.DataFrame) -> pd.DataFrame:
     Build a 'long' table: one row per (team, match).
     Columns: match_idx, date, team, is_home, goals_for, goals_against, result
     result is from the TEAM point of view: 1 = win, 0 = draw, -1 = loss
+
+    Columnar: both perspectives are built with array operations and joined
+    with a single concat. Rows are interleaved (home, away) per match before
+    the stable sort, so the output order matches the old row-by-row loop.
     """
-    rows = []
+    n = len(df)
+    home_goals = df["home_goals"].to_numpy()
+    away_goals = df["away_goals"].to_numpy()
+
+    def _team_result(goals_for: np.ndarray, goals_against: np.ndarray) -> np.ndarray:
+        return np.where(goals_for > goals_against, 1, np.where(goals_for == goals_against, 0, -1))
+
+    home = pd.DataFrame(
+        {
+            "match_idx": df.index.to_numpy(),
+            "date": df["date"].array,
+            "team": df["home_team"].array,
+            "is_home": np.ones(n, dtype=np.int64),
+            "goals_for": home_goals,
+            "goals_against": away_goals,
+            "result": _team_result(home_goals, away_goals),
+        }
+    )
+    away = pd.DataFrame(
+        {
+            "match_idx": df.index.to_numpy(),
+            "date": df["date"].array,
+            "team": df["away_team"].array,
+            "is_home": np.zeros(n, dtype=np.int64),
+            "goals_for": away_goals,
+            "goals_against": home_goals,
+            "result": _team_result(away_goals, home_goals),
+        }
+    )
 
-    for idx, row in df.iterrows():
-        # Home team perspective
-        rows.append(
-            {
-                "match_idx": idx,
-                "date": row["date"],
-                "team": row["home_team"],
-                "is_home": 1,
-                "goals_for": row["home_goals"],
-                "goals_against": row["away_goals"],
-                "result": 1 if row["home_goals"] > row["away_goals"] else (0 if row["home_goals"] == row["away_goals"] else -1),
-            }
-        )
-        # Away team perspective
-        rows.append(
-            {
-                "match_idx": idx,
-                "date": row["date"],
-                "team": row["away_team"],
-                "is_home": 0,
-                "goals_for": row["away_goals"],
-                "goals_against": row["home_goals"],
-                "result": 1 if row["away_goals"] > row["home_goals"] else (0 if row["away_goals"] == row["home_goals"] else -1),
-            }
-        )
+    # Interleave home/away rows (h0, a0, h1, a1, ...) like the old loop did
+    interleave = np.arange(2 * n).reshape(2, n).T.ravel()
+    team_df = pd.concat([home, away], ignore_index=True).take(interleave)
 
-    team_df = pd.DataFrame(rows)
-    team_df = team_df.sort_values(["team", "date"]).reset_index(drop=True)
+    team_df = team_df.sort_values(["team", "date"], kind="stable").reset_index(drop=True)
     return team_df
 
 
-def _add_rolling_form_features(team_df: pd.DataFrame, n_games: int = 5) -> pd.DataFrame:
+FORM_FEATURES = [
+    "goals_for_avg",
+    "goals_against_avg",
+    "goal_diff_avg",
+    "win_rate",
+    "points_avg",
+    "momentum",
+    "clean_sheet_rate",
+    "conceded_avg",
+    "weighted_points",
+]
+
+
+def _prefix_sum(x: np.ndarray) -> np.ndarray:
+    """Cumulative sum with a leading 0, so sum(x[a:b]) == c[b] - c[a]."""
+    c = np.empty(len(x) + 1, dtype=float)
+    c[0] = 0.0
+    np.cumsum(x, out=c[1:])
+    return c
+
+
+def _form_prefix_sums(team_df: pd.DataFrame) -> dict:
+    """
+    One pass over a long table sorted by (team, date): group starts plus the
+    prefix sums every rolling form feature is derived from.
+
+    NaNs are summed as 0 and counted separately, so windowed means keep the
+    min_periods=1 semantics of pandas' rolling().mean().
+    """
+    team = team_df["team"].to_numpy()
+    n = len(team)
+    idx = np.arange(n)
+
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = team[1:] != team[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, idx, 0))
+
+    goals_for = team_df["goals_for"].to_numpy(dtype=float)
+    goals_against = team_df["goals_against"].to_numpy(dtype=float)
+    goal_diff = goals_for - goals_against
+    points = team_df["points"].to_numpy(dtype=float)
+
+    sums = {"idx": idx, "group_start": group_start}
+    for name, x in [
+        ("goals_for", goals_for),
+        ("goals_against", goals_against),
+        ("goal_diff", goal_diff),
+        ("points", points),
+    ]:
+        valid = ~np.isnan(x)
+        sums[name] = _prefix_sum(np.where(valid, x, 0.0))
+        sums[name + "_n"] = _prefix_sum(valid)
+
+    # Weighted points use a second moment: sum(k * x_k) with the global row k
+    points_valid = ~np.isnan(points)
+    points_filled = np.where(points_valid, points, 0.0)
+    sums["points_k"] = _prefix_sum(points_filled * idx)
+
+    # NaN compares False, exactly like shift(1).eq(...) did
+    sums["wins"] = _prefix_sum(team_df["result"].to_numpy() == 1)
+    sums["clean_sheets"] = _prefix_sum(goals_against == 0)
+    return sums
+
+
+def _form_window_features(sums: dict, n_games: int) -> dict:
+    """
+    Rolling form features over the last n_games *before* each row, computed
+    from the prefix sums of _form_prefix_sums. Matches the old
+    shift(1).rolling(n_games, min_periods=1) chains value by value.
+    """
+    idx = sums["idx"]
+    group_start = sums["group_start"]
+    pos = idx - group_start  # matches already played by the team
+
+    # Previous matches in the window: rows [lo, idx)
+    lo = np.maximum(group_start, idx - n_games)
+
+    def _window(name: str) -> np.ndarray:
+        c = sums[name]
+        return c[idx] - c[lo]
+
+    def _window_mean(name: str) -> np.ndarray:
+        total = _window(name)
+        count = _window(name + "_n")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, total / count, np.nan)
+
+    # Boolean rates also count the (False) shifted-in first row of each team
+    rate_count = np.minimum(pos + 1, n_games)
+
+    points_n = _window("points_n")
+    momentum = np.where(points_n > 0, _window("points"), np.nan)
+
+    # Weighted average with weights 1..n over a full window [idx-n, idx):
+    # sum((k - lo + 1) * x_k) = S_kx - (lo - 1) * S_x
+    weighted_sum = _window("points_k") - (lo - 1) * _window("points")
+    weight_total = n_games * (n_games + 1) / 2.0
+    full_window = (pos >= n_games) & (points_n == n_games)
+    weighted_points = np.where(full_window, weighted_sum / weight_total, np.nan)
+
+    goals_against_avg = _window_mean("goals_against")
+
+    return {
+        "goals_for_avg": _window_mean("goals_for"),
+        "goals_against_avg": goals_against_avg,
+        "goal_diff_avg": _window_mean("goal_diff"),
+        "win_rate": _window("wins") / rate_count,
+        "points_avg": _window_mean("points"),
+        "momentum": momentum,
+        "clean_sheet_rate": _window("clean_sheets") / rate_count,
+        "conceded_avg": goals_against_avg.copy(),
+        "weighted_points": weighted_points,
+    }
+
+
+def window_suffix(n_games: int) -> str:
+    """Column suffix used for the n_games window in multi-window tables."""
+    return f"_n{n_games}"
+
+
+def _add_rolling_form_features(
+    team_df: pd.DataFrame,
+    n_games: int = 5,
+    windows: Optional[Sequence[int]] = None,
+) -> pd.DataFrame:
     """
     For each team, compute rolling stats over the LAST n_games *before* the match.
 
@@ -82,165 +215,140 @@ def _add_rolling_form_features(team_df: pd.DataFrame, n_games: int = 5) -> pd.Da
       - clean_sheet_rate
       - conceded_avg
       - weighted_points (more weight to recent matches)
+
+    All features come from one grouped pass of prefix sums over the table
+    sorted by (team, date); the current match is never part of its own window.
+
+    If `windows` is given, n_games is ignored and the features are emitted
+    once per window with a window_suffix (e.g. goals_for_avg_n5); the prefix
+    sums are shared, so extra windows are nearly free.
     """
+    team_df = team_df.sort_values(["team", "date"], kind="stable")
 
-    def _weighted_avg_points(x: np.ndarray) -> float:
-        # Weighted average of points with higher weight for more recent games
-        n = len(x)
-        if n == 0:
-            return 0.0
-        weights = np.arange(1, n + 1, dtype=float)
-        return float((x * weights).sum() / weights.sum())
-
-    def _apply_group(g: pd.DataFrame) -> pd.DataFrame:
-        g = g.sort_values("date")
-        # Use shift(1) so that we NEVER use current match info to build its own features
-        g["goals_for_avg"] = g["goals_for"].shift(1).rolling(n_games, min_periods=1).mean()
-        g["goals_against_avg"] = g["goals_against"].shift(1).rolling(n_games, min_periods=1).mean()
-        g["goal_diff_avg"] = (g["goals_for"] - g["goals_against"]).shift(1).rolling(n_games, min_periods=1).mean()
-        g["win_rate"] = g["result"].shift(1).eq(1).rolling(n_games, min_periods=1).mean()
-
-        # Add advanced rolling features
-        # Points: win=3, draw=1, loss=0
-        g["points"] = g["result"].map({1: 3, 0: 1, -1: 0})
-        g["points_avg"] = g["points"].shift(1).rolling(n_games, min_periods=1).mean()
-
-        # Momentum = sum of last N points
-        g["momentum"] = g["points"].shift(1).rolling(n_games, min_periods=1).sum()
-
-        # Clean sheet rate: goals_against == 0
-        g["clean_sheet_rate"] = g["goals_against"].shift(1).eq(0).rolling(n_games, min_periods=1).mean()
-
-        # Conceded average
-        g["conceded_avg"] = g["goals_against"].shift(1).rolling(n_games, min_periods=1).mean()
-
-        # Weighted points form (more weight to the most recent matches)
-        g["weighted_points"] = (
-            g["points"]
-            .shift(1)
-            .rolling(n_games, min_periods=1)
-            .apply(_weighted_avg_points, raw=True)
-        )
+    team_df["points"] = team_df["result"].map(_POINTS)
 
-        return g
+    sums = _form_prefix_sums(team_df)
+    if windows is None:
+        for col, values in _form_window_features(sums, n_games).items():
+            team_df[col] = values
+    else:
+        for n in windows:
+            suffix = window_suffix(n)
+            for col, values in _form_window_features(sums, n).items():
+                team_df[col + suffix] = values
 
-    team_df = team_df.groupby("team", group_keys=False).apply(_apply_group)
     return team_df
 
 
-def merge_scorer_features(feat_df: pd.DataFrame, competition_code: str = "PL") -> pd.DataFrame:
+# competition_code -> (file mtime, {team_name: top scorer goals})
+_SCORER_STORE: Dict[str, Tuple[float, Dict[str, float]]] = {}
+
+
+def infer_competition_code(df: pd.DataFrame, default: str = "PL") -> str:
     """
-    Adds player-based attacking strength for home and away teams.
-    Uses top scorers data: scorers_{competition_code}.csv
+    Competition code of a matches table when the caller doesn't pass one:
+    the 'league' column if it holds a single API code (e.g. 'BSA'), else default.
     """
-    scorer_path = get_data_path(f"scorers_{competition_code.lower()}.csv")
+    if "league" in df.columns:
+        leagues = df["league"].dropna().unique()
+        if len(leagues) == 1:
+            league = str(leagues[0])
+            if league.isalnum() and league.isupper() and len(league) <= 4:
+                return league
+    return default
+
+
+def get_team_top_scorer_goals(competition_code: str) -> Optional[Dict[str, float]]:
+    """
+    team_name -> goals of the team's top scorer, from scorers_{code}.csv.
+
+    Loaded once per competition and kept in memory; reloaded when the file's
+    mtime changes (e.g. after fetch_scorers.py). None if there is no file.
+    """
+    code = competition_code.upper()
+    scorer_path = get_data_path(f"scorers_{code.lower()}.csv")
 
     try:
-        scorers = pd.read_csv(scorer_path)
+        mtime = os.path.getmtime(scorer_path)
     except FileNotFoundError:
-        print("Scorers file not found — run fetch_scorers.py first.")
-        return feat_df
+        _SCORER_STORE.pop(code, None)
+        return None
 
-    # For each team, get the top scorer's goals
-    team_max = (
-        scorers.groupby("team_name")["goals"]
-        .max()
-        .reset_index()
-        .rename(columns={"goals": "top_scorer_goals"})
-    )
+    cached = _SCORER_STORE.get(code)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
 
-    # Merge into home team
-    feat_df = feat_df.merge(
-        team_max.rename(columns={"team_name": "home_team"}),
-        on="home_team",
-        how="left",
-    ).rename(columns={"top_scorer_goals": "home_top_scorer_goals"})
+    scorers = pd.read_csv(scorer_path)
+    team_max = scorers.groupby("team_name")["goals"].max().astype(float).to_dict()
+    _SCORER_STORE[code] = (mtime, team_max)
+    return team_max
 
-    # Merge into away team
-    feat_df = feat_df.merge(
-        team_max.rename(columns={"team_name": "away_team"}),
-        on="away_team",
-        how="left",
-    ).rename(columns={"top_scorer_goals": "away_top_scorer_goals"})
 
-    # Replace NaN (teams without scorer info) with 0
-    feat_df["home_top_scorer_goals"] = feat_df["home_top_scorer_goals"].fillna(0)
-    feat_df["away_top_scorer_goals"] = feat_df["away_top_scorer_goals"].fillna(0)
+def merge_scorer_features(feat_df: pd.DataFrame, competition_code: Optional[str] = None) -> pd.DataFrame:
+    """
+    Adds player-based attacking strength for home and away teams.
+    Uses top scorers data: scorers_{competition_code}.csv
+
+    competition_code defaults to infer_competition_code(feat_df). Teams
+    without scorer info (or competitions without a scorers file) get 0.
+    """
+    if competition_code is None:
+        competition_code = infer_competition_code(feat_df)
+
+    team_max = get_team_top_scorer_goals(competition_code)
+    if team_max is None:
+        print(f"Scorers file for {competition_code} not found — run fetch_scorers.py first.")
+        team_max = {}
+
+    feat_df = feat_df.copy()
+    feat_df["home_top_scorer_goals"] = feat_df["home_team"].map(team_max).fillna(0.0).astype(float)
+    feat_df["away_top_scorer_goals"] = feat_df["away_team"].map(team_max).fillna(0.0).astype(float)
 
     return feat_df
 
 
-def build_match_feature_table(df: pd.DataFrame, n_games: int = 5) -> pd.DataFrame:
+def build_match_feature_table(
+    df: pd.DataFrame,
+    n_games: int = 5,
+    windows: Optional[Sequence[int]] = None,
+    competition_code: Optional[str] = None,
+) -> pd.DataFrame:
     """
     Main entrypoint:
       - takes raw matches df (from CSV or API)
       - returns df with:
           - result ('H','D','A')
           - strong features for home & away team based on last n_games.
+
+    Multi-window mode: pass `windows` (e.g. [3, 5, 7, 10]) to build the long
+    table once and get every form feature for each window, suffixed with
+    window_suffix (home_goals_for_avg_n3, ...). Use select_feature_window to
+    get a single-window table out of it.
+
+    competition_code picks the scorers file (see merge_scorer_features);
+    if None it is inferred from the 'league' column.
     """
     base = prepare_base_matches(df)
     base = base.reset_index(drop=True)
     base["match_idx"] = base.index
 
     team_df = _build_team_long(base)
-    team_df = _add_rolling_form_features(team_df, n_games=n_games)
+    team_df = _add_rolling_form_features(team_df, n_games=n_games, windows=windows)
+
+    if windows is None:
+        form_cols = list(FORM_FEATURES)
+    else:
+        form_cols = [c + window_suffix(n) for n in windows for c in FORM_FEATURES]
 
     # Split back into home/away feature sets
-    home = team_df[team_df["is_home"] == 1].copy()
-    away = team_df[team_df["is_home"] == 0].copy()
-
-    home_feats = home[
-        [
-            "match_idx",
-            "goals_for_avg",
-            "goals_against_avg",
-            "goal_diff_avg",
-            "win_rate",
-            "points_avg",
-            "momentum",
-            "clean_sheet_rate",
-            "conceded_avg",
-            "weighted_points",
-        ]
-    ].rename(
-        columns={
-            "goals_for_avg": "home_goals_for_avg",
-            "goals_against_avg": "home_goals_against_avg",
-            "goal_diff_avg": "home_goal_diff_avg",
-            "win_rate": "home_win_rate",
-            "points_avg": "home_points_avg",
-            "momentum": "home_momentum",
-            "clean_sheet_rate": "home_clean_sheet_rate",
-            "conceded_avg": "home_conceded_avg",
-            "weighted_points": "home_weighted_points",
-        }
-    )
+    home = team_df[team_df["is_home"] == 1]
+    away = team_df[team_df["is_home"] == 0]
 
-    away_feats = away[
-        [
-            "match_idx",
-            "goals_for_avg",
-            "goals_against_avg",
-            "goal_diff_avg",
-            "win_rate",
-            "points_avg",
-            "momentum",
-            "clean_sheet_rate",
-            "conceded_avg",
-            "weighted_points",
-        ]
-    ].rename(
-        columns={
-            "goals_for_avg": "away_goals_for_avg",
-            "goals_against_avg": "away_goals_against_avg",
-            "goal_diff_avg": "away_goal_diff_avg",
-            "win_rate": "away_win_rate",
-            "points_avg": "away_points_avg",
-            "momentum": "away_momentum",
-            "clean_sheet_rate": "away_clean_sheet_rate",
-            "conceded_avg": "away_conceded_avg",
-            "weighted_points": "away_weighted_points",
-        }
+    home_feats = home[["match_idx"] + form_cols].rename(
+        columns={c: f"home_{c}" for c in form_cols}
+    )
+    away_feats = away[["match_idx"] + form_cols].rename(
+        columns={c: f"away_{c}" for c in form_cols}
     )
 
     feat_df = (
@@ -250,6 +358,183 @@ def build_match_feature_table(df: pd.DataFrame, n_games: int = 5) -> pd.DataFram
     )
 
     # Add scorer-based features
-    feat_df = merge_scorer_features(feat_df)
+    if competition_code is None:
+        competition_code = infer_competition_code(df)
+    feat_df = merge_scorer_features(feat_df, competition_code)
 
     return feat_df
+
+
+def select_feature_window(feat_df: pd.DataFrame, n_games: int) -> pd.DataFrame:
+    """
+    From a multi-window table (build_match_feature_table(..., windows=...)),
+    return the table for one window with the usual unsuffixed column names,
+    i.e. what build_match_feature_table(df, n_games=n_games) would return.
+    """
+    suffix = window_suffix(n_games)
+    wanted = {f"{side}_{c}{suffix}": f"{side}_{c}" for side in ("home", "away") for c in FORM_FEATURES}
+    missing = set(wanted) - set(feat_df.columns)
+    if missing:
+        raise ValueError(f"Window n_games={n_games} not in feature table (missing {sorted(missing)[:3]}...)")
+
+    windowed = {
+        f"{side}_{c}{window_suffix(n)}"
+        for side in ("home", "away")
+        for c in FORM_FEATURES
+        for n in _table_windows(feat_df)
+    }
+    # Same column order as the single-window table: form features after match_idx
+    rest = [c for c in feat_df.columns if c not in windowed]
+    pos = rest.index("match_idx") + 1
+    return feat_df[rest[:pos] + list(wanted) + rest[pos:]].rename(columns=wanted)
+
+
+def _table_windows(feat_df: pd.DataFrame) -> List[int]:
+    """Windows present in a multi-window feature table."""
+    prefix = f"home_{FORM_FEATURES[0]}_n"
+    return sorted(int(c[len(prefix):]) for c in feat_df.columns if c.startswith(prefix))
+
+
+class TeamFormState:
+    """
+    Per-team rolling state (last n_games goals/results) used to append
+    feature rows for newly finished matches without rebuilding the table.
+
+    Produces the same values as _add_rolling_form_features: the features of
+    a match only see the team's matches *before* it.
+    """
+
+    def __init__(self, n_games: int = 5):
+        self.n_games = n_games
+        # team -> deque of (goals_for, goals_against, result) for the last n_games
+        self.history: Dict[str, Deque[Tuple[float, float, int]]] = {}
+        # team -> number of matches already played
+        self.played: Dict[str, int] = {}
+        # (date, home_team, away_team) of every match already in the table
+        self.seen: Set[Tuple[pd.Timestamp, str, str]] = set()
+        self.last_date: Optional[pd.Timestamp] = None
+
+    @classmethod
+    def from_matches(cls, df: pd.DataFrame, n_games: int = 5) -> "TeamFormState":
+        """Build the state from raw matches (same input as build_match_feature_table)."""
+        base = prepare_base_matches(df).reset_index(drop=True)
+        state = cls(n_games=n_games)
+        if base.empty:
+            return state
+
+        team_df = _build_team_long(base)
+        state.played = team_df.groupby("team").size().to_dict()
+
+        tail = team_df.groupby("team").tail(n_games)
+        for team, gf, ga, res in zip(
+            tail["team"], tail["goals_for"], tail["goals_against"], tail["result"]
+        ):
+            state.history.setdefault(team, deque(maxlen=n_games)).append((gf, ga, res))
+
+        state.seen = set(zip(base["date"], base["home_team"], base["away_team"]))
+        state.last_date = base["date"].max()
+        return state
+
+    def team_features(self, team: str) -> Dict[str, float]:
+        """Form features for the team's NEXT match (same keys as FORM_FEATURES)."""
+        n = self.n_games
+        hist = self.history.get(team, ())
+        played = self.played.get(team, 0)
+
+        def _mean(values) -> float:
+            valid = [v for v in values if not pd.isna(v)]
+            return sum(valid) / len(valid) if valid else np.nan
+
+        goals_for = [h[0] for h in hist]
+        goals_against = [h[1] for h in hist]
+        points = [_POINTS.get(h[2], np.nan) for h in hist]
+
+        valid_points = [p for p in points if not pd.isna(p)]
+        rate_count = min(played + 1, n)
+
+        if played >= n and len(valid_points) == n:
+            weighted = sum((i + 1) * p for i, p in enumerate(points)) / (n * (n + 1) / 2.0)
+        else:
+            weighted = np.nan
+
+        return {
+            "goals_for_avg": _mean(goals_for),
+            "goals_against_avg": _mean(goals_against),
+            "goal_diff_avg": _mean([gf - ga for gf, ga in zip(goals_for, goals_against)]),
+            "win_rate": sum(1 for h in hist if h[2] == 1) / rate_count,
+            "points_avg": _mean(points),
+            "momentum": sum(valid_points) if valid_points else np.nan,
+            "clean_sheet_rate": sum(1 for ga in goals_against if ga == 0) / rate_count,
+            "conceded_avg": _mean(goals_against),
+            "weighted_points": weighted,
+        }
+
+    def push(self, team: str, goals_for: float, goals_against: float) -> None:
+        """Record a finished match for the team."""
+        if goals_for > goals_against:
+            result = 1
+        elif goals_for == goals_against:
+            result = 0
+        else:
+            result = -1
+        self.history.setdefault(team, deque(maxlen=self.n_games)).append(
+            (goals_for, goals_against, result)
+        )
+        self.played[team] = self.played.get(team, 0) + 1
+
+
+def append_match_feature_rows(
+    feat_df: pd.DataFrame,
+    new_matches: pd.DataFrame,
+    state: TeamFormState,
+    competition_code: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Incremental counterpart of build_match_feature_table: appends feature
+    rows for finished matches that are not in `state` yet and advances the
+    state. The rolling windows cost O(new matches); the returned frame is
+    a concat, so it is still a copy of the whole table.
+
+    Raises ValueError if a new match is older than the latest match already
+    in the state (history changed; do a full rebuild instead).
+    """
+    base = prepare_base_matches(new_matches).reset_index(drop=True)
+    if base.empty:
+        return feat_df
+
+    keys = list(zip(base["date"], base["home_team"], base["away_team"]))
+    base = base[[k not in state.seen for k in keys]].reset_index(drop=True)
+    if base.empty:
+        return feat_df
+
+    if state.last_date is not None and base["date"].min() < state.last_date:
+        raise ValueError(
+            "New matches are older than the latest match in the feature table; "
+            "rebuild it with build_match_feature_table."
+        )
+
+    start = int(feat_df["match_idx"].max()) + 1 if len(feat_df) else 0
+    base["match_idx"] = np.arange(start, start + len(base))
+
+    rows = []
+    for date, home_team, away_team, home_goals, away_goals in zip(
+        base["date"], base["home_team"], base["away_team"], base["home_goals"], base["away_goals"]
+    ):
+        home = state.team_features(home_team)
+        away = state.team_features(away_team)
+        row = {f"home_{k}": v for k, v in home.items()}
+        row.update({f"away_{k}": v for k, v in away.items()})
+        rows.append(row)
+
+        state.push(home_team, home_goals, away_goals)
+        state.push(away_team, away_goals, home_goals)
+        state.seen.add((date, home_team, away_team))
+
+    state.last_date = base["date"].max()
+
+    new_rows = pd.concat([base, pd.DataFrame(rows)], axis=1)
+    if competition_code is None:
+        competition_code = infer_competition_code(feat_df)
+    new_rows = merge_scorer_features(new_rows, competition_code)
+
+    return pd.concat([feat_df, new_rows], ignore_index=True)
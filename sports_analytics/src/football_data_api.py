@@ -1,12 +1,51 @@
+"""
+football-data.org v4 client.
+
+All requests go through one shared FootballDataClient: a pooled
+requests.Session (keep-alive, one TCP/TLS handshake per connection instead
+of per call), a token bucket sized to the API's per-minute quota, and
+retries with exponential backoff on 429/5xx and connection errors.
+fetch_competition_matches_many fetches several (competition, season) pairs
+at once through a thread pool sharing that client. Async endpoints use
+AsyncFootballDataClient (httpx) instead, on the same token bucket.
+
+Match lists are also kept in a disk cache (src.http_cache): finished past
+seasons never change, so they are stored forever; the current season and
+SCHEDULED fixtures expire after FOOTBALL_DATA_CACHE_TTL seconds and are then
+revalidated with a conditional request. Retraining therefore only hits the
+network for the current season.
+
+The base URL, quota and TTL come from the environment, so the client can
+be pointed at a local stand-in server:
+
+    FOOTBALL_DATA_BASE_URL              (default https://api.football-data.org/v4)
+    FOOTBALL_DATA_REQUESTS_PER_MINUTE   (default 10, the free tier quota)
+    FOOTBALL_DATA_CACHE_TTL             (default 300)
+    FOOTBALL_DATA_CACHE                 ("0" disables the disk cache)
+"""
+
+import asyncio
 import os
-from typing import Optional, Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Sequence, Tuple, Union
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 
+from src.http_cache import ResponseCache, get_response_cache
+from src.season_utils import get_current_season
+
 
 BASE_URL = "https://api.football-data.org/v4"
 DEFAULT_COMPETITION_CODE = "PL"
+DEFAULT_REQUESTS_PER_MINUTE = 10
+CURRENT_SEASON_CACHE_TTL = float(os.getenv("FOOTBALL_DATA_CACHE_TTL", "300"))
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
 
 
 class FootballDataApiError(Exception):
@@ -32,15 +71,281 @@ def _build_headers() -> Dict[str, str]:
     }
 
 
+class TokenBucket:
+    """
+    Thread-safe token bucket: `capacity` requests in a burst, refilled at
+    `rate_per_minute`. acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        wait = self._take()
+        while wait > 0:
+            time.sleep(wait)
+            wait = self._take()
+
+    async def acquire_async(self) -> None:
+        """acquire() for the event loop: waits with asyncio.sleep."""
+        wait = self._take()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self._take()
+
+
+def _retry_delay(attempt: int, backoff_factor: float, response: Any = None) -> float:
+    """Retry-After when the server sends one (429), else exponential backoff."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+    return backoff_factor * (2 ** attempt)
+
+
+class FootballDataClient:
+    """Pooled, rate-limited, retrying GET client for the football-data.org API."""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        requests_per_minute: Optional[float] = None,
+        max_retries: int = 3,
+        backoff_factor: float = 1.0,
+        pool_size: int = 8,
+        timeout: float = 15,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.base_url = (base_url or os.getenv("FOOTBALL_DATA_BASE_URL") or BASE_URL).rstrip("/")
+        if requests_per_minute is None:
+            requests_per_minute = float(
+                os.getenv("FOOTBALL_DATA_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE)
+            )
+        self.bucket = TokenBucket(requests_per_minute)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.cache = cache
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get_json(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        cache_ttl: Optional[float] = 0,
+    ) -> Dict[str, Any]:
+        """
+        GET {base_url}/{path} and return the JSON body.
+
+        With a cache, cache_ttl is how long the response stays fresh
+        (None = forever, 0 = not cached). A stale entry is revalidated with
+        If-None-Match / If-Modified-Since; a 304 serves the stored body.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        headers = _build_headers()
+
+        key = entry = None
+        if self.cache is not None and cache_ttl != 0:
+            key = self.cache.key(path, params)
+            entry = self.cache.get(key)
+            if entry is not None:
+                if self.cache.is_fresh(entry):
+                    self.cache.hits += 1
+                    return entry["body"]
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self._get(url, headers, params)
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.revalidated += 1
+            self.cache.touch(key, entry, cache_ttl)
+            return entry["body"]
+
+        body = response.json()
+        if key is not None:
+            self.cache.misses += 1
+            self.cache.put(
+                key,
+                path,
+                params,
+                body,
+                cache_ttl,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        return body
+
+    def _get(self, url: str, headers: Dict[str, str], params: Optional[Dict[str, Any]]) -> requests.Response:
+        """
+        One logical GET. Every attempt takes a token from the bucket;
+        429/5xx and connection errors are retried up to max_retries times,
+        other answers besides 200/304 raise FootballDataApiError.
+        """
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            response = None
+            try:
+                response = self.session.get(url, headers=headers, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise FootballDataApiError(f"API request failed: {e}") from e
+            else:
+                if response.status_code in (200, 304):
+                    return response
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    raise FootballDataApiError(
+                        f"API request failed ({response.status_code}): {response.text}"
+                    )
+
+            delay = _retry_delay(attempt, self.backoff_factor, response)
+            attempt += 1
+            print(f"[football_data_api] Retry {attempt}/{self.max_retries} for {url} in {delay:.1f}s")
+            time.sleep(delay)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_default_client: Optional[FootballDataClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> FootballDataClient:
+    """Client (session + rate limit + disk cache) shared by the whole process."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            cache = None if os.getenv("FOOTBALL_DATA_CACHE") == "0" else get_response_cache()
+            _default_client = FootballDataClient(cache=cache)
+        return _default_client
+
+
+class AsyncFootballDataClient:
+    """
+    Non-blocking counterpart of FootballDataClient for async endpoints:
+    httpx.AsyncClient (pooled, keep-alive), same retry policy, and the same
+    token bucket as the sync client by default, so both count against one
+    per-minute quota. No disk cache: callers cache in process (see
+    src.schedule_cache).
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        bucket: Optional[TokenBucket] = None,
+        max_retries: int = 3,
+        backoff_factor: float = 1.0,
+        pool_size: int = 8,
+        timeout: float = 15,
+    ):
+        self.base_url = (base_url or os.getenv("FOOTBALL_DATA_BASE_URL") or BASE_URL).rstrip("/")
+        self.bucket = bucket or get_default_client().bucket
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """GET {base_url}/{path}; retries and errors as in FootballDataClient."""
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        headers = _build_headers()
+
+        attempt = 0
+        while True:
+            await self.bucket.acquire_async()
+            response = None
+            try:
+                response = await self.client.get(url, headers=headers, params=params)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise FootballDataApiError(f"API request failed: {e}") from e
+            else:
+                if response.status_code == 200:
+                    return response.json()
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    raise FootballDataApiError(
+                        f"API request failed ({response.status_code}): {response.text}"
+                    )
+
+            delay = _retry_delay(attempt, self.backoff_factor, response)
+            attempt += 1
+            print(f"[football_data_api] Retry {attempt}/{self.max_retries} for {url} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+_async_client: Optional[AsyncFootballDataClient] = None
+
+
+def get_async_client() -> AsyncFootballDataClient:
+    """
+    Async client shared by the process. httpx ties its pool to the running
+    event loop, so call close_async_client() on shutdown.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncFootballDataClient()
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def matches_cache_ttl(season: Optional[int], status: Optional[str]) -> Optional[float]:
+    """
+    How long a match list stays fresh in the disk cache: forever (None) for
+    a past season, CURRENT_SEASON_CACHE_TTL for the current one (or no
+    season) and for SCHEDULED fixtures.
+    """
+    if status == "SCHEDULED" or season is None or season >= get_current_season():
+        return CURRENT_SEASON_CACHE_TTL
+    return None
+
+
 def fetch_competition_matches_raw(
     competition_code: str = DEFAULT_COMPETITION_CODE,
     season: Optional[int] = None,
     status: Optional[str] = "FINISHED",
+    client: Optional[FootballDataClient] = None,
 ) -> Dict[str, Any]:
     """
     Call /v4/competitions/{code}/matches and return raw JSON.
     """
-    url = f"{BASE_URL}/competitions/{competition_code}/matches"
     params: Dict[str, Any] = {}
 
     if season is not None:
@@ -48,14 +353,12 @@ def fetch_competition_matches_raw(
     if status is not None:
         params["status"] = status
 
-    response = requests.get(url, headers=_build_headers(), params=params, timeout=15)
-
-    if response.status_code != 200:
-        raise FootballDataApiError(
-            f"API request failed ({response.status_code}): {response.text}"
-        )
-
-    return response.json()
+    client = client or get_default_client()
+    return client.get_json(
+        f"competitions/{competition_code}/matches",
+        params=params,
+        cache_ttl=matches_cache_ttl(season, status),
+    )
 
 
 def matches_json_to_df(json_data: Dict[str, Any]) -> pd.DataFrame:
@@ -117,10 +420,59 @@ def fetch_competition_matches_df(
     competition_code: str = DEFAULT_COMPETITION_CODE,
     season: Optional[int] = None,
     status: Optional[str] = "FINISHED",
+    client: Optional[FootballDataClient] = None,
 ) -> pd.DataFrame:
     json_data = fetch_competition_matches_raw(
         competition_code=competition_code,
         season=season,
         status=status,
+        client=client,
     )
-    return matches_json_to_df(json_data)
\ No newline at end of file
+    return matches_json_to_df(json_data)
+
+
+def fetch_competition_matches_many(
+    jobs: Sequence[Tuple[str, Optional[int]]],
+    status: Optional[str] = "FINISHED",
+    client: Optional[FootballDataClient] = None,
+    max_workers: Optional[int] = None,
+) -> List[Union[pd.DataFrame, FootballDataApiError]]:
+    """
+    Fetch several (competition_code, season) pairs concurrently.
+
+    Results come back in the order of `jobs`; a pair that failed yields its
+    FootballDataApiError instead of a DataFrame, so one bad season does not
+    discard the others. The shared token bucket still caps the request rate.
+    """
+    client = client or get_default_client()
+    if not jobs:
+        return []
+
+    def _fetch(job: Tuple[str, Optional[int]]) -> Union[pd.DataFrame, FootballDataApiError]:
+        competition_code, season = job
+        try:
+            return fetch_competition_matches_df(competition_code, season, status=status, client=client)
+        except FootballDataApiError as e:
+            return e
+
+    workers = max_workers or min(len(jobs), client.pool_size)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_fetch, jobs))
+
+
+async def fetch_competition_matches_df_async(
+    competition_code: str = DEFAULT_COMPETITION_CODE,
+    season: Optional[int] = None,
+    status: Optional[str] = "FINISHED",
+    client: Optional[AsyncFootballDataClient] = None,
+) -> pd.DataFrame:
+    """fetch_competition_matches_df without blocking the event loop."""
+    params: Dict[str, Any] = {}
+    if season is not None:
+        params["season"] = season
+    if status is not None:
+        params["status"] = status
+
+    client = client or get_async_client()
+    json_data = await client.get_json(f"competitions/{competition_code}/matches", params=params)
+    return matches_json_to_df(json_data)
@@ -1,23 +1,25 @@
-import requests
+from typing import Optional
+
 import pandas as pd
 
-from src.football_data_api import BASE_URL, _build_headers
+from src.football_data_api import FootballDataApiError, FootballDataClient, get_default_client
 
 
-def fetch_top_scorers(competition_code: str = "PL", limit: int = 40) -> pd.DataFrame:
+def fetch_top_scorers(
+    competition_code: str = "PL",
+    limit: int = 40,
+    client: Optional[FootballDataClient] = None,
+) -> pd.DataFrame:
     """
     Fetch top scorers from football-data.org API.
     Returns a DataFrame with: player_name, team_name, goals
     """
-    url = f"{BASE_URL}/competitions/{competition_code}/scorers"
-    params = {"limit": limit}
-
-    response = requests.get(url, headers=_build_headers(), params=params, timeout=10)
-
-    if response.status_code != 200:
-        raise ValueError(f"Error fetching scorers: {response.text}")
+    client = client or get_default_client()
+    try:
+        data = client.get_json(f"competitions/{competition_code}/scorers", params={"limit": limit})
+    except FootballDataApiError as e:
+        raise ValueError(f"Error fetching scorers: {e}") from e
 
-    data = response.json()
     rows = []
 
     for entry in data.get("scorers", []):
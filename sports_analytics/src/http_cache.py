@@ -0,0 +1,156 @@
+"""
+On-disk cache of football-data.org JSON responses.
+
+Each response is stored as one JSON file keyed by a hash of the request
+path and params:
+
+    models/http_cache/<sha256>.json
+        {"path", "params", "stored_at", "expires_at", "etag", "last_modified", "body"}
+
+expires_at is None for responses that never change (finished past
+seasons); otherwise the entry is fresh until then. A stale entry is not
+dropped: its ETag / Last-Modified are sent back as If-None-Match /
+If-Modified-Since, and a 304 just extends it (see FootballDataClient).
+Least recently used files are evicted once the directory grows past
+max_bytes, like the feature cache.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "models", "http_cache"
+)
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+
+
+class ResponseCache:
+    """Directory of cached JSON responses with TTLs and size-bounded LRU eviction."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0  # stale entries confirmed by a 304
+
+    def key(self, path: str, params: Optional[Dict[str, Any]] = None) -> str:
+        payload = json.dumps([path, params or {}], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    @staticmethod
+    def is_fresh(entry: Dict[str, Any]) -> bool:
+        expires_at = entry.get("expires_at")
+        return expires_at is None or time.time() < expires_at
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Stored entry (fresh or stale), or None. Files can be evicted or
+        replaced by another thread/process between any two calls here; one
+        that vanishes is just a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            # Corrupted / partial entry: drop it and fetch again
+            print(f"[http_cache] Ignoring unreadable entry {path}: {e}")
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used for eviction
+        except FileNotFoundError:  # evicted right after the read; entry is still valid
+            pass
+        return entry
+
+    def put(
+        self,
+        key: str,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        body: Dict[str, Any],
+        ttl: Optional[float],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Store a response; ttl=None keeps it forever."""
+        now = time.time()
+        entry = {
+            "path": path,
+            "params": params or {},
+            "stored_at": now,
+            "expires_at": None if ttl is None else now + ttl,
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": body,
+        }
+        self._write(key, entry)
+        return entry
+
+    def touch(self, key: str, entry: Dict[str, Any], ttl: Optional[float]) -> None:
+        """Entry revalidated by the server (304): restart its TTL."""
+        entry["expires_at"] = None if ttl is None else time.time() + ttl
+        self._write(key, entry)
+
+    def _write(self, key: str, entry: Dict[str, Any]) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.tmp{os.getpid()}_{threading.get_ident()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)  # atomic: readers never see half a file
+
+        self._evict(keep=path)
+
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not name.endswith(".json"):
+                continue
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:  # evicted by another thread meanwhile
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "revalidated": self.revalidated}
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache under models/http_cache/."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
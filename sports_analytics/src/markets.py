@@ -0,0 +1,173 @@
+"""
+Mercados derivados da grade de placares do modelo Poisson (xG).
+
+A partir de λ_home / λ_away montamos a grade completa P(gh, ga) (ver
+xg_utils.poisson_score_grid) e extraímos dela, sem simular nada:
+
+- placar exato (correct score)
+- over/under de gols totais
+- ambos marcam (BTTS)
+- handicap asiático (linhas inteiras e de meio gol)
+
+As grades ficam num cache em memória indexado por (λ_home, λ_away)
+quantizados: confrontos com λ praticamente iguais reaproveitam a mesma
+grade, então uma rodada inteira (de todas as ligas) é calculada uma vez e
+servida da memória depois.
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.xg_utils import poisson_score_grid
+
+DEFAULT_TOTALS_LINES: Tuple[float, ...] = (0.5, 1.5, 2.5, 3.5, 4.5)
+DEFAULT_HANDICAP_LINES: Tuple[float, ...] = (-2.5, -2.0, -1.5, -1.0, -0.5, 0.0, 0.5, 1.0, 1.5, 2.0, 2.5)
+
+
+class ScoreGridCache:
+    """
+    LRU de grades de placares normalizadas, chave = (λ_home, λ_away)
+    arredondados para múltiplos de `step`.
+    """
+
+    def __init__(self, step: float = 0.01, max_goals: int = 8, max_entries: int = 4096):
+        self.step = step
+        self.max_goals = max_goals
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._grids: "OrderedDict[Tuple[int, int], np.ndarray]" = OrderedDict()
+
+    def key(self, lambda_home: float, lambda_away: float) -> Tuple[int, int]:
+        return int(round(lambda_home / self.step)), int(round(lambda_away / self.step))
+
+    def get(self, lambda_home: float, lambda_away: float) -> np.ndarray:
+        """Grade (max_goals + 1, max_goals + 1) para o par de λ (quantizado)."""
+        key = self.key(lambda_home, lambda_away)
+        grid = self._grids.get(key)
+        if grid is not None:
+            self._grids.move_to_end(key)
+            self.hits += 1
+            return grid
+
+        self.misses += 1
+        grid = poisson_score_grid(key[0] * self.step, key[1] * self.step, self.max_goals)[0]
+        total = grid.sum()
+        if total > 0:
+            grid = grid / total
+        grid.setflags(write=False)
+
+        self._grids[key] = grid
+        if len(self._grids) > self.max_entries:
+            self._grids.popitem(last=False)
+        return grid
+
+    def __len__(self) -> int:
+        return len(self._grids)
+
+
+_default_cache: Optional[ScoreGridCache] = None
+
+
+def get_score_grid_cache() -> ScoreGridCache:
+    """Cache de grades compartilhado pelo processo."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ScoreGridCache()
+    return _default_cache
+
+
+def _goal_diff_distribution(grid: np.ndarray) -> np.ndarray:
+    """P(gh - ga = d) para d = -max_goals..max_goals (índice d + max_goals)."""
+    size = grid.shape[0]
+    gh, ga = np.indices(grid.shape)
+    return np.bincount((gh - ga + size - 1).ravel(), weights=grid.ravel(), minlength=2 * size - 1)
+
+
+def _total_goals_distribution(grid: np.ndarray) -> np.ndarray:
+    """P(gh + ga = t) para t = 0..2*max_goals."""
+    size = grid.shape[0]
+    gh, ga = np.indices(grid.shape)
+    return np.bincount((gh + ga).ravel(), weights=grid.ravel(), minlength=2 * size - 1)
+
+
+def markets_from_grid(
+    grid: np.ndarray,
+    top_scores: int = 10,
+    totals_lines: Sequence[float] = DEFAULT_TOTALS_LINES,
+    handicap_lines: Sequence[float] = DEFAULT_HANDICAP_LINES,
+) -> Dict:
+    """
+    Deriva os mercados de uma grade de placares normalizada.
+
+    Linhas de handicap são do ponto de vista do mandante (-1.0 = mandante
+    "dá" um gol). Em linhas inteiras existe o push (aposta devolvida).
+    """
+    size = grid.shape[0]
+
+    # Placar exato: os `top_scores` placares mais prováveis
+    flat_order = np.argsort(grid, axis=None)[::-1][:top_scores]
+    correct_score: List[Dict] = [
+        {
+            "home_goals": int(i // size),
+            "away_goals": int(i % size),
+            "prob": float(grid.flat[i]),
+        }
+        for i in flat_order
+    ]
+
+    # Over/under: cada linha é uma soma mascarada da distribuição de gols totais
+    totals_dist = _total_goals_distribution(grid)
+    goals = np.arange(totals_dist.shape[0])
+    t_lines = np.asarray(totals_lines, dtype=float)[:, None]
+    over = (goals > t_lines) @ totals_dist
+    under = (goals < t_lines) @ totals_dist
+    totals = [
+        {"line": float(line), "over": float(o), "under": float(u)}
+        for line, o, u in zip(totals_lines, over, under)
+    ]
+
+    # Ambos marcam: massa da grade com gh >= 1 e ga >= 1
+    btts_yes = float(grid[1:, 1:].sum())
+    btts_no = float(grid.sum()) - btts_yes
+
+    # Handicap asiático (mandante com `line` gols de vantagem/desvantagem)
+    diff_probs = _goal_diff_distribution(grid)
+    adjusted = np.arange(-(size - 1), size, dtype=float) + np.asarray(handicap_lines, dtype=float)[:, None]
+    ah_home = (adjusted > 0) @ diff_probs
+    ah_push = (adjusted == 0) @ diff_probs
+    ah_away = (adjusted < 0) @ diff_probs
+    asian_handicap = [
+        {"line": float(line), "home": float(h), "push": float(p), "away": float(a)}
+        for line, h, p, a in zip(handicap_lines, ah_home, ah_push, ah_away)
+    ]
+
+    return {
+        "outcome": {
+            "home": float(np.tril(grid, k=-1).sum()),
+            "draw": float(np.trace(grid)),
+            "away": float(np.triu(grid, k=1).sum()),
+        },
+        "correct_score": correct_score,
+        "totals": totals,
+        "btts": {"yes": btts_yes, "no": btts_no},
+        "asian_handicap": asian_handicap,
+    }
+
+
+def scoreline_markets(
+    lambda_home: float,
+    lambda_away: float,
+    cache: Optional[ScoreGridCache] = None,
+    **kwargs,
+) -> Dict:
+    """
+    Mercados (placar exato, over/under, BTTS, handicap asiático) para um
+    confronto, usando a grade em cache para o par (λ_home, λ_away).
+    kwargs são repassados para markets_from_grid.
+    """
+    if cache is None:
+        cache = get_score_grid_cache()
+    return markets_from_grid(cache.get(lambda_home, lambda_away), **kwargs)
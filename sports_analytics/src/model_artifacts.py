@@ -0,0 +1,295 @@
+"""
+Flat, memory-mappable artifacts for the RandomForest outcome model.
+
+joblib.load of a 400-tree forest rebuilds every sklearn Tree (copying its
+node arrays), so each uvicorn worker pays the full load time and keeps its
+own copy in RAM. Here the forest is stored as a directory of plain .npy
+arrays, with all trees concatenated:
+
+    <artifact>/meta.json            classes, feature cols, schema hash, offsets
+    <artifact>/nodes.npy            record  (threshold, feature, left, right) per node;
+                                            left/right are global node indices
+                                            (int32) and leaves point to themselves
+    <artifact>/missing_left.npy     bool    NaN goes left at this node
+    <artifact>/value.npy            float64 leaf class probabilities
+    <artifact>/roots.npy            int64   root node of each tree
+
+Arrays are opened with np.load(mmap_mode="r"), so workers share the same
+page-cache pages. Node indices are stored as int32 (sklearn uses int64) to
+halve the index arrays. The node fields live only in the packed records:
+an earlier format also kept them as separate arrays, doubling the artifact.
+
+FlatForest.predict_proba reproduces sklearn's predict_proba exactly: X is
+cast to float32 like sklearn does, leaf values are normalised per node with
+the same operations, and trees are summed in order.
+
+FlatForest.predict_proba_rows is the per-request path for one or a few
+rows: no DataFrame, no validation, and a fixed number of steps (max_depth)
+that move every tree one level down at once. Each step is one gather on
+`nodes` (one cache miss per tree, not one per field). Leaves point to
+themselves, so trees that finish early just stay put and no per-step
+masking is needed.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+FORMAT_VERSION = 3
+
+_ARRAYS = (
+    "nodes",
+    "missing_left",
+    "value",
+    "roots",
+)
+
+_NODE_DTYPE = np.dtype(
+    [("threshold", np.float64), ("feature", np.int32), ("left", np.int32), ("right", np.int32)]
+)
+
+
+def feature_schema_hash(feature_cols: Sequence[str]) -> str:
+    """Short hash of the ordered feature columns a model was trained on."""
+    return hashlib.sha256("\n".join(feature_cols).encode()).hexdigest()[:16]
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (Linux /proc, else peak RSS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class FlatForest:
+    """predict_proba over concatenated node arrays (drop-in for the RF at serving time)."""
+
+    def __init__(
+        self,
+        arrays: dict,
+        classes: Sequence,
+        feature_cols: List[str],
+        schema_hash: Optional[str] = None,
+        max_depth: Optional[int] = None,
+    ):
+        # Plain ndarray views (still backed by the mmap): np.memmap results go
+        # through subclass hooks on every take(), which dominates per-row latency.
+        arrays = {name: np.asarray(arr) for name, arr in arrays.items()}
+        self.nodes = arrays["nodes"]
+        self.missing_left = arrays["missing_left"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+
+        self.classes_ = np.asarray(classes)
+        self.n_classes_ = len(self.classes_)
+        self.n_estimators = len(self.roots)
+        self.feature_cols = list(feature_cols)
+        self.n_features_in_ = len(self.feature_cols)
+        self.schema_hash = schema_hash or feature_schema_hash(self.feature_cols)
+        self.max_depth = int(max_depth) if max_depth is not None else self._depth()
+
+    @classmethod
+    def from_sklearn(cls, model, feature_cols: Sequence[str]) -> "FlatForest":
+        """Concatenate the trees of a fitted RandomForestClassifier."""
+        feature, threshold, left, right, missing, value, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for est in model.estimators_:
+            tree = est.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+
+            roots.append(offset)
+            feature.append(tree.feature)
+            threshold.append(tree.threshold)
+            left.append(np.where(is_leaf, -1, tree.children_left + offset))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset))
+            missing.append(
+                getattr(tree, "missing_go_to_left", np.zeros(n_nodes, dtype=np.uint8)).astype(bool)
+            )
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, : est.n_classes_].copy()
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+            value.append(proba)
+
+            offset += n_nodes
+            max_depth = max(max_depth, int(tree.max_depth))
+
+        arrays = {
+            "nodes": _node_records(
+                np.concatenate(feature),
+                np.concatenate(threshold),
+                np.concatenate(left),
+                np.concatenate(right),
+            ),
+            "missing_left": np.concatenate(missing),
+            "value": np.concatenate(value),
+            "roots": np.asarray(roots, dtype=np.int64),
+        }
+        return cls(arrays, model.classes_, list(feature_cols), max_depth=max_depth)
+
+    def _depth(self) -> int:
+        """Deepest leaf over all trees (number of steps predict_proba_rows takes)."""
+        nodes = np.asarray(self.roots)
+        depth = 0
+        while True:
+            nodes = nodes[self.nodes["left"][nodes] != nodes]
+            if not len(nodes):
+                return depth
+            node = self.nodes[nodes]
+            nodes = np.concatenate([node["left"], node["right"]])
+            depth += 1
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf index (global) reached by each row in each tree: (n_rows, n_trees)."""
+        X = np.asarray(X, dtype=np.float32)
+        n_rows = X.shape[0]
+
+        nodes = np.repeat(self.roots[None, :], n_rows, axis=0)
+        rows = np.repeat(np.arange(n_rows)[:, None], self.n_estimators, axis=1)
+
+        # Leaves point to themselves: a node is active while its left child differs
+        active = self.nodes["left"][nodes] != nodes
+        while active.any():
+            node_ids = nodes[active]
+            node = self.nodes[node_ids]
+            x = X[rows[active], node["feature"]]
+            go_left = (x <= node["threshold"]) | (np.isnan(x) & self.missing_left[node_ids])
+            nodes[active] = np.where(go_left, node["left"], node["right"])
+            active = self.nodes["left"][nodes] != nodes
+        return nodes
+
+    def predict_proba(self, X) -> np.ndarray:
+        # Adds one tree at a time, in the same order as sklearn (so the sums
+        # match bit for bit) and without a (n_rows, n_trees, n_classes) tensor:
+        # memory stays at the (n_rows, n_trees) leaf indices.
+        leaves = np.ascontiguousarray(self.apply(X).T)
+        proba = np.zeros((leaves.shape[1], self.value.shape[1]))
+        for tree_leaves in leaves:
+            proba += self.value[tree_leaves]
+        return proba / self.n_estimators
+
+    def predict_proba_rows(self, X: np.ndarray) -> np.ndarray:
+        """
+        predict_proba for one or a few rows already in feature_cols order,
+        as a (n_features,) or (n_rows, n_features) array. Skips every check
+        predict_proba does; rows with NaN go through apply() instead, since
+        the fixed-step walk below does not know missing_left.
+        """
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.n_features_in_)
+        if np.isnan(X).any():
+            return self.predict_proba(X)
+
+        # float32 -> float64 is exact; doing it once saves a cast per step
+        x = X.astype(np.float64).ravel()
+        row_offset = (np.arange(X.shape[0]) * self.n_features_in_)[:, None]
+        nodes = np.broadcast_to(np.asarray(self.roots), (X.shape[0], self.n_estimators))
+        for _ in range(self.max_depth):
+            node = self.nodes.take(nodes)
+            go_right = x.take(row_offset + node["feature"]) > node["threshold"]
+            nodes = np.where(go_right, node["right"], node["left"])
+
+        leaf_values = self.value.take(nodes, axis=0)
+        return np.cumsum(leaf_values, axis=1)[:, -1, :] / self.n_estimators
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, path: str) -> None:
+        """Write the artifact directory, replacing an existing one."""
+        suffix = f"{os.getpid()}_{threading.get_ident()}"
+        tmp_path = f"{path}.tmp{suffix}"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        for name in _ARRAYS:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "classes": [str(c) for c in self.classes_],
+            "feature_cols": self.feature_cols,
+            "schema_hash": self.schema_hash,
+            "n_estimators": int(self.n_estimators),
+            "n_nodes": int(len(self.nodes)),
+            "max_depth": self.max_depth,
+        }
+        with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=1)
+
+        old_path = f"{path}.old{suffix}"
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        if os.path.exists(old_path):
+            shutil.rmtree(old_path)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = "r") -> "FlatForest":
+        """Open an artifact directory; with mmap_mode the arrays are not read into RAM."""
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported model artifact format {meta.get('format_version')} in {path}"
+            )
+
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in _ARRAYS
+        }
+        return cls(
+            arrays, meta["classes"], meta["feature_cols"], meta["schema_hash"], meta["max_depth"]
+        )
+
+
+def _node_records(feature, threshold, left, right) -> np.ndarray:
+    """One packed record per node from sklearn-style arrays (-1 = leaf); leaves point to themselves."""
+    node_ids = np.arange(len(feature), dtype=np.int32)
+    is_leaf = left == -1
+
+    nodes = np.empty(len(node_ids), dtype=_NODE_DTYPE)
+    nodes["threshold"] = threshold
+    nodes["feature"] = np.where(is_leaf, 0, feature)
+    nodes["left"] = np.where(is_leaf, node_ids, left)
+    nodes["right"] = np.where(is_leaf, node_ids, right)
+    return nodes
+
+
+def export_flat_forest(model, feature_cols: Sequence[str], X_check) -> FlatForest:
+    """
+    FlatForest for a fitted RandomForestClassifier, checked against sklearn.
+
+    Both FlatForest paths must reproduce model.predict_proba on X_check
+    exactly; sklearn is evaluated with n_jobs=1 because threaded
+    predict_proba adds the trees in whatever order they finish.
+    """
+    flat = FlatForest.from_sklearn(model, feature_cols)
+
+    n_jobs = model.n_jobs
+    model.n_jobs = 1
+    try:
+        expected = model.predict_proba(X_check)
+    finally:
+        model.n_jobs = n_jobs
+
+    X_check = np.asarray(X_check)
+    if not np.array_equal(flat.predict_proba(X_check), expected):
+        raise ValueError("FlatForest.predict_proba differs from the sklearn forest")
+    if not np.array_equal(flat.predict_proba_rows(X_check), expected):
+        raise ValueError("FlatForest.predict_proba_rows differs from the sklearn forest")
+    return flat
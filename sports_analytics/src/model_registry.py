@@ -0,0 +1,381 @@
+"""
+Registro de modelos + feature tables de serving por (competição, temporada).
+
+Cada /train_model grava os artefatos da liga em models/:
+
+  - train_league_{comp}_{season}.joblib      modelo sklearn
+  - train_league_{comp}_{season}_flat/       mesmo modelo em arrays mmap (FlatForest)
+  - train_league_{comp}_{season}_matches.pkl partidas usadas no treino
+  - train_league_{comp}_{season}_meta.json   {"competition_code", "season", "n_games", ...}
+
+O ModelRegistry carrega essas entradas sob demanda (primeiro request da liga)
+e mantém em memória no máximo `max_entries`, descartando a menos usada
+recentemente (LRU). Uma entrada descartada é recarregada do disco quando
+voltar a ser pedida; as feature tables saem do cache em disco
+(src.feature_cache), então a recarga não refaz o cálculo das features.
+"""
+
+import glob
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src.advanced_model import build_dataset_cached, build_feature_table_cached
+from src.features import TeamFormState
+from src.model_artifacts import FlatForest, feature_schema_hash
+from src.serving_index import FeatureIndex
+from src.team_registry import TeamRegistry, compact_feature_table, get_team_registry
+from src.xg_utils import build_xg_context_from_feature_df
+
+DEFAULT_MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
+
+# Versões de modelo / feature table: únicas no processo, então nunca se
+# repetem entre entradas (ex.: a mesma liga recarregada depois de um treino)
+_versions = itertools.count(1)
+
+
+class ServingEntry:
+    """
+    Tudo que o serving precisa para uma liga/temporada: modelo, feature cols,
+    feature table compacta + índice de último estado por time, contexto de xG
+    (memoizado por versão) e o estado para /refresh_features.
+
+    model_version e feature_version mudam a cada troca do modelo / da tabela
+    e identificam o que o serving está usando (ex.: chave do cache de
+    respostas em main.py).
+    """
+
+    def __init__(
+        self,
+        competition_code: str,
+        season: Optional[int],
+        model: Any = None,
+        feature_cols: Optional[List[str]] = None,
+        team_registry: Optional[TeamRegistry] = None,
+    ):
+        self.competition_code = competition_code.upper()
+        self.season = season
+        self.model = model  # define model_version (ver o setter)
+        self.feature_cols: List[str] = list(feature_cols or [])
+        self.team_registry = team_registry or get_team_registry()
+
+        self.feature_df: Optional[pd.DataFrame] = None
+        self.feature_index: Optional[FeatureIndex] = None
+        self.feature_version = next(_versions)  # nova a cada troca da tabela
+        self._xg_ctx: Optional[Tuple[int, Optional[dict]]] = None
+        self._lock = threading.Lock()  # troca da tabela x leitura da versão
+
+        self.form_df: Optional[pd.DataFrame] = None
+        self.form_state: Optional[TeamFormState] = None
+        self.refresh_lock = threading.Lock()  # um /refresh_features por vez
+
+    @property
+    def key(self) -> Tuple[str, Optional[int]]:
+        return self.competition_code, self.season
+
+    @property
+    def model(self) -> Any:
+        return self._model
+
+    @model.setter
+    def model(self, model: Any) -> None:
+        self._model = model
+        self.model_version = next(_versions)
+
+    def set_feature_df(
+        self,
+        feat_df: Optional[pd.DataFrame],
+        form_df: Optional[pd.DataFrame] = None,
+        form_state: Optional[TeamFormState] = None,
+    ) -> None:
+        """
+        Publica a feature table em formato compacto (IDs int16 por time,
+        colunas category e features float32; ver compact_feature_table) e
+        reconstrói o índice de último estado por time (chaveado pelos IDs). form_df/form_state, se informados, são
+        publicados na mesma troca (tabela de forma e estado rolante que
+        geraram feat_df).
+
+        Tabela e índice ficam prontos antes da troca; feature_version muda
+        por último, junto com eles, então quem lê a versão nova (cache de
+        respostas, xg_context) já encontra a tabela nova.
+        """
+        compact = index = None
+        if feat_df is not None:
+            compact = compact_feature_table(feat_df, self.team_registry, self.competition_code)
+            index = FeatureIndex(compact, self.team_registry.ids(self.competition_code))
+            before_kb = feat_df.memory_usage(deep=True).sum() / 1024
+            after_kb = compact.memory_usage(deep=True).sum() / 1024
+            print(
+                f"[features] Feature table {self.competition_code} compactada: "
+                f"{before_kb:.0f} KB -> {after_kb:.0f} KB"
+            )
+
+        with self._lock:
+            if form_df is not None:
+                self.form_df = form_df
+            if form_state is not None:
+                self.form_state = form_state
+            self.feature_df = compact
+            self.feature_index = index
+            self.feature_version = next(_versions)
+
+    def xg_context(self) -> Optional[dict]:
+        """Contexto de xG da feature table, reconstruído só quando a tabela muda."""
+        with self._lock:
+            version, feat_df, cached = self.feature_version, self.feature_df, self._xg_ctx
+        if cached is None or cached[0] != version:
+            cached = (version, build_xg_context_from_feature_df(feat_df))
+            with self._lock:
+                if self.feature_version == version:
+                    self._xg_ctx = cached
+        return cached[1]
+
+    def teams(self) -> List[str]:
+        if self.feature_df is None:
+            return []
+        return sorted(
+            set(self.feature_df["home_team"].dropna().unique())
+            | set(self.feature_df["away_team"].dropna().unique())
+        )
+
+
+class ModelRegistry:
+    """LRU de ServingEntry por (competição, temporada), com carga preguiçosa do disco."""
+
+    def __init__(
+        self,
+        models_dir: str = DEFAULT_MODELS_DIR,
+        max_entries: int = 4,
+    ):
+        self.models_dir = models_dir
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], ServingEntry]" = OrderedDict()
+        self._disk_seasons: Dict[str, List[int]] = {}  # cache do glob em models/
+        self._loading: Dict[Tuple[str, int], "Future[ServingEntry]"] = {}  # cargas em andamento
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Caminhos dos artefatos
+    # ------------------------------------------------------------------
+
+    def artifact_prefix(self, competition_code: str, season: int) -> str:
+        return os.path.join(self.models_dir, f"train_league_{competition_code.lower()}_{season}")
+
+    def model_path(self, competition_code: str, season: int) -> str:
+        return f"{self.artifact_prefix(competition_code, season)}.joblib"
+
+    def flat_model_path(self, competition_code: str, season: int) -> str:
+        return f"{self.artifact_prefix(competition_code, season)}_flat"
+
+    def matches_path(self, competition_code: str, season: int) -> str:
+        return f"{self.artifact_prefix(competition_code, season)}_matches.pkl"
+
+    def meta_path(self, competition_code: str, season: int) -> str:
+        return f"{self.artifact_prefix(competition_code, season)}_meta.json"
+
+    def seasons_on_disk(self, competition_code: str, refresh: bool = False) -> List[int]:
+        """Temporadas com artefatos completos (meta.json) para a liga."""
+        code = competition_code.upper()
+        if not refresh and code in self._disk_seasons:
+            return self._disk_seasons[code]
+
+        pattern = os.path.join(self.models_dir, f"train_league_{competition_code.lower()}_*_meta.json")
+        seasons = []
+        for path in glob.glob(pattern):
+            m = re.search(r"_(\d{4})_meta\.json$", path)
+            if m:
+                seasons.append(int(m.group(1)))
+        self._disk_seasons[code] = sorted(seasons)
+        return self._disk_seasons[code]
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def get(self, competition_code: str, season: Optional[int] = None) -> Optional[ServingEntry]:
+        """
+        Entrada da liga para a temporada pedida; sem temporada (ou se ela não
+        existe), usa a temporada mais recente disponível em memória ou disco.
+        Retorna None se a liga nunca foi treinada.
+
+        A carga do disco roda fora do lock (requests de ligas já em memória
+        não esperam por ela) e uma vez só por chave: quem pede a mesma liga
+        durante a carga espera o mesmo resultado.
+        """
+        code = competition_code.upper()
+        with self._lock:
+            entry = self._entries.get((code, season))
+            if entry is not None:
+                self._entries.move_to_end((code, season))
+                return entry
+
+            in_memory = [s for (c, s) in self._entries if c == code]
+            available = sorted(set(in_memory) | set(self.seasons_on_disk(code)))
+            if not available:
+                return None
+            if season not in available:
+                season = available[-1]
+
+            key = (code, season)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+            loading = self._loading.get(key)
+            if loading is None:
+                loading = self._loading[key] = Future()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            return loading.result()  # relança o erro de quem carregou, se houver
+
+        try:
+            entry = self._load_entry(code, season)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            loading.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._loading[key]
+            current = self._entries.get(key)
+            if current is None:
+                self._insert(entry)
+            else:
+                entry = current  # um reload() publicou uma versão mais nova durante a carga
+        loading.set_result(entry)
+        return entry
+
+    def put(self, entry: ServingEntry) -> None:
+        """Publica (ou substitui) uma entrada recém treinada."""
+        with self._lock:
+            self._insert(entry)
+
+    def reload(self, competition_code: str, season: int) -> ServingEntry:
+        """
+        Recarrega do disco a entrada recém gravada (ex.: por um job de treino
+        em outro processo) e a publica no lugar da anterior. A entrada nova é
+        montada por completo antes da troca; requests em andamento seguem com
+        a que já tinham em mãos.
+        """
+        code = competition_code.upper()
+        self.seasons_on_disk(code, refresh=True)
+        entry = self._load_entry(code, season)
+        with self._lock:
+            self._insert(entry)
+        return entry
+
+    def _insert(self, entry: ServingEntry) -> None:
+        self._entries[entry.key] = entry
+        self._entries.move_to_end(entry.key)
+        while len(self._entries) > self.max_entries:
+            (code, season), _ = self._entries.popitem(last=False)
+            print(f"[registry] Liberando {code} {season} da memória (LRU)")
+
+    def resident(self) -> List[Tuple[str, int]]:
+        with self._lock:
+            return list(self._entries)
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+
+    def save(
+        self,
+        entry: ServingEntry,
+        matches: pd.DataFrame,
+        estimator: Any = None,
+        **meta: Any,
+    ) -> None:
+        """
+        Grava os artefatos da entrada (modelo joblib + flat, partidas, meta).
+        `estimator` é o RandomForest sklearn original, obrigatório quando
+        entry.model já é um FlatForest. `meta` deve trazer ao menos n_games
+        (usado para reconstruir as tabelas).
+        """
+        code, season = entry.key
+        os.makedirs(self.models_dir, exist_ok=True)
+
+        from joblib import dump
+
+        if estimator is None:
+            estimator = entry.model
+        flat = entry.model
+        if not isinstance(flat, FlatForest):
+            flat = FlatForest.from_sklearn(estimator, entry.feature_cols)
+
+        # joblib e pickle via tmp + os.replace (o flat já troca o diretório
+        # inteiro): quem lê a entrada nunca vê um arquivo pela metade
+        suffix = f".tmp{os.getpid()}_{threading.get_ident()}"
+        model_path = self.model_path(code, season)
+        dump(estimator, model_path + suffix)
+        os.replace(model_path + suffix, model_path)
+        flat.save(self.flat_model_path(code, season))
+        matches_path = self.matches_path(code, season)
+        matches.to_pickle(matches_path + suffix)
+        os.replace(matches_path + suffix, matches_path)
+
+        meta = {
+            "competition_code": code,
+            "season": season,
+            "feature_cols": entry.feature_cols,
+            "schema_hash": feature_schema_hash(entry.feature_cols),
+            **meta,
+        }
+        tmp_path = self.meta_path(code, season) + suffix
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        # meta.json por último: é ele que marca a entrada como completa no disco
+        os.replace(tmp_path, self.meta_path(code, season))
+        self.seasons_on_disk(code, refresh=True)
+        print(f"[registry] Artefatos de {code} {season} salvos em {self.artifact_prefix(code, season)}*")
+
+    def _load_entry(self, code: str, season: int) -> ServingEntry:
+        t0 = time.perf_counter()
+        with open(self.meta_path(code, season), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        n_games = int(meta.get("n_games", 5))
+
+        model = None
+        flat_path = self.flat_model_path(code, season)
+        if os.path.exists(flat_path):
+            try:
+                flat = FlatForest.load(flat_path, mmap_mode="r")
+            except ValueError as e:  # artefato de formato antigo: cai no joblib
+                print(f"[registry] {e}")
+                flat = None
+            if flat is not None and flat.schema_hash == meta.get("schema_hash", flat.schema_hash):
+                model = flat
+        if model is None:
+            from joblib import load
+
+            model = load(self.model_path(code, season))
+            feature_cols = list(meta["feature_cols"])
+        else:
+            feature_cols = model.feature_cols
+
+        entry = ServingEntry(code, season, model, feature_cols)
+
+        matches = pd.read_pickle(self.matches_path(code, season))
+        form_df = build_feature_table_cached(matches, n_games=n_games, competition_code=code)
+        _, _, feat_df, _ = build_dataset_cached(matches, n_games=n_games, competition_code=code)
+        entry.set_feature_df(
+            feat_df, form_df=form_df, form_state=TeamFormState.from_matches(matches, n_games=n_games)
+        )
+
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        print(f"[registry] {code} {season} carregado do disco em {elapsed_ms:.1f} ms")
+        return entry
+
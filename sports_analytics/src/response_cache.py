@@ -0,0 +1,118 @@
+"""
+In-memory cache of rendered JSON responses for the read endpoints
+(/teams, /fixtures_with_predictions, /fixtures_markets).
+
+Entries are keyed by (endpoint, params, model version, feature-table
+version) and hold the serialized body, so a repeated dashboard load is a
+dict lookup plus a write of ready-made bytes: no feature lookups, no
+Pydantic models, no JSON encoding. A new model or feature table changes
+the key, so stale payloads are never served; they just age out of the LRU.
+
+Each entry carries a weak ETag (a hash of the body). A request whose
+If-None-Match matches gets an empty 304. Bodies above `gzip_min_bytes` are
+sent gzip-compressed to clients that accept it; the compressed copy is
+built once per entry, on first use. The ETag is weak because the gzip and
+identity encodings share it.
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Mapping, Optional, Tuple
+
+from fastapi import Response
+
+Key = Tuple[Hashable, ...]
+
+
+class CachedResponse:
+    """Serialized body + ETag (+ gzip copy, built lazily) of one response."""
+
+    def __init__(self, body: bytes, expires_at: Optional[float] = None):
+        self.body = body
+        self.etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.expires_at = expires_at
+        self._gzipped: Optional[bytes] = None
+
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzipped
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:]  # strip W/
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+class JsonResponseCache:
+    """LRU of CachedResponse (thread-safe: /teams runs in the threadpool)."""
+
+    def __init__(self, max_entries: int = 256, compress: bool = True, gzip_min_bytes: int = 1024):
+        self.max_entries = max_entries
+        self.compress = compress
+        self.gzip_min_bytes = gzip_min_bytes
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0  # 304s sent
+        self._entries: "OrderedDict[Key, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(endpoint: str, params: Tuple, model_version: int, feature_version: int) -> Key:
+        return endpoint, params, model_version, feature_version
+
+    def get(self, key: Key) -> Optional[CachedResponse]:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached.expires_at is not None and time.monotonic() >= cached.expires_at:
+                del self._entries[key]
+                cached = None
+            if cached is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached
+
+    def put(self, key: Key, body: bytes, ttl: Optional[float] = None) -> CachedResponse:
+        """Store a serialized body; ttl=None keeps it until evicted."""
+        cached = CachedResponse(body, None if ttl is None else time.monotonic() + ttl)
+        with self._lock:
+            self._entries[key] = cached
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+    def response(self, cached: CachedResponse, headers: Mapping[str, str]) -> Response:
+        """304 if the client already has this body, else the (maybe gzipped) JSON."""
+        resp_headers = {"ETag": cached.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, cached.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=resp_headers)
+
+        body = cached.body
+        if (
+            self.compress
+            and len(body) >= self.gzip_min_bytes
+            and "gzip" in headers.get("accept-encoding", "")
+        ):
+            body = cached.gzipped()
+            resp_headers["Content-Encoding"] = "gzip"
+        return Response(content=body, media_type="application/json", headers=resp_headers)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,75 @@
+"""
+In-process cache of upstream schedules (SCHEDULED fixtures) per
+(competition, season), for the async fixtures endpoints.
+
+Entries live for `ttl_s` seconds. Lookups are single-flight: while one
+request is fetching a key, concurrent requests for the same key await that
+same fetch instead of starting their own, so a burst of page loads costs
+one upstream call (and one token of the API quota).
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+Key = Tuple[str, int]
+
+
+class ScheduleCache:
+    """TTL cache of fixture DataFrames with single-flight fetches (one event loop)."""
+
+    def __init__(self, ttl_s: float = 120.0):
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # requests that joined a fetch already in flight
+        self._entries: Dict[Key, Tuple[float, pd.DataFrame]] = {}
+        self._inflight: Dict[Key, "asyncio.Future[pd.DataFrame]"] = {}
+
+    async def get(
+        self,
+        competition_code: str,
+        season: int,
+        fetch: Callable[[], Awaitable[pd.DataFrame]],
+    ) -> pd.DataFrame:
+        """
+        Cached schedule for the key, or the result of `fetch()` (shared with
+        any concurrent caller). Errors are not cached: every waiter gets the
+        exception and the next request tries again.
+        """
+        key = (competition_code.upper(), season)
+
+        cached = self._entries.get(key)
+        if cached is not None and time.monotonic() < cached[0]:
+            self.hits += 1
+            return cached[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fetch(key, fetch))
+            self._inflight[key] = task
+
+        # shield: a caller that disconnects must not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: Key, fetch: Callable[[], Awaitable[pd.DataFrame]]) -> pd.DataFrame:
+        try:
+            df = await fetch()
+            self._entries[key] = (time.monotonic() + self.ttl_s, df)
+            return df
+        finally:
+            del self._inflight[key]
+
+    def invalidate(self, competition_code: Optional[str] = None) -> None:
+        """Drop the cached schedules (of one competition, or all)."""
+        if competition_code is None:
+            self._entries.clear()
+            return
+        code = competition_code.upper()
+        for key in [k for k in self._entries if k[0] == code]:
+            del self._entries[key]
@@ -0,0 +1,50 @@
+"""
+Índice de "estado mais recente" da feature table, para lookups O(1) no serving.
+
+Em vez de filtrar e ordenar _feature_df a cada request, guardamos (uma vez,
+quando a tabela é carregada/treinada) a última linha de features de cada time,
+pelo ID int16 do time (src.team_registry):
+
+  - home[team_id]: último jogo do time como mandante
+  - away[team_id]: último jogo do time como visitante
+  - pairs[(home_id, away_id)]: último confronto com esse mando
+
+Cada linha é um dict {coluna: valor}. home_row/away_row/pair_row fazem a
+consulta pelo nome.
+"""
+
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import pandas as pd
+
+Row = Dict[str, Any]
+
+
+def _latest_by(df: pd.DataFrame, keys) -> Dict[Any, Row]:
+    """Última linha (df já ordenado por data) para cada valor de `keys`."""
+    last = df.drop_duplicates(subset=keys, keep="last")
+    if isinstance(keys, str):
+        key_values = last[keys].tolist()
+    else:
+        key_values = list(zip(*(last[k].tolist() for k in keys)))
+    return dict(zip(key_values, last.to_dict("records")))
+
+
+class FeatureIndex:
+    def __init__(self, feat_df: pd.DataFrame, team_ids: Mapping[str, int]):
+        """feat_df: tabela compacta (com home_team_id/away_team_id); team_ids: nome -> ID."""
+        ordered = feat_df.sort_values("date", kind="stable")
+
+        self.team_ids = team_ids
+        self.home: Dict[int, Row] = _latest_by(ordered, "home_team_id")
+        self.away: Dict[int, Row] = _latest_by(ordered, "away_team_id")
+        self.pairs: Dict[Tuple[int, int], Row] = _latest_by(ordered, ["home_team_id", "away_team_id"])
+
+    def home_row(self, team: str) -> Optional[Row]:
+        return self.home.get(self.team_ids.get(team))
+
+    def away_row(self, team: str) -> Optional[Row]:
+        return self.away.get(self.team_ids.get(team))
+
+    def pair_row(self, home_team: str, away_team: str) -> Optional[Row]:
+        return self.pairs.get((self.team_ids.get(home_team), self.team_ids.get(away_team)))
@@ -1,33 +1,56 @@
+import numpy as np
 import pandas as pd
 
+# Categories in sorted order, same as the classes_ of models trained on them
+RESULT_DTYPE = pd.CategoricalDtype(["A", "D", "H"])
 
-def add_result_column(df: pd.DataFrame) -> pd.DataFrame:
+
+def label_results(home_goals, away_goals) -> pd.Categorical:
     """
-    Add a column 'home_result' with values:
+    Vectorized H/D/A labels from the sign of the goal difference:
     - 'H' (home win)
     - 'A' (away win)
-    - 'D' (draw)
+    - 'D' (draw; also when a score is missing, as before)
     """
-    df = df.copy()
+    home_goals = np.asarray(home_goals, dtype=float)
+    away_goals = np.asarray(away_goals, dtype=float)
+    sign = (home_goals > away_goals).astype(np.int8) - (home_goals < away_goals).astype(np.int8)
+    # sign -1/0/1 -> codes of 'A'/'D'/'H'
+    return pd.Categorical.from_codes(sign + 1, dtype=RESULT_DTYPE)
 
-    def _result(row):
-        if row["home_goals"] > row["away_goals"]:
-            return "H"
-        elif row["home_goals"] < row["away_goals"]:
-            return "A"
-        else:
-            return "D"
 
-    df["home_result"] = df.apply(_result, axis=1)
+def add_result_labels(df: pd.DataFrame, column: str, overwrite: bool = True) -> pd.DataFrame:
+    """
+    Set `column` to the H/D/A label of each match (in place, returns df).
+    With overwrite=False, frames that already have the column are left as is.
+    """
+    if not overwrite and column in df.columns:
+        return df
+    df[column] = label_results(df["home_goals"], df["away_goals"])
     return df
 
 
+def add_result_column(df: pd.DataFrame, overwrite: bool = True) -> pd.DataFrame:
+    """
+    Add a column 'home_result' with values:
+    - 'H' (home win)
+    - 'A' (away win)
+    - 'D' (draw)
+
+    With overwrite=False an already-labelled frame is returned unchanged
+    (no copy, no relabelling).
+    """
+    if not overwrite and "home_result" in df.columns:
+        return df
+    return add_result_labels(df.copy(), "home_result")
+
+
 def team_summary(df: pd.DataFrame, team_name: str) -> dict:
     """
     Old version: keeps only home stats.
     Kept here in case we want simple stats later.
     """
-    df = add_result_column(df)
+    df = add_result_column(df, overwrite=False)
 
     home_matches = df[df["home_team"] == team_name]
 
@@ -57,8 +80,11 @@ def team_summary_full(df: pd.DataFrame, team_name: str) -> dict:
     - goals for / against
     - wins / draws / losses
     - win/draw/loss percentages
+
+    Label the history once with add_result_column and pass it in to avoid
+    relabelling it on every call.
     """
-    df = add_result_column(df)
+    df = add_result_column(df, overwrite=False)
 
     home = df[df["home_team"] == team_name]
     away = df[df["away_team"] == team_name]
@@ -0,0 +1,105 @@
+"""
+Interned team names per competition, plus a compact (low-memory) layout
+for the serving feature table.
+
+Each competition gets its own small integer ID space (int16). Serving
+tables store home_team_id / away_team_id next to the names, and
+FeatureIndex keys its lookups on those IDs, so a team lookup is an
+integer comparison instead of a string one.
+
+IDs are assigned on first sight and never change, so every season (and
+every reload) of a competition shares them. Tables are built from the
+warm-up, refresh and registry-load threads, hence the lock.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+_MAX_TEAM_ID = np.iinfo(np.int16).max
+
+
+class TeamRegistry:
+    """competition_code -> {team name -> int16 ID}, IDs assigned on first sight."""
+
+    def __init__(self):
+        self._ids: Dict[str, Dict[str, int]] = {}
+        self._names: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def team_id(self, competition_code: str, name: str) -> Optional[int]:
+        """ID of a team, or None if it was never registered (lookups don't register)."""
+        return self._ids.get(competition_code.upper(), {}).get(name)
+
+    def register(self, competition_code: str, names: Iterable[str]) -> Dict[str, int]:
+        """Assign IDs to new names; returns a copy of the competition's name -> ID map."""
+        code = competition_code.upper()
+        with self._lock:
+            ids = self._ids.setdefault(code, {})
+            all_names = self._names.setdefault(code, [])
+            for name in names:
+                if pd.isna(name) or name in ids:
+                    continue
+                if len(all_names) > _MAX_TEAM_ID:
+                    raise ValueError(f"Too many teams registered for {code}")
+                ids[name] = len(all_names)
+                all_names.append(name)
+            return dict(ids)
+
+    def encode(self, competition_code: str, names: pd.Series) -> np.ndarray:
+        """int16 IDs for a column of team names (registers new names; NaN -> -1)."""
+        ids = self.register(competition_code, names.dropna().unique())
+        return names.map(ids).fillna(-1).to_numpy(dtype=np.int16)
+
+    def ids(self, competition_code: str) -> Dict[str, int]:
+        """Copy of the competition's name -> ID map (e.g. for a FeatureIndex)."""
+        return self.register(competition_code, ())
+
+    def name(self, competition_code: str, team_id: int) -> str:
+        return self._names[competition_code.upper()][team_id]
+
+    def teams(self, competition_code: str) -> List[str]:
+        with self._lock:
+            return list(self._names.get(competition_code.upper(), []))
+
+
+_default_registry = TeamRegistry()
+
+
+def get_team_registry() -> TeamRegistry:
+    """Process-wide registry shared by every ServingEntry."""
+    return _default_registry
+
+
+def compact_feature_table(
+    feat_df: pd.DataFrame,
+    registry: TeamRegistry,
+    competition_code: str,
+) -> pd.DataFrame:
+    """
+    Low-memory copy of a feature table for serving:
+
+    - home_team_id / away_team_id: int16 codes from the registry
+    - team names, league, status and result as `category`
+    - float feature columns down-cast to float32 (the RandomForest casts its
+      input to float32 anyway, so predictions don't change)
+    - integer columns down-cast to the smallest integer type
+    """
+    df = feat_df.copy()
+
+    for col in df.select_dtypes(include="float64").columns:
+        df[col] = df[col].astype(np.float32)
+
+    for col in df.select_dtypes(include="int64").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+
+    df["home_team_id"] = registry.encode(competition_code, df["home_team"])
+    df["away_team_id"] = registry.encode(competition_code, df["away_team"])
+
+    for col in ["home_team", "away_team", "league", "status", "result"]:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    return df
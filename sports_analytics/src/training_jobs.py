@@ -0,0 +1,379 @@
+"""
+Jobs de treino em segundo plano.
+
+POST /train_model só enfileira um job e devolve o ID. Cada job tem duas fases:
+
+1. busca das temporadas, no próprio processo do servidor (thread do
+   manager), pelo client padrão: divide o token bucket (cota por minuto da
+   API) e o cache HTTP com os requests de serving;
+2. treino (build_dataset, CV + holdout do RandomForest, export da floresta)
+   num pool de processos. O filho grava só os artefatos da própria
+   liga/temporada no ModelRegistry e devolve as métricas.
+
+O progresso vai para models/train_jobs/<job_id>.json (etapa + fração), lido
+pelo pai quando alguém consulta o status. Ao terminar, o pai publica um job
+por vez: copia os artefatos da liga para os caminhos genéricos (modelo do
+último treino; cada arquivo via tmp + os.replace) e chama `publish(result)`
+(em main.py: recarrega a liga do disco e troca a entrada de serving).
+
+Dois jobs ativos para a mesma liga/temporada gravariam os mesmos arquivos,
+então o segundo é recusado (TrainingJobConflict).
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src.advanced_model import train_match_outcome_model
+from src.football_data_api import FootballDataApiError, fetch_competition_matches_many
+from src.http_cache import get_response_cache
+from src.model_artifacts import FlatForest, export_flat_forest
+from src.model_registry import DEFAULT_MODELS_DIR, ModelRegistry, ServingEntry
+from src.season_utils import get_training_seasons
+
+DEFAULT_PROGRESS_DIR = os.path.join(DEFAULT_MODELS_DIR, "train_jobs")
+
+# Fração do job concluída ao começar cada etapa
+STAGE_PROGRESS = {
+    "queued": 0.0,
+    "fetching": 0.05,
+    "features": 0.15,
+    "cross_validation": 0.25,
+    "holdout_fit": 0.65,
+    "export": 0.8,
+    "saving": 0.9,
+    "publishing": 0.95,
+    "done": 1.0,
+}
+
+
+class TrainingJobError(Exception):
+    """Falha do job que não é bug (ex.: nenhuma partida retornada pela API)."""
+    pass
+
+
+class TrainingJobConflict(Exception):
+    """Já há um job ativo (com outros parâmetros) para a mesma liga/temporada."""
+    pass
+
+
+def _write_progress(progress_path: str, stage: str) -> None:
+    tmp_path = f"{progress_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"stage": stage, "progress": STAGE_PROGRESS[stage], "updated_at": time.time()}, f)
+    os.replace(tmp_path, progress_path)
+
+
+def fetch_training_matches(params: Dict[str, Any]) -> Tuple[List[int], pd.DataFrame]:
+    """
+    Fase 1 (no processo do servidor): partidas das temporadas de treino,
+    pelo client padrão (mesma cota e cache HTTP do serving).
+    """
+    comp = params["competition_code"]
+    seasons = get_training_seasons(params["season"], params["n_past_seasons"])
+    print(f"[train_job] Buscando {comp} temporadas {seasons}")
+
+    results = fetch_competition_matches_many([(comp, s) for s in seasons], status=None)
+    all_dfs = []
+    for s, df_s in zip(seasons, results):
+        if isinstance(df_s, FootballDataApiError):
+            print(f"[train_job] Erro na API para {comp} {s}: {df_s}")
+            continue
+        if df_s is None or df_s.empty:
+            print(f"[train_job] Nenhuma partida retornada para {comp} {s}.")
+            continue
+        all_dfs.append(df_s)
+    print(f"[train_job] Cache HTTP: {get_response_cache().stats()}")
+
+    if not all_dfs:
+        raise TrainingJobError(
+            f"Nenhuma partida encontrada nas seasons {seasons} para {comp}. "
+            "Verifique o subscription da API ou o competition_code."
+        )
+    return seasons, pd.concat(all_dfs, ignore_index=True)
+
+
+def run_training_job(
+    params: Dict[str, Any],
+    seasons: List[int],
+    df_train: pd.DataFrame,
+    models_dir: str,
+    progress_path: str,
+) -> Dict[str, Any]:
+    """
+    Fase 2 (roda no processo filho): treina e grava os artefatos da
+    liga/temporada no ModelRegistry; devolve as métricas.
+
+    params: competition_code, season, n_past_seasons, n_games
+    """
+    comp = params["competition_code"]
+    season = params["season"]
+    n_games = params["n_games"]
+
+    def progress(stage: str) -> None:
+        _write_progress(progress_path, stage)
+
+    print(f"[train_job] Treinando {comp} com temporadas {seasons} (n_games={n_games}), shape={df_train.shape}")
+    model, acc, report, (X_test, _), feature_cols = train_match_outcome_model(
+        df_train,
+        n_games=n_games,
+        competition_code=comp,
+        progress=progress,
+    )
+
+    progress("export")
+    flat = export_flat_forest(model, feature_cols, X_test)
+
+    progress("saving")
+    # Só caminhos desta liga/temporada; os genéricos são publicados pelo pai
+    entry = ServingEntry(comp, season, flat, feature_cols)
+    ModelRegistry(models_dir).save(
+        entry, df_train, estimator=model, n_games=n_games, seasons=seasons, accuracy=float(acc)
+    )
+
+    return {
+        "competition_code": comp,
+        "season": season,
+        "seasons_used": seasons,
+        "n_games": n_games,
+        "feature_cols": list(feature_cols),
+        "accuracy": float(acc),
+        "classification_report": report,
+    }
+
+
+def _replace_file(src_path: str, dst_path: str) -> None:
+    """Copia src_path para dst_path sem que leitores vejam meio arquivo."""
+    tmp_path = f"{dst_path}.tmp{os.getpid()}"
+    shutil.copyfile(src_path, tmp_path)
+    os.replace(tmp_path, dst_path)
+
+
+def publish_generic_artifacts(result: Dict[str, Any], paths: Dict[str, str]) -> None:
+    """
+    Copia os artefatos da liga recém treinada para os caminhos do modelo
+    genérico (último treino: model_path, feature_cols_path,
+    flat_model_path), cada um via tmp + os.replace.
+    """
+    registry = ModelRegistry(paths["models_dir"])
+    comp, season = result["competition_code"], result["season"]
+
+    os.makedirs(os.path.dirname(paths["model_path"]) or ".", exist_ok=True)
+    _replace_file(registry.model_path(comp, season), paths["model_path"])
+    FlatForest.load(registry.flat_model_path(comp, season), mmap_mode=None).save(paths["flat_model_path"])
+
+    tmp_path = f"{paths['feature_cols_path']}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for c in result["feature_cols"]:
+            f.write(c + "\n")
+    os.replace(tmp_path, paths["feature_cols_path"])
+
+
+class TrainingJob:
+    """Estado de um job, visto pelo processo pai."""
+
+    def __init__(self, job_id: str, params: Dict[str, Any]):
+        self.job_id = job_id
+        self.params = params
+        self.status = "queued"  # queued | running | succeeded | failed
+        self.stage = "queued"
+        self.progress = 0.0
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            **self.params,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class TrainingJobManager:
+    """
+    Fila de jobs de treino: busca das partidas em threads do próprio
+    processo, treino num executor de processos (ou de threads, com
+    use_processes=False: útil para debug, já que o job vê o mesmo processo).
+    Um pedido igual a um job ainda ativo devolve o job existente; um pedido
+    diferente para a mesma liga/temporada levanta TrainingJobConflict.
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[Dict[str, Any]], None],
+        paths: Dict[str, str],
+        max_workers: int = 1,
+        use_processes: bool = True,
+        progress_dir: str = DEFAULT_PROGRESS_DIR,
+        max_history: int = 100,
+    ):
+        self.publish = publish
+        self.paths = paths
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.progress_dir = progress_dir
+        self.max_history = max_history
+        self._executor: Optional[Executor] = None
+        self._fetcher = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="train-fetch")
+        self._jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()  # um job publica por vez
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                # spawn: o filho não herda threads/sockets do servidor (fork + threads = deadlock)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _progress_path(self, job_id: str) -> str:
+        return os.path.join(self.progress_dir, f"{job_id}.json")
+
+    def submit(self, params: Dict[str, Any]) -> TrainingJob:
+        with self._lock:
+            for job in self._jobs.values():
+                if not job.active:
+                    continue
+                if job.params == params:
+                    return job
+                if (job.params["competition_code"], job.params["season"]) == (
+                    params["competition_code"],
+                    params["season"],
+                ):
+                    raise TrainingJobConflict(
+                        f"Job {job.job_id} já está treinando {params['competition_code']} "
+                        f"{params['season']}; aguarde ele terminar."
+                    )
+
+            job = TrainingJob(uuid.uuid4().hex[:12], params)
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_history:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.active:
+                    break
+                self._jobs.popitem(last=False)
+
+        os.makedirs(self.progress_dir, exist_ok=True)
+        self._fetcher.submit(self._start, job)
+        print(f"[train_jobs] Job {job.job_id} enfileirado: {params}")
+        return job
+
+    def _start(self, job: TrainingJob) -> None:
+        """Fase 1 (thread do servidor): busca as partidas e despacha o treino."""
+        progress_path = self._progress_path(job.job_id)
+        try:
+            _write_progress(progress_path, "fetching")
+            seasons, df_train = fetch_training_matches(job.params)
+            args = (run_training_job, job.params, seasons, df_train, self.paths["models_dir"], progress_path)
+            try:
+                future = self._get_executor().submit(*args)
+            except BrokenExecutor:
+                # um filho morreu (ex.: OOM) e levou o pool junto: recria
+                self._executor = None
+                future = self._get_executor().submit(*args)
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+        future.add_done_callback(lambda f: self._finish(job, f))
+
+    def _read_progress(self, job: TrainingJob) -> None:
+        """
+        Atualiza etapa/progresso de um job ativo a partir do arquivo do filho.
+        Depois que o pai assume (publishing) ou o job termina, o arquivo não
+        manda mais: uma leitura atrasada não pode fazer a etapa voltar.
+        """
+        try:
+            with open(self._progress_path(job.job_id), "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            if job.status not in ("queued", "running") or job.stage == "publishing":
+                return
+            if job.status == "queued":
+                job.status = "running"
+                job.started_at = state["updated_at"]
+            job.stage = state["stage"]
+            job.progress = state["progress"]
+
+    def _finish(self, job: TrainingJob, future: Future) -> None:
+        """Callback do executor: publica o modelo novo (ou registra a falha)."""
+        result = error = None
+        try:
+            result = future.result()
+            with self._lock:
+                job.status = "running"
+                job.stage, job.progress = "publishing", STAGE_PROGRESS["publishing"]
+            with self._publish_lock:
+                publish_generic_artifacts(result, self.paths)
+                self.publish(result)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        with self._lock:
+            job.finished_at = time.time()
+            if job.started_at is None:
+                job.started_at = job.finished_at
+            if error is None:
+                job.result = result
+                job.status = "succeeded"
+                job.stage, job.progress = "done", STAGE_PROGRESS["done"]
+            else:
+                job.status = "failed"
+                job.error = error
+
+        try:
+            os.remove(self._progress_path(job.job_id))
+        except OSError:
+            pass
+
+        if error is None:
+            print(f"[train_jobs] Job {job.job_id} concluído (accuracy={result['accuracy']:.3f})")
+        else:
+            print(f"[train_jobs] Job {job.job_id} falhou: {error}")
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None and job.active:
+            self._read_progress(job)
+        return job
+
+    def shutdown(self) -> None:
+        self._fetcher.shutdown(wait=False, cancel_futures=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -4,10 +4,17 @@ Utilitários para expected goals (xG) e distribuição de gols via Poisson.
 Este módulo fornece:
 
 - calibrate_goal_expectancy: transforma "força ofensiva/defensiva" em λ_home / λ_away
+  (calibrate_goal_expectancy_batch: mesma conta para arrays)
 - match_outcome_probabilities: retorna dict {"H","D","A"} via Poisson
 - build_xg_context_from_feature_df: constrói contexto de força de ataque/defesa por time
 - compute_match_lambdas: calcula λ_home / λ_away para um confronto específico
+  (compute_match_lambdas_batch: para uma lista de confrontos)
 - poisson_outcome_probs: mesma lógica do match_outcome_probabilities, mas retornando tupla
+- poisson_outcome_probs_batch / match_outcome_probabilities_batch: P(H/D/A) para
+  arrays de λ (muitos confrontos por chamada)
+- poisson_score_grid: grade completa de placares (mandante x visitante)
+- skellam_outcome_probs_batch: P(H/D/A) pela diferença de gols (Skellam), sem
+  limite fixo de gols (method="skellam" nas funções acima)
 """
 
 from __future__ import annotations
@@ -15,6 +22,7 @@ from __future__ import annotations
 from math import exp, factorial
 from typing import Dict, Tuple, Optional
 
+import numpy as np
 import pandas as pd
 
 
@@ -30,48 +38,182 @@ def _poisson_pmf(k: int, lamb: float) -> float:
     return exp(-lamb) * (lamb**k) / factorial(k)
 
 
-def poisson_outcome_probs(
-    lambda_home: float, lambda_away: float, max_goals: int = 8
-) -> Tuple[float, float, float]:
+def poisson_pmf_matrix(lambdas, max_goals: int = 8) -> np.ndarray:
     """
-    Calcula P(H), P(D), P(A) usando distribuição de Poisson para λ_home / λ_away.
+    PMF de Poisson para vários λ de uma vez: matriz (n, max_goals + 1) com
+    P(k gols) para k = 0..max_goals.
 
-    Retorna: (p_home, p_draw, p_away)
+    Usa a recorrência p(k) = p(k-1) * λ / k (sem factorial / potências).
+    λ <= 0 gera linha de zeros, como em _poisson_pmf.
+    """
+    lam = np.atleast_1d(np.asarray(lambdas, dtype=float))
+    k = np.arange(1, max_goals + 1, dtype=float)
+
+    pmf = np.empty((lam.shape[0], max_goals + 1), dtype=float)
+    pmf[:, 0] = np.exp(-lam)
+    pmf[:, 1:] = lam[:, None] / k[None, :]
+    np.cumprod(pmf, axis=1, out=pmf)
+
+    pmf[lam <= 0] = 0.0
+    return pmf
+
+
+def poisson_score_grid(lambda_home, lambda_away, max_goals: int = 8) -> np.ndarray:
+    """
+    Grade de placares (n, max_goals + 1, max_goals + 1): grid[i, gh, ga] =
+    P(mandante faz gh) * P(visitante faz ga) para o confronto i.
+    """
+    ph = poisson_pmf_matrix(lambda_home, max_goals)
+    pa = poisson_pmf_matrix(lambda_away, max_goals)
+    return ph[:, :, None] * pa[:, None, :]
+
+
+def grid_outcome_probs(grid: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Colapsa grades de placares (n, G, G) em arrays (p_home, p_draw, p_away),
+    normalizados pela massa da grade (zeros se a grade for toda zero).
     """
-    p_home = 0.0
-    p_draw = 0.0
-    p_away = 0.0
-
-    for gh in range(0, max_goals + 1):
-        ph = _poisson_pmf(gh, lambda_home)
-        for ga in range(0, max_goals + 1):
-            pa = _poisson_pmf(ga, lambda_away)
-            p = ph * pa
-            if gh > ga:
-                p_home += p
-            elif gh == ga:
-                p_draw += p
-            else:
-                p_away += p
+    size = grid.shape[-1]
+    home_mask = np.tri(size, k=-1, dtype=bool)  # gh > ga
+
+    p_home = grid[:, home_mask].sum(axis=1)
+    p_draw = np.trace(grid, axis1=1, axis2=2)
+    p_away = grid[:, home_mask.T].sum(axis=1)
 
     # Normaliza por segurança
     total = p_home + p_draw + p_away
-    if total > 0:
-        p_home /= total
-        p_draw /= total
-        p_away /= total
+    safe_total = np.where(total > 0, total, 1.0)
+    return p_home / safe_total, p_draw / safe_total, p_away / safe_total
+
+
+def _scaled_bessel_table(k_max: int, z: np.ndarray) -> np.ndarray:
+    """
+    e^-z * I_k(z) para k = 0..k_max (matriz (k_max + 1, n)).
+
+    Só as duas ordens mais altas vêm de scipy.special.ive; as demais saem da
+    recorrência I_{k-1} = I_{k+1} + (2k / z) * I_k, estável de cima para baixo.
+    """
+    from scipy.special import ive  # import tardio: scipy pesa no startup do serving
+
+    table = np.empty((k_max + 1, z.shape[0]), dtype=float)
+    table[k_max] = ive(k_max, z)
+    table[k_max - 1] = ive(k_max - 1, z)
+    for order in range(k_max - 1, 0, -1):
+        table[order - 1] = table[order + 1] + (2.0 * order / z) * table[order]
+    return table
+
+
+def skellam_outcome_probs_batch(
+    lambda_home, lambda_away, tol: float = 1e-10
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    P(H), P(D), P(A) pela distribuição de Skellam da diferença de gols
+    D = gols_mandante - gols_visitante, sem montar a grade de placares:
+
+      log P(D = k) = -(λh + λa) + k/2 * log(λh / λa) + log I_|k|(2 * sqrt(λh * λa))
+
+    (I = Bessel modificada, calculada já escalada por e^-z — ver
+    _scaled_bessel_table —, então nada estoura para λ altos).
+
+    Truncamento adaptativo: D > K implica gols_mandante > K (idem para o
+    visitante), então escolhemos K tal que P(Poisson(max λ) > K) <= tol.
+    A massa descartada em cada cauda fica abaixo de `tol`.
+    λ <= 0 gera probabilidades zero, como no método da grade.
+    """
+    from scipy.stats import poisson  # import tardio, como em _scaled_bessel_table
+
+    lam_h = np.atleast_1d(np.asarray(lambda_home, dtype=float))
+    lam_a = np.atleast_1d(np.asarray(lambda_away, dtype=float))
+
+    valid = (lam_h > 0) & (lam_a > 0)
+    lh = np.where(valid, lam_h, 1.0)
+    la = np.where(valid, lam_a, 1.0)
+
+    lam_max = float(np.maximum(lh, la).max()) if lh.size else 1.0
+    k_max = int(max(poisson.isf(tol, lam_max), 1))
+    k = np.arange(1, k_max + 1, dtype=float)[:, None]
+
+    z = 2.0 * np.sqrt(lh * la)
+    half_log_ratio = 0.5 * (np.log(lh) - np.log(la))
+    with np.errstate(divide="ignore"):
+        log_bessel = np.log(_scaled_bessel_table(k_max, z)) + z - (lh + la)
+    p_draw = np.exp(log_bessel[0])
+    p_home = np.exp(log_bessel[1:] + k * half_log_ratio).sum(axis=0)
+    p_away = np.exp(log_bessel[1:] - k * half_log_ratio).sum(axis=0)
+
+    total = p_home + p_draw + p_away
+    safe_total = np.where(total > 0, total, 1.0)
+    p_home, p_draw, p_away = (np.where(valid, p / safe_total, 0.0) for p in (p_home, p_draw, p_away))
 
+    # NaN de entrada continua NaN na saída (como no método da grade)
+    nan = np.isnan(lam_h) | np.isnan(lam_a)
+    if nan.any():
+        p_home, p_draw, p_away = (np.where(nan, np.nan, p) for p in (p_home, p_draw, p_away))
     return p_home, p_draw, p_away
 
 
+OUTCOME_METHODS = ("grid", "skellam")
+
+
+def poisson_outcome_probs_batch(
+    lambda_home,
+    lambda_away,
+    max_goals: int = 8,
+    method: str = "grid",
+    tol: float = 1e-10,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Versão vetorizada de poisson_outcome_probs para arrays de λ_home / λ_away
+    (milhares de confrontos numa única chamada).
+
+    method:
+      - "grid": grade de placares 0..max_goals, renormalizada (padrão)
+      - "skellam": diferença de gols via Skellam, truncada pela tolerância `tol`
+
+    Retorna: (p_home, p_draw, p_away), cada um um array de tamanho n.
+    """
+    if method == "grid":
+        return grid_outcome_probs(poisson_score_grid(lambda_home, lambda_away, max_goals))
+    if method == "skellam":
+        return skellam_outcome_probs_batch(lambda_home, lambda_away, tol)
+    raise ValueError(f"method deve ser um de {OUTCOME_METHODS}, recebido {method!r}")
+
+
+def poisson_outcome_probs(
+    lambda_home: float, lambda_away: float, max_goals: int = 8, method: str = "grid"
+) -> Tuple[float, float, float]:
+    """
+    Calcula P(H), P(D), P(A) usando distribuição de Poisson para λ_home / λ_away.
+
+    Retorna: (p_home, p_draw, p_away)
+    """
+    p_home, p_draw, p_away = poisson_outcome_probs_batch(
+        [lambda_home], [lambda_away], max_goals, method=method
+    )
+    return float(p_home[0]), float(p_draw[0]), float(p_away[0])
+
+
 def match_outcome_probabilities(
-    lambda_home: float, lambda_away: float, max_goals: int = 8
+    lambda_home: float, lambda_away: float, max_goals: int = 8, method: str = "grid"
 ) -> Dict[str, float]:
     """
     Versão em dict da função acima.
     Retorna: {"H": p_home, "D": p_draw, "A": p_away}
     """
-    p_home, p_draw, p_away = poisson_outcome_probs(lambda_home, lambda_away, max_goals)
+    p_home, p_draw, p_away = poisson_outcome_probs(lambda_home, lambda_away, max_goals, method)
+    return {"H": p_home, "D": p_draw, "A": p_away}
+
+
+def match_outcome_probabilities_batch(
+    lambda_home, lambda_away, max_goals: int = 8, method: str = "grid"
+) -> Dict[str, np.ndarray]:
+    """
+    Versão vetorizada de match_outcome_probabilities.
+    Retorna: {"H": array, "D": array, "A": array}
+    """
+    p_home, p_draw, p_away = poisson_outcome_probs_batch(
+        lambda_home, lambda_away, max_goals, method=method
+    )
     return {"H": p_home, "D": p_draw, "A": p_away}
 
 
@@ -80,6 +222,33 @@ def match_outcome_probabilities(
 # -------------------------------------------------------------------------
 
 
+def calibrate_goal_expectancy_batch(
+    home_xg_ability,
+    away_xg_ability,
+    base_total_goals: float = 2.6,
+    home_advantage: float = 1.10,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Versão vetorizada de calibrate_goal_expectancy: recebe arrays de força
+    de mandante / visitante e devolve arrays (λ_home, λ_away).
+    """
+    home_xg = np.maximum(np.asarray(home_xg_ability, dtype=float), 0.01)
+    away_xg = np.maximum(np.asarray(away_xg_ability, dtype=float), 0.01)
+
+    # Aplica pequeno boost de vantagem de casa
+    home_xg = home_xg * home_advantage
+
+    total_ability = home_xg + away_xg
+    # fallback totalmente neutro onde a soma não é positiva
+    neutral = total_ability <= 0
+    safe_total = np.where(neutral, 1.0, total_ability)
+
+    lambda_home = np.where(neutral, base_total_goals * 0.55, base_total_goals * (home_xg / safe_total))
+    lambda_away = np.where(neutral, base_total_goals * 0.45, base_total_goals * (away_xg / safe_total))
+
+    return lambda_home, lambda_away
+
+
 def calibrate_goal_expectancy(
     home_xg_ability: float,
     away_xg_ability: float,
@@ -93,24 +262,10 @@ def calibrate_goal_expectancy(
     - home_xg_ability, away_xg_ability ~ 1.0 é "médio".
     - home_advantage > 1.0 dá um boost extra ao mandante.
     """
-    home_xg = max(home_xg_ability, 0.01)
-    away_xg = max(away_xg_ability, 0.01)
-
-    # Aplica pequeno boost de vantagem de casa
-    home_xg *= home_advantage
-
-    total_ability = home_xg + away_xg
-    if total_ability <= 0:
-        # fallback totalmente neutro
-        return base_total_goals * 0.55, base_total_goals * 0.45
-
-    home_share = home_xg / total_ability
-    away_share = away_xg / total_ability
-
-    lambda_home = base_total_goals * home_share
-    lambda_away = base_total_goals * away_share
-
-    return lambda_home, lambda_away
+    lambda_home, lambda_away = calibrate_goal_expectancy_batch(
+        [home_xg_ability], [away_xg_ability], base_total_goals, home_advantage
+    )
+    return float(lambda_home[0]), float(lambda_away[0])
 
 
 # -------------------------------------------------------------------------
@@ -130,11 +285,16 @@ def build_xg_context_from_feature_df(
       - home_goals_against_avg, away_goals_against_avg
 
     A ideia é derivar força ofensiva/defensiva relativa à média da liga.
+    As médias por time saem de um groupby por mandante e outro por visitante
+    (sem filtrar a tabela time a time).
 
     Retorna um dicionário:
     {
       "league_home_for": float,
       "league_away_for": float,
+      "team_index": {"Time X": 0, ...},   # posição do time nos arrays abaixo
+      "att_home": np.ndarray, "att_away": np.ndarray,
+      "def_home": np.ndarray, "def_away": np.ndarray,
       "teams": {
          "Time X": {
             "att_home": float,
@@ -149,7 +309,7 @@ def build_xg_context_from_feature_df(
     if feat_df is None or feat_df.empty:
         return None
 
-    df = feat_df.copy()
+    df = feat_df
 
     required_cols = [
         "home_team",
@@ -171,55 +331,71 @@ def build_xg_context_from_feature_df(
     if league_away_for <= 0:
         league_away_for = 1.0
 
-    teams: Dict[str, Dict[str, float]] = {}
-
-    all_teams = pd.unique(
-        pd.concat([df["home_team"], df["away_team"]], ignore_index=True).dropna()
+    all_teams = pd.Index(
+        pd.unique(
+            pd.concat(
+                [df["home_team"].astype(object), df["away_team"].astype(object)],
+                ignore_index=True,
+            ).dropna()
+        )
     )
 
-    for team in all_teams:
-        home_rows = df[df["home_team"] == team]
-        away_rows = df[df["away_team"] == team]
-
-        # Médias em casa
-        if not home_rows.empty:
-            home_for = float(home_rows["home_goals_for_avg"].mean())
-            home_against = float(home_rows["home_goals_against_avg"].mean())
-        else:
-            home_for = league_home_for
-            home_against = league_away_for
-
-        # Médias fora
-        if not away_rows.empty:
-            away_for = float(away_rows["away_goals_for_avg"].mean())
-            away_against = float(away_rows["away_goals_against_avg"].mean())
-        else:
-            away_for = league_away_for
-            away_against = league_home_for
-
-        # Força relativa à liga ( >1 = melhor ataque / defesa que média )
-        att_home = home_for / league_home_for if league_home_for > 0 else 1.0
-        att_away = away_for / league_away_for if league_away_for > 0 else 1.0
-
-        # Para defesa, quanto MENOS sofre, melhor: usamos média da liga como ref.
-        # Se time sofre menos que média, def_strength < 1, mas na composição
-        # usamos o inverso para facilitar multiplicação.
-        def_home_raw = home_against / league_away_for if league_away_for > 0 else 1.0
-        def_away_raw = away_against / league_home_for if league_home_for > 0 else 1.0
-
-        def_home = 1.0 / def_home_raw if def_home_raw > 0 else 1.0
-        def_away = 1.0 / def_away_raw if def_away_raw > 0 else 1.0
-
-        teams[team] = {
-            "att_home": att_home,
-            "att_away": att_away,
-            "def_home": def_home,
-            "def_away": def_away,
+    def _team_means(team_col: str, for_col: str, against_col: str):
+        means = df.groupby(team_col, observed=True)[[for_col, against_col]].mean()
+        means.index = means.index.astype(object)
+        played = all_teams.isin(means.index)
+        means = means.reindex(all_teams)
+        return (
+            means[for_col].to_numpy(dtype=float),
+            means[against_col].to_numpy(dtype=float),
+            played,
+        )
+
+    # Médias em casa / fora (times sem jogos nesse mando usam a média da liga)
+    home_for, home_against, has_home = _team_means(
+        "home_team", "home_goals_for_avg", "home_goals_against_avg"
+    )
+    away_for, away_against, has_away = _team_means(
+        "away_team", "away_goals_for_avg", "away_goals_against_avg"
+    )
+    home_for = np.where(has_home, home_for, league_home_for)
+    home_against = np.where(has_home, home_against, league_away_for)
+    away_for = np.where(has_away, away_for, league_away_for)
+    away_against = np.where(has_away, away_against, league_home_for)
+
+    # Força relativa à liga ( >1 = melhor ataque / defesa que média )
+    att_home = home_for / league_home_for
+    att_away = away_for / league_away_for
+
+    # Para defesa, quanto MENOS sofre, melhor: usamos média da liga como ref.
+    # Se time sofre menos que média, def_strength < 1, mas na composição
+    # usamos o inverso para facilitar multiplicação.
+    def_home_raw = home_against / league_away_for
+    def_away_raw = away_against / league_home_for
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        def_home = np.where(def_home_raw > 0, 1.0 / def_home_raw, 1.0)
+        def_away = np.where(def_away_raw > 0, 1.0 / def_away_raw, 1.0)
+
+    team_index = {team: i for i, team in enumerate(all_teams)}
+    teams: Dict[str, Dict[str, float]] = {
+        team: {
+            "att_home": float(att_home[i]),
+            "att_away": float(att_away[i]),
+            "def_home": float(def_home[i]),
+            "def_away": float(def_away[i]),
         }
+        for team, i in team_index.items()
+    }
 
     ctx = {
         "league_home_for": league_home_for,
         "league_away_for": league_away_for,
+        "team_index": team_index,
+        "att_home": att_home,
+        "att_away": att_away,
+        "def_home": def_home,
+        "def_away": def_away,
         "teams": teams,
     }
     return ctx
@@ -249,28 +425,59 @@ def compute_match_lambdas(
     if xg_ctx is None:
         return None, None
 
-    teams = xg_ctx.get("teams", {})
-    if home_team not in teams or away_team not in teams:
+    team_index = xg_ctx.get("team_index", {})
+    if home_team not in team_index or away_team not in team_index:
         return None, None
 
-    t_home = teams[home_team]
-    t_away = teams[away_team]
+    lambda_home, lambda_away = compute_match_lambdas_batch(
+        [home_team], [away_team], xg_ctx, base_total_goals
+    )
+    return float(lambda_home[0]), float(lambda_away[0])
+
+
+def compute_match_lambdas_batch(
+    home_teams,
+    away_teams,
+    xg_ctx: Dict,
+    base_total_goals: float = 2.6,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Versão vetorizada de compute_match_lambdas para listas de confrontos.
+
+    Retorna arrays (lambda_home, lambda_away); confrontos com algum time fora
+    do contexto ficam com NaN.
+    """
+    n = len(home_teams)
+    if xg_ctx is None:
+        return np.full(n, np.nan), np.full(n, np.nan)
+
+    team_index = xg_ctx.get("team_index", {})
+    h = np.array([team_index.get(t, -1) for t in home_teams], dtype=np.int64)
+    a = np.array([team_index.get(t, -1) for t in away_teams], dtype=np.int64)
+    known = (h >= 0) & (a >= 0)
+    h = np.where(known, h, 0)
+    a = np.where(known, a, 0)
+
+    att_home = xg_ctx["att_home"]
+    att_away = xg_ctx["att_away"]
+    def_home = xg_ctx["def_home"]
+    def_away = xg_ctx["def_away"]
 
     # Misturamos ataque em casa/fora e defesa em casa/fora com pesos simples
-    home_attack_strength = 0.6 * t_home["att_home"] + 0.4 * t_home["att_away"]
-    away_attack_strength = 0.6 * t_away["att_away"] + 0.4 * t_away["att_home"]
+    home_attack_strength = 0.6 * att_home[h] + 0.4 * att_away[h]
+    away_attack_strength = 0.6 * att_away[a] + 0.4 * att_home[a]
 
-    home_defense_strength = 0.6 * t_home["def_home"] + 0.4 * t_home["def_away"]
-    away_defense_strength = 0.6 * t_away["def_away"] + 0.4 * t_away["def_home"]
+    home_defense_strength = 0.6 * def_home[h] + 0.4 * def_away[h]
+    away_defense_strength = 0.6 * def_away[a] + 0.4 * def_home[a]
 
     # "Força total" ofensiva, já considerando defesa do oponente.
     home_xg_ability = home_attack_strength * away_defense_strength
     away_xg_ability = away_attack_strength * home_defense_strength
 
-    lambda_home, lambda_away = calibrate_goal_expectancy(
+    lambda_home, lambda_away = calibrate_goal_expectancy_batch(
         home_xg_ability=home_xg_ability,
         away_xg_ability=away_xg_ability,
         base_total_goals=base_total_goals,
     )
 
-    return lambda_home, lambda_away
\ No newline at end of file
+    return np.where(known, lambda_home, np.nan), np.where(known, lambda_away, np.nan)
\ No newline at end of file
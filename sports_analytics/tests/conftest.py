@@ -0,0 +1,130 @@
+import pandas as pd
+import pytest
+
+from src import feature_cache
+from src.data_loader import get_data_path
+
+
+@pytest.fixture(scope="session")
+def matches() -> pd.DataFrame:
+    """Two Brasileirão seasons (2023-2024) fetched from the API, 760 matches."""
+    return pd.read_csv(get_data_path("matches_api.csv"))
+
+
+@pytest.fixture(autouse=True)
+def isolated_feature_cache(tmp_path, monkeypatch) -> feature_cache.FeatureCache:
+    """Point the process-wide feature cache at a temp dir instead of models/."""
+    cache = feature_cache.FeatureCache(str(tmp_path / "feature_cache"))
+    monkeypatch.setattr(feature_cache, "_default_cache", cache)
+    return cache
+
+
+@pytest.fixture(scope="session")
+def forest(matches):
+    """Small RandomForest on the BSA data: (model, X, feature_cols)."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    from src.advanced_model import build_dataset
+
+    X, y, _, feature_cols = build_dataset(matches, competition_code="BSA")
+    # n_jobs=1: sequential predict_proba, so the sum order is deterministic
+    model = RandomForestClassifier(n_estimators=25, class_weight="balanced", random_state=0, n_jobs=1)
+    model.fit(X, y)
+    return model, X, feature_cols
+
+
+@pytest.fixture
+def make_entry(forest):
+    """ServingEntry("BSA", 2024) serving the small forest, with features built from `df`."""
+    from src.advanced_model import build_dataset_from_feature_table
+    from src.features import TeamFormState, build_match_feature_table
+    from src.model_artifacts import FlatForest
+    from src.model_registry import ServingEntry
+
+    model, _, feature_cols = forest
+
+    def make(df: pd.DataFrame) -> "ServingEntry":
+        entry = ServingEntry("BSA", 2024, FlatForest.from_sklearn(model, feature_cols), feature_cols)
+        form_df = build_match_feature_table(df, n_games=5, competition_code="BSA")
+        _, _, feat_df, _ = build_dataset_from_feature_table(form_df)
+        entry.set_feature_df(feat_df, form_df=form_df, form_state=TeamFormState.from_matches(df, n_games=5))
+        return entry
+
+    return make
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """TestClient on main.app with an empty registry under tmp_path."""
+    from fastapi.testclient import TestClient
+
+    import main
+    from src.model_registry import ModelRegistry
+
+    monkeypatch.setattr(main, "_registry", ModelRegistry(str(tmp_path / "models")))
+    with TestClient(main.app, raise_server_exceptions=False) as c:
+        assert main._ready.wait(30)
+        yield c
+
+
+@pytest.fixture
+def api_server(monkeypatch):
+    """
+    Local stand-in for football-data.org on a background thread.
+
+    Answers are scripted: `server.responses` is a queue of
+    (status, headers, body) tuples; once it is empty, `server.handle(path,
+    headers)` answers (by default 200 with no matches). Every request is
+    recorded in `server.requests` as (path, headers); `server.connections`
+    counts TCP connections.
+    """
+    import collections
+    import json
+    import threading
+    import types
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    state = types.SimpleNamespace(
+        responses=collections.deque(),
+        requests=[],
+        connections=0,
+        handle=lambda path, headers: (200, {}, {"competition": {"code": "BSA"}, "matches": []}),
+    )
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def setup(self):
+            super().setup()
+            state.connections += 1
+
+        def do_GET(self):
+            headers = dict(self.headers)
+            state.requests.append((self.path, headers))
+            if state.responses:
+                status, extra_headers, body = state.responses.popleft()
+            else:
+                status, extra_headers, body = state.handle(self.path, headers)
+
+            payload = b"" if body is None else json.dumps(body).encode()
+            self.send_response(status)
+            for name, value in extra_headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    monkeypatch.setenv("FOOTBALL_DATA_API_TOKEN", "test-token")
+    state.base_url = f"http://127.0.0.1:{server.server_address[1]}/v4"
+    try:
+        yield state
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,79 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src import feature_cache
+from src.feature_cache import FeatureCache
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Scorers files are looked up in a temp data/ dir."""
+    path = tmp_path / "data"
+    path.mkdir()
+    monkeypatch.setattr(feature_cache, "get_data_path", lambda name: str(path / name))
+    return path
+
+
+def test_key_depends_on_matches_and_params(matches, data_dir):
+    cache = FeatureCache(str(data_dir / "cache"))
+    key = cache.key(matches, kind="dataset", competition_code="BSA", n_games=5)
+
+    assert cache.key(matches.copy(), kind="dataset", competition_code="BSA", n_games=5) == key
+    assert cache.key(matches, kind="dataset", competition_code="BSA", n_games=3) != key
+    assert cache.key(matches, kind="form", competition_code="BSA", n_games=5) != key
+    assert cache.key(matches.iloc[:-1], kind="dataset", competition_code="BSA", n_games=5) != key
+
+
+def test_key_changes_with_scorers_file(matches, data_dir):
+    cache = FeatureCache(str(data_dir / "cache"))
+    scorers = data_dir / "scorers_bsa.csv"
+
+    no_file = cache.key(matches, kind="dataset", competition_code="BSA")
+    scorers.write_text("team_name,goals\nSE Palmeiras,10\n")
+    with_file = cache.key(matches, kind="dataset", competition_code="BSA")
+    scorers.write_text("team_name,goals\nSE Palmeiras,11\n")
+    updated = cache.key(matches, kind="dataset", competition_code="BSA")
+
+    assert len({no_file, with_file, updated}) == 3
+
+
+def test_load_or_build_hits_after_first_build(tmp_path):
+    cache = FeatureCache(str(tmp_path / "cache"))
+    calls = []
+
+    def build():
+        calls.append(1)
+        return pd.DataFrame({"a": [1.0, 2.0]})
+
+    first = cache.load_or_build("form_abc", build)
+    second = cache.load_or_build("form_abc", build)
+
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_vanished_or_corrupt_entry_is_a_miss(tmp_path):
+    cache = FeatureCache(str(tmp_path / "cache"))
+    cache.put("form_abc", pd.DataFrame({"a": [1.0]}))
+    path = cache._path("form_abc")
+
+    os.remove(path)  # evicted by another process
+    assert cache.get("form_abc") is None
+
+    with open(path, "wb") as f:
+        f.write(b"not a table")
+    assert cache.get("form_abc") is None
+    assert not os.path.exists(path)
+
+
+def test_eviction_keeps_the_newest_entry(tmp_path):
+    cache = FeatureCache(str(tmp_path / "cache"), max_bytes=1)
+    cache.put("form_old", pd.DataFrame({"a": range(100)}))
+    cache.put("form_new", pd.DataFrame({"a": range(100)}))
+
+    assert cache.get("form_old") is None
+    assert cache.get("form_new") is not None
+
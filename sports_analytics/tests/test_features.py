@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from src.features import build_match_feature_table, prepare_base_matches, select_feature_window
+
+
+def _naive_goals_for_avg(matches: pd.DataFrame, n_games: int) -> pd.DataFrame:
+    """Mean goals scored over each team's previous n_games, one match at a time."""
+    base = prepare_base_matches(matches).reset_index(drop=True)
+    history = {}
+    home_avg, away_avg = [], []
+    for home, away, hg, ag in zip(base["home_team"], base["away_team"], base["home_goals"], base["away_goals"]):
+        for team, out in ((home, home_avg), (away, away_avg)):
+            last = history.get(team, [])[-n_games:]
+            out.append(np.mean(last) if last else np.nan)
+        history.setdefault(home, []).append(hg)
+        history.setdefault(away, []).append(ag)
+    return pd.DataFrame({"home_goals_for_avg": home_avg, "away_goals_for_avg": away_avg})
+
+
+def test_rolling_form_matches_naive_per_match_loop(matches):
+    feat_df = build_match_feature_table(matches, n_games=5, competition_code="BSA")
+    expected = _naive_goals_for_avg(matches, n_games=5)
+
+    np.testing.assert_allclose(feat_df["home_goals_for_avg"], expected["home_goals_for_avg"])
+    np.testing.assert_allclose(feat_df["away_goals_for_avg"], expected["away_goals_for_avg"])
+
+
+def test_multi_window_table_matches_single_window_builds(matches):
+    multi = build_match_feature_table(matches, windows=[3, 5], competition_code="BSA")
+
+    for n_games in (3, 5):
+        single = build_match_feature_table(matches, n_games=n_games, competition_code="BSA")
+        selected = select_feature_window(multi, n_games)
+        pd.testing.assert_frame_equal(selected[single.columns], single)
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import pandas as pd
+import pytest
+
+from src.football_data_api import (
+    AsyncFootballDataClient,
+    FootballDataApiError,
+    FootballDataClient,
+    TokenBucket,
+    fetch_competition_matches_many,
+)
+
+MATCHES = {
+    "competition": {"code": "BSA"},
+    "matches": [
+        {
+            "utcDate": "2023-04-15T19:00:00Z",
+            "status": "FINISHED",
+            "homeTeam": {"name": "SE Palmeiras"},
+            "awayTeam": {"name": "EC Bahia"},
+            "score": {"fullTime": {"home": 2, "away": 1}},
+        }
+    ],
+}
+
+
+@pytest.fixture
+def api_client(api_server):
+    """Client on the stand-in server: no pacing to speak of, no backoff sleeps."""
+    client = FootballDataClient(api_server.base_url, requests_per_minute=60000, backoff_factor=0)
+    yield client
+    client.close()
+
+
+def test_token_bucket_bursts_then_paces():
+    bucket = TokenBucket(rate_per_minute=600, capacity=2)  # one token every 0.1s
+
+    t0 = time.monotonic()
+    bucket.acquire()
+    bucket.acquire()
+    assert time.monotonic() - t0 < 0.05
+
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - t0 == pytest.approx(0.3, abs=0.08)
+
+
+def test_token_bucket_paces_on_the_event_loop():
+    bucket = TokenBucket(rate_per_minute=600, capacity=1)
+
+    async def take(n):
+        for _ in range(n):
+            await bucket.acquire_async()
+
+    t0 = time.monotonic()
+    asyncio.run(take(4))
+    assert time.monotonic() - t0 == pytest.approx(0.3, abs=0.08)
+
+
+def test_client_retries_429_and_5xx(api_server, api_client):
+    api_server.responses.extend(
+        [
+            (429, {"Retry-After": "0"}, {"message": "Too many requests"}),
+            (503, {}, {"message": "Unavailable"}),
+            (200, {}, MATCHES),
+        ]
+    )
+
+    assert api_client.get_json("competitions/BSA/matches", {"season": 2023}) == MATCHES
+    assert len(api_server.requests) == 3
+    path, headers = api_server.requests[-1]
+    assert path == "/v4/competitions/BSA/matches?season=2023"
+    assert headers["X-Auth-Token"] == "test-token"
+
+
+def test_client_gives_up_after_max_retries(api_server, api_client):
+    api_server.responses.extend([(500, {}, {"message": "boom"})] * 5)
+
+    with pytest.raises(FootballDataApiError, match="500"):
+        api_client.get_json("competitions/BSA/matches")
+    assert len(api_server.requests) == api_client.max_retries + 1
+
+
+def test_client_does_not_retry_client_errors(api_server, api_client):
+    api_server.responses.append((403, {}, {"message": "restricted"}))
+
+    with pytest.raises(FootballDataApiError, match="403"):
+        api_client.get_json("competitions/BSA/matches")
+    assert len(api_server.requests) == 1
+
+
+def test_client_reuses_its_connection(api_server, api_client):
+    for _ in range(5):
+        api_client.get_json("competitions/BSA/matches")
+    assert len(api_server.requests) == 5
+    assert api_server.connections == 1
+
+
+def test_many_keeps_order_and_isolates_failures(api_server, api_client):
+    def handle(path, headers):
+        if "season=2019" in path:
+            return 404, {}, {"message": "not found"}
+        return 200, {}, MATCHES
+
+    api_server.handle = handle
+    results = fetch_competition_matches_many(
+        [("BSA", 2023), ("BSA", 2019), ("BSA", 2022)], client=api_client
+    )
+
+    assert isinstance(results[0], pd.DataFrame) and isinstance(results[2], pd.DataFrame)
+    assert isinstance(results[1], FootballDataApiError)
+    assert results[0]["home_team"].tolist() == ["SE Palmeiras"]
+
+
+def test_async_client_retries_on_the_shared_bucket(api_server):
+    api_server.responses.extend([(502, {}, {"message": "bad gateway"}), (200, {}, MATCHES)])
+    bucket = TokenBucket(rate_per_minute=60000)
+
+    async def fetch():
+        client = AsyncFootballDataClient(api_server.base_url, bucket=bucket, backoff_factor=0)
+        try:
+            return await client.get_json("competitions/BSA/matches", {"season": 2023})
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(fetch()) == MATCHES
+    assert len(api_server.requests) == 2
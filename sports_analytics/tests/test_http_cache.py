@@ -0,0 +1,119 @@
+import os
+import time
+
+import pytest
+
+from src import football_data_api
+from src.football_data_api import FootballDataClient, fetch_competition_matches_raw, matches_cache_ttl
+from src.http_cache import ResponseCache
+from src.season_utils import get_current_season
+
+BODY = {"competition": {"code": "BSA"}, "matches": []}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "http_cache"))
+
+
+@pytest.fixture
+def cached_client(api_server, cache):
+    client = FootballDataClient(api_server.base_url, requests_per_minute=60000, backoff_factor=0, cache=cache)
+    yield client
+    client.close()
+
+
+def test_entries_expire_after_their_ttl(cache):
+    key = cache.key("competitions/BSA/matches", {"season": 2023})
+    assert cache.get(key) is None
+
+    cache.put(key, "competitions/BSA/matches", {"season": 2023}, BODY, ttl=60)
+    assert cache.is_fresh(cache.get(key))
+    cache.put(key, "competitions/BSA/matches", {"season": 2023}, BODY, ttl=-1)
+    stale = cache.get(key)
+    assert stale["body"] == BODY and not cache.is_fresh(stale)
+    cache.put(key, "competitions/BSA/matches", {"season": 2023}, BODY, ttl=None)
+    assert cache.get(key)["expires_at"] is None and cache.is_fresh(cache.get(key))
+
+
+def test_key_ignores_param_order(cache):
+    assert cache.key("p", {"season": 2023, "status": "FINISHED"}) == cache.key(
+        "p", {"status": "FINISHED", "season": 2023}
+    )
+    assert cache.key("p", {"season": 2023}) != cache.key("p", {"season": 2022})
+
+
+def test_finished_past_seasons_are_kept_forever():
+    current = get_current_season()
+    assert matches_cache_ttl(current - 1, "FINISHED") is None
+    assert matches_cache_ttl(current, "FINISHED") == football_data_api.CURRENT_SEASON_CACHE_TTL
+    assert matches_cache_ttl(None, "FINISHED") == football_data_api.CURRENT_SEASON_CACHE_TTL
+    assert matches_cache_ttl(current - 1, "SCHEDULED") == football_data_api.CURRENT_SEASON_CACHE_TTL
+
+
+def test_past_season_is_fetched_once(api_server, cached_client, cache):
+    season = get_current_season() - 2
+    for _ in range(3):
+        assert fetch_competition_matches_raw("BSA", season, client=cached_client) == BODY
+    assert len(api_server.requests) == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_stale_entry_is_revalidated_with_its_etag(api_server, cached_client, cache, monkeypatch):
+    monkeypatch.setattr(football_data_api, "CURRENT_SEASON_CACHE_TTL", 60)
+    season = get_current_season()
+    api_server.responses.append((200, {"ETag": '"v1"', "Last-Modified": "Sat, 01 Jun 2024 00:00:00 GMT"}, BODY))
+    fetch_competition_matches_raw("BSA", season, client=cached_client)
+
+    # Age the entry past its TTL
+    key = cache.key("competitions/BSA/matches", {"season": season, "status": "FINISHED"})
+    entry = cache.get(key)
+    cache.touch(key, entry, ttl=-1)
+
+    api_server.responses.append((304, {"ETag": '"v1"'}, None))
+    assert fetch_competition_matches_raw("BSA", season, client=cached_client) == BODY
+
+    _, headers = api_server.requests[-1]
+    assert headers["If-None-Match"] == '"v1"'
+    assert headers["If-Modified-Since"] == "Sat, 01 Jun 2024 00:00:00 GMT"
+    assert cache.revalidated == 1
+    assert cache.is_fresh(cache.get(key))  # the 304 restarted the TTL
+
+    # Fresh again: served without touching the network
+    fetch_competition_matches_raw("BSA", season, client=cached_client)
+    assert len(api_server.requests) == 2
+
+
+def test_corrupt_entry_is_dropped_and_refetched(api_server, cached_client, cache):
+    season = get_current_season() - 2
+    fetch_competition_matches_raw("BSA", season, client=cached_client)
+
+    key = cache.key("competitions/BSA/matches", {"season": season, "status": "FINISHED"})
+    with open(cache._path(key), "w", encoding="utf-8") as f:
+        f.write('{"body": {"matc')
+    assert cache.get(key) is None
+    assert not os.path.exists(cache._path(key))
+
+    fetch_competition_matches_raw("BSA", season, client=cached_client)
+    assert len(api_server.requests) == 2
+    assert cache.is_fresh(cache.get(key))
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "http_cache"), max_bytes=10**9)
+    body = {"matches": ["x" * 1000]}
+    for season in range(3):
+        cache.put(cache.key("p", {"season": season}), "p", {"season": season}, body, ttl=None)
+    entry_size = os.path.getsize(cache._path(cache.key("p", {"season": 0})))
+
+    # season 0 becomes the most recently used
+    now = time.time()
+    for age, season in ((30, 1), (20, 2)):
+        os.utime(cache._path(cache.key("p", {"season": season})), (now - age, now - age))
+    cache.get(cache.key("p", {"season": 0}))
+
+    cache.max_bytes = 2 * entry_size + entry_size // 2
+    cache.put(cache.key("p", {"season": 3}), "p", {"season": 3}, body, ttl=None)
+
+    kept = {season for season in range(4) if cache.get(cache.key("p", {"season": season})) is not None}
+    assert kept == {0, 3}
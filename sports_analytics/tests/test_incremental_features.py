@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+from src.advanced_model import build_dataset, update_dataset
+from src.features import TeamFormState, append_match_feature_rows, build_match_feature_table
+
+
+def _by_match(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rows keyed by match: sort_values("date") is not stable, so matches that
+    kick off at the same time can come out in a different order (and
+    match_idx) depending on what else is in the table.
+    """
+    return (
+        df.drop(columns="match_idx")
+        .sort_values(["date", "home_team", "away_team"], kind="stable")
+        .reset_index(drop=True)
+    )
+
+
+def _split_by_date(matches: pd.DataFrame, n_old: int):
+    dates = pd.to_datetime(matches["date"])
+    cutoff = dates.sort_values().iloc[n_old]
+    return matches[dates < cutoff], matches[dates >= cutoff]
+
+
+@pytest.mark.parametrize("n_old", [0, 100, 600])
+def test_append_equals_full_rebuild(matches, n_old):
+    old, new = _split_by_date(matches, n_old)
+    feat_df = build_match_feature_table(old, n_games=5, competition_code="BSA")
+    state = TeamFormState.from_matches(old, n_games=5)
+
+    # Two appends: the state carries over between calls
+    first, second = _split_by_date(new, len(new) // 2)
+    feat_df = append_match_feature_rows(feat_df, first, state, competition_code="BSA")
+    feat_df = append_match_feature_rows(feat_df, second, state, competition_code="BSA")
+
+    full = build_match_feature_table(matches, n_games=5, competition_code="BSA")
+    pd.testing.assert_frame_equal(_by_match(feat_df[full.columns]), _by_match(full), check_dtype=False)
+
+
+def test_update_dataset_equals_build_dataset(matches):
+    old, new = _split_by_date(matches, 500)
+    form_df = build_match_feature_table(old, n_games=5, competition_code="BSA")
+    state = TeamFormState.from_matches(old, n_games=5)
+
+    _, _, feat_df, feature_cols, _ = update_dataset(form_df, new, state, competition_code="BSA")
+    _, _, feat_full, feature_cols_full = build_dataset(matches, n_games=5, competition_code="BSA")
+
+    assert feature_cols == feature_cols_full
+    cols = ["date", "home_team", "away_team", "match_idx", "result"] + feature_cols
+    pd.testing.assert_frame_equal(_by_match(feat_df[cols]), _by_match(feat_full[cols]), check_dtype=False)
+
+
+def test_append_skips_known_matches_and_rejects_older_ones(matches):
+    old, new = _split_by_date(matches, 600)
+    feat_df = build_match_feature_table(old, n_games=5, competition_code="BSA")
+    state = TeamFormState.from_matches(old, n_games=5)
+
+    assert append_match_feature_rows(feat_df, old.tail(20), state, competition_code="BSA") is feat_df
+
+    feat_df = append_match_feature_rows(feat_df, new, state, competition_code="BSA")
+    older = old.head(1).assign(home_team="New FC")
+    with pytest.raises(ValueError):
+        append_match_feature_rows(feat_df, older, state, competition_code="BSA")
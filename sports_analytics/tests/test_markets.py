@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from src.markets import ScoreGridCache, markets_from_grid, scoreline_markets
+from src.xg_utils import poisson_outcome_probs_batch
+
+
+@pytest.fixture
+def grid():
+    return ScoreGridCache(max_goals=10).get(1.7, 0.9)
+
+
+def test_every_market_sums_to_one(grid):
+    markets = markets_from_grid(grid, top_scores=grid.size)
+
+    outcome = markets["outcome"]
+    assert outcome["home"] + outcome["draw"] + outcome["away"] == pytest.approx(1.0)
+    assert sum(s["prob"] for s in markets["correct_score"]) == pytest.approx(1.0)
+    assert markets["btts"]["yes"] + markets["btts"]["no"] == pytest.approx(1.0)
+    for line in markets["totals"]:
+        assert line["over"] + line["under"] == pytest.approx(1.0)
+    for line in markets["asian_handicap"]:
+        assert line["home"] + line["push"] + line["away"] == pytest.approx(1.0)
+
+
+def test_outcome_matches_the_grid_method():
+    markets = scoreline_markets(1.7, 0.9, cache=ScoreGridCache(max_goals=8))
+    p_home, p_draw, p_away = poisson_outcome_probs_batch([1.7], [0.9], max_goals=8)
+    assert markets["outcome"]["home"] == pytest.approx(p_home[0])
+    assert markets["outcome"]["draw"] == pytest.approx(p_draw[0])
+    assert markets["outcome"]["away"] == pytest.approx(p_away[0])
+
+
+def test_handicap_and_totals_sides_are_consistent(grid):
+    markets = markets_from_grid(grid)
+    outcome = markets["outcome"]
+    ah = {line["line"]: line for line in markets["asian_handicap"]}
+
+    # Level line: home wins, push on a draw; -0.5 / +0.5 are plain 1X2 sides
+    assert ah[0.0]["home"] == pytest.approx(outcome["home"])
+    assert ah[0.0]["push"] == pytest.approx(outcome["draw"])
+    assert ah[-0.5]["home"] == pytest.approx(outcome["home"])
+    assert ah[0.5]["away"] == pytest.approx(outcome["away"])
+    assert ah[0.5]["home"] == pytest.approx(outcome["home"] + outcome["draw"])
+
+    # Half-goal lines never push; giving more goals only makes the home side harder
+    for line in (-2.5, -1.5, -0.5, 0.5, 1.5, 2.5):
+        assert ah[line]["push"] == 0.0
+    home_sides = [ah[line]["home"] for line in sorted(ah)]
+    assert home_sides == sorted(home_sides)
+
+    overs = [line["over"] for line in markets["totals"]]
+    assert overs == sorted(overs, reverse=True)
+    assert markets["totals"][0]["under"] == pytest.approx(grid[0, 0])
+
+
+def test_correct_score_is_ordered_and_points_at_the_grid(grid):
+    scores = markets_from_grid(grid, top_scores=5)["correct_score"]
+    probs = [s["prob"] for s in scores]
+    assert len(scores) == 5
+    assert probs == sorted(probs, reverse=True)
+    for s in scores:
+        assert s["prob"] == grid[s["home_goals"], s["away_goals"]]
+
+
+def test_cache_quantizes_lambdas_and_evicts_lru():
+    cache = ScoreGridCache(step=0.01, max_entries=2)
+    first = cache.get(1.501, 0.8)
+    assert cache.get(1.499, 0.8) is first  # same 0.01 bucket
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert not first.flags.writeable
+    assert first.sum() == pytest.approx(1.0)
+
+    cache.get(1.6, 0.8)
+    cache.get(1.5, 0.8)  # refreshes (1.5, 0.8)
+    cache.get(1.7, 0.8)  # evicts (1.6, 0.8)
+    assert len(cache) == 2
+    assert cache.key(1.6, 0.8) not in cache._grids
+    assert cache.key(1.5, 0.8) in cache._grids
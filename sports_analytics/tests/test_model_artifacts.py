@@ -0,0 +1,85 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.model_artifacts import FORMAT_VERSION, FlatForest, export_flat_forest, feature_schema_hash
+
+
+@pytest.fixture
+def flat(forest):
+    model, _, feature_cols = forest
+    return FlatForest.from_sklearn(model, feature_cols)
+
+
+def test_predict_proba_matches_sklearn_exactly(forest, flat):
+    model, X, _ = forest
+    np.testing.assert_array_equal(flat.predict_proba(X.to_numpy()), model.predict_proba(X))
+    np.testing.assert_array_equal(flat.predict(X.to_numpy()), model.predict(X))
+    assert list(flat.classes_) == list(model.classes_)
+
+
+@pytest.mark.parametrize("mmap_mode", ["r", None])
+def test_save_load_round_trip(forest, flat, tmp_path, mmap_mode):
+    model, X, feature_cols = forest
+    path = str(tmp_path / "model_flat")
+    flat.save(path)
+    flat.save(path)  # overwriting an existing artifact
+
+    loaded = FlatForest.load(path, mmap_mode=mmap_mode)
+
+    assert loaded.feature_cols == list(feature_cols)
+    assert loaded.schema_hash == feature_schema_hash(feature_cols)
+    np.testing.assert_array_equal(loaded.predict_proba(X.to_numpy()), model.predict_proba(X))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model_flat"]
+
+
+def test_load_rejects_other_format_versions(flat, tmp_path):
+    path = str(tmp_path / "model_flat")
+    flat.save(path)
+    meta_path = os.path.join(path, "meta.json")
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["format_version"] = FORMAT_VERSION + 1
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    with pytest.raises(ValueError):
+        FlatForest.load(path)
+
+
+def test_predict_proba_rows_matches_sklearn_exactly(forest, flat):
+    model, X, _ = forest
+    expected = model.predict_proba(X)
+    vectors = X.to_numpy()
+
+    np.testing.assert_array_equal(flat.predict_proba_rows(vectors), expected)
+    for i in range(0, len(vectors), 97):
+        np.testing.assert_array_equal(flat.predict_proba_rows(vectors[i]), expected[i:i + 1])
+
+
+def test_predict_proba_rows_with_missing_values(forest, flat):
+    model, X, _ = forest
+    rows = X.iloc[:20].copy()
+    rows.iloc[::3, 0] = np.nan
+
+    np.testing.assert_array_equal(flat.predict_proba_rows(rows.to_numpy()), model.predict_proba(rows))
+
+
+def test_chunked_predict_proba_matches_one_call(forest, flat):
+    _, X, _ = forest
+    vectors = X.to_numpy()
+    chunked = np.vstack([flat.predict_proba(vectors[i:i + 64]) for i in range(0, len(vectors), 64)])
+    np.testing.assert_array_equal(chunked, flat.predict_proba_rows(vectors))
+
+
+def test_export_flat_forest_checks_both_paths(forest):
+    model, X, feature_cols = forest
+    model.set_params(n_jobs=2)
+    try:
+        flat = export_flat_forest(model, feature_cols, X.iloc[:200])
+    finally:
+        model.set_params(n_jobs=1)
+    assert flat.n_estimators == model.n_estimators
+    assert flat.max_depth == max(tree.tree_.max_depth for tree in model.estimators_)
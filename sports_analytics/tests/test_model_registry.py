@@ -0,0 +1,126 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.model_artifacts import FlatForest
+from src.model_registry import ModelRegistry, ServingEntry
+
+SEASONS = [2022, 2023, 2024]
+
+
+@pytest.fixture
+def registry(tmp_path, matches, forest):
+    """Registry (2 resident entries) with BSA artifacts for three seasons on disk."""
+    model, _, feature_cols = forest
+    registry = ModelRegistry(str(tmp_path / "models"), max_entries=2)
+    for season in SEASONS:
+        registry.save(ServingEntry("BSA", season, model, feature_cols), matches, n_games=5)
+    return registry
+
+
+def test_lookup_falls_back_to_latest_season(registry):
+    assert registry.seasons_on_disk("bsa") == SEASONS
+    assert registry.get("BSA").key == ("BSA", 2024)
+    assert registry.get("bsa", 2030).key == ("BSA", 2024)
+    assert registry.get("BSA", 2022).key == ("BSA", 2022)
+    assert registry.get("PL") is None
+
+
+def test_loaded_entry_serves_the_saved_model(registry, forest):
+    model, X, feature_cols = forest
+    entry = registry.get("BSA", 2023)
+
+    assert isinstance(entry.model, FlatForest)
+    assert entry.feature_cols == list(feature_cols)
+    assert entry.feature_index is not None and "SE Palmeiras" in entry.teams()
+    np.testing.assert_array_equal(entry.model.predict_proba(X.to_numpy()), model.predict_proba(X))
+
+
+def test_lru_eviction_and_reload_from_disk(registry):
+    e2022 = registry.get("BSA", 2022)
+    registry.get("BSA", 2023)
+    assert registry.resident() == [("BSA", 2022), ("BSA", 2023)]
+
+    registry.get("BSA", 2022)  # most recently used again
+    registry.get("BSA", 2024)
+    assert registry.resident() == [("BSA", 2022), ("BSA", 2024)]
+    assert registry.get("BSA", 2022) is e2022
+
+    registry.get("BSA", 2023)  # evicts 2024
+    reloaded = registry.get("BSA", 2024)
+    assert registry.resident() == [("BSA", 2023), ("BSA", 2024)]
+    assert reloaded.key == ("BSA", 2024)
+
+
+def test_reload_replaces_the_resident_entry(registry):
+    old = registry.get("BSA", 2024)
+    new = registry.reload("BSA", 2024)
+
+    assert new is not old
+    assert registry.get("BSA", 2024) is new
+    assert new.model_version != old.model_version
+
+
+def test_concurrent_gets_load_once(registry, monkeypatch):
+    load_entry = registry._load_entry
+    loads = []
+
+    def slow_load(code, season):
+        loads.append((code, season))
+        time.sleep(0.2)
+        return load_entry(code, season)
+
+    monkeypatch.setattr(registry, "_load_entry", slow_load)
+    warm = registry.get("BSA", 2022)
+
+    results = []
+
+    def get_cold():
+        results.append(registry.get("BSA", 2024))
+
+    threads = [threading.Thread(target=get_cold) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    t0 = time.perf_counter()
+    assert registry.get("BSA", 2022) is warm  # not blocked by the load in progress
+    warm_ms = (time.perf_counter() - t0) * 1000
+    for t in threads:
+        t.join()
+
+    assert loads == [("BSA", 2022), ("BSA", 2024)]
+    assert len({id(e) for e in results}) == 1
+    assert warm_ms < 100
+
+
+def test_failed_load_reaches_every_waiter_and_is_retried(registry, monkeypatch):
+    load_entry = registry._load_entry
+    attempts = []
+
+    def failing_load(code, season):
+        attempts.append(season)
+        if len(attempts) == 1:
+            time.sleep(0.2)
+            raise OSError("disk went away")
+        return load_entry(code, season)
+
+    monkeypatch.setattr(registry, "_load_entry", failing_load)
+    errors = []
+
+    def get():
+        try:
+            registry.get("BSA", 2023)
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=get) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(errors) == 3 and attempts == [2023]
+    assert registry.get("BSA", 2023).key == ("BSA", 2023)
+    assert attempts == [2023, 2023]
@@ -0,0 +1,88 @@
+import itertools
+import json
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def teams(client, matches, make_entry):
+    """BSA entry in the registry; returns its team names."""
+    entry = make_entry(matches)
+    main._registry.put(entry)
+    return entry.teams()
+
+
+def _post(client, pairs, **kwargs):
+    return client.post("/predict_batch", json={"pairs": pairs, "season": 2024}, **kwargs)
+
+
+def test_results_match_predict_row_by_row(client, teams):
+    pairs = [[h, a, "BSA"] for h, a in itertools.permutations(teams[:8], 2)]
+    r = _post(client, pairs)
+    assert r.status_code == 200 and r.headers["content-type"] == "application/json"
+    predictions = r.json()["predictions"]
+    assert [(p["home_team"], p["away_team"]) for p in predictions] == [(h, a) for h, a, _ in pairs]
+
+    for (home, away, code), batch in zip(pairs, predictions):
+        single = client.get(
+            "/predict", params={"home_team": home, "away_team": away, "competition_code": code, "season": 2024}
+        ).json()
+        for outcome in ("home", "draw", "away"):
+            assert batch["probabilities"][outcome] == pytest.approx(single["probabilities"][outcome], abs=1e-12)
+        assert batch["home_top_scorer_goals"] == single["home_top_scorer_goals"]
+        assert batch["away_top_scorer_goals"] == single["away_top_scorer_goals"]
+        assert sum(batch["xg_probabilities"].values()) == pytest.approx(1.0)
+
+
+def test_bad_pairs_get_an_error_without_failing_the_batch(client, teams):
+    pairs = [
+        [teams[0], teams[1], "BSA"],
+        ["Nobody FC", teams[0], "BSA"],
+        {"home_team": teams[1], "away_team": teams[0], "competition_code": "XX"},
+        [teams[2], teams[3], "bsa"],
+    ]
+    predictions = _post(client, pairs).json()["predictions"]
+
+    assert "error" not in predictions[0] and "error" not in predictions[3]
+    assert "Nobody FC" in predictions[1]["error"]
+    assert "XX" in predictions[2]["error"]
+    assert "probabilities" not in predictions[1]
+
+
+def test_malformed_pair_is_rejected(client, teams):
+    assert _post(client, [[teams[0]]]).status_code == 422
+
+
+def test_batches_over_the_cap_are_rejected(client, teams):
+    pairs = [[teams[0], teams[1], "BSA"]] * (main.PREDICT_BATCH_MAX + 1)
+    r = _post(client, pairs)
+    assert r.status_code == 413
+    assert str(main.PREDICT_BATCH_MAX) in r.json()["detail"]
+
+
+def test_large_batches_stream_ndjson_in_chunks(client, teams):
+    pairs = [[h, a, "BSA"] for h, a in itertools.permutations(teams, 2)]
+    n_rows = 2 * main.PREDICT_BATCH_CHUNK + 500
+    pairs = (pairs * (n_rows // len(pairs) + 1))[:n_rows]
+
+    r = _post(client, pairs)
+    assert r.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [(p["home_team"], p["away_team"]) for p in lines] == [(h, a) for h, a, _ in pairs]
+
+    # One chunk of the body per PREDICT_BATCH_CHUNK rows
+    parsed = main.PredictBatchRequest(pairs=pairs)
+    codes = [pair.competition_code.upper() for pair in parsed.pairs]
+    entries = main._resolve_batch_entries(codes, 2024)
+    chunks = list(main._ndjson_chunks(main._iter_batch_results(parsed.pairs, codes, entries)))
+    chunk = main.PREDICT_BATCH_CHUNK
+    assert [c.count(b"\n") for c in chunks] == [chunk, chunk, 500]
+    assert b"".join(chunks).decode("utf-8") == r.text
+
+
+def test_small_batches_stream_on_request(client, teams):
+    r = _post(client, [[teams[0], teams[1], "BSA"]], headers={"Accept": "application/x-ndjson"})
+    assert r.headers["content-type"] == "application/x-ndjson"
+    assert len(r.text.splitlines()) == 1
@@ -0,0 +1,79 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import main
+from src.features import build_match_feature_table
+
+
+@pytest.fixture
+def split(matches):
+    """(old, all): the entry starts with the first 500 matches by date."""
+    dates = pd.to_datetime(matches["date"])
+    return matches[dates < dates.sort_values().iloc[500]], matches
+
+
+@pytest.fixture
+def entry(client, split, make_entry, monkeypatch):
+    old, all_matches = split
+    entry = make_entry(old)
+    main._registry.put(entry)
+    monkeypatch.setattr(main, "fetch_competition_matches_df", lambda **kwargs: all_matches)
+    return entry
+
+
+def _refresh(client):
+    return client.post("/refresh_features", json={"competition_code": "BSA", "season": 2024})
+
+
+def test_refresh_appends_new_matches(client, entry, split):
+    old, all_matches = split
+    version = entry.feature_version
+
+    r = _refresh(client)
+    assert r.status_code == 200
+    assert r.json()["new_matches"] == len(all_matches) - len(old)
+    assert entry.feature_version != version
+    assert len(entry.form_df) == len(build_match_feature_table(all_matches, competition_code="BSA"))
+
+    # Nothing new the second time: same table, same version
+    version = entry.feature_version
+    assert _refresh(client).json()["new_matches"] == 0
+    assert entry.feature_version == version
+
+
+def test_failed_refresh_leaves_the_entry_untouched(client, entry, split, monkeypatch):
+    old, all_matches = split
+    form_df, form_state, feat_df = entry.form_df, entry.form_state, entry.feature_df
+    n_seen = len(form_state.seen)
+
+    def broken(form_df):
+        raise RuntimeError("boom")
+
+    with monkeypatch.context() as m:
+        m.setattr(main, "build_dataset_from_feature_table", broken)
+        assert _refresh(client).status_code == 500
+    assert (entry.form_df, entry.form_state, entry.feature_df) == (form_df, form_state, feat_df)
+    assert len(entry.form_state.seen) == n_seen
+
+    # The matches were not marked as seen: the next refresh still adds them
+    assert _refresh(client).json()["new_matches"] == len(all_matches) - len(old)
+
+
+def test_concurrent_refreshes_add_each_match_once(client, entry, split):
+    old, all_matches = split
+    results = []
+
+    def refresh():
+        results.append(main._refresh_features(main.RefreshRequest(competition_code="BSA", season=2024)))
+
+    threads = [threading.Thread(target=refresh) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(r.new_matches for r in results) == [0, 0, 0, len(all_matches) - len(old)]
+    assert len(entry.form_df) == len(all_matches)
+    assert entry.form_df["match_idx"].is_unique
@@ -0,0 +1,93 @@
+import gzip
+import json
+
+import pytest
+
+import main
+from src.response_cache import JsonResponseCache
+
+BIG = json.dumps({"teams": [f"Team {i}" for i in range(200)]}).encode()
+SMALL = b'{"teams":[]}'
+
+
+@pytest.fixture
+def cache():
+    return JsonResponseCache(max_entries=2, gzip_min_bytes=1024)
+
+
+def test_if_none_match_gets_an_empty_304(cache):
+    cached = cache.put(cache.key("teams", ("BSA", 2024), 1, 1), BIG)
+    assert cached.etag.startswith('W/"')
+
+    resp = cache.response(cached, {"if-none-match": cached.etag})
+    assert resp.status_code == 304 and resp.body == b""
+    assert resp.headers["etag"] == cached.etag
+
+    # Strong form of the same tag, lists and * match too; another tag does not
+    for header in (cached.etag[2:], f'"other", {cached.etag}', "*"):
+        assert cache.response(cached, {"if-none-match": header}).status_code == 304
+    assert cache.response(cached, {"if-none-match": '"other"'}).status_code == 200
+    assert cache.not_modified == 4
+
+
+def test_gzip_only_when_accepted_and_worth_it(cache):
+    big = cache.put(("big",), BIG)
+    small = cache.put(("small",), SMALL)
+
+    plain = cache.response(big, {})
+    assert plain.body == BIG and "content-encoding" not in plain.headers
+
+    zipped = cache.response(big, {"accept-encoding": "br, gzip"})
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(zipped.body) == BIG
+    assert big.gzipped() is big.gzipped()  # compressed once per entry
+
+    assert cache.response(small, {"accept-encoding": "gzip"}).body == SMALL
+    uncompressed = JsonResponseCache(compress=False)
+    assert uncompressed.response(big, {"accept-encoding": "gzip"}).body == BIG
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    cache.put(("a",), SMALL)
+    cache.put(("b",), SMALL)
+    assert cache.get(("a",)) is not None  # "b" is now the oldest
+    cache.put(("c",), SMALL)
+
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) is not None and cache.get(("c",)) is not None
+    assert cache.stats()["entries"] == 2
+
+
+def test_entries_with_a_ttl_expire(cache):
+    cache.put(("fixtures",), SMALL, ttl=-1)
+    assert cache.get(("fixtures",)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_teams_endpoint_revalidates_until_the_team_list_changes(client, matches, make_entry):
+    entry = make_entry(matches)
+    main._registry.put(entry)
+    params = {"competition_code": "BSA", "season": 2024}
+
+    first = client.get("/teams", params=params)
+    assert first.status_code == 200
+    assert "SE Palmeiras" in first.json()["teams"]
+    etag = first.headers["etag"]
+
+    again = client.get("/teams", params=params, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+
+    # Same body under a new feature_version: re-rendered, but the ETag still matches
+    misses = main._response_cache.misses
+    entry.set_feature_df(entry.feature_df, form_df=entry.form_df, form_state=entry.form_state)
+    assert client.get("/teams", params=params, headers={"If-None-Match": etag}).status_code == 304
+    assert main._response_cache.misses == misses + 1
+
+    # A table without one of the teams changes the body, so the old ETag is stale
+    feat_df = entry.feature_df
+    without = feat_df[(feat_df["home_team"] != "SE Palmeiras") & (feat_df["away_team"] != "SE Palmeiras")]
+    entry.set_feature_df(without.reset_index(drop=True), form_df=entry.form_df, form_state=entry.form_state)
+    changed = client.get("/teams", params=params, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert "SE Palmeiras" not in changed.json()["teams"]
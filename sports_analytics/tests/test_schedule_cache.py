@@ -0,0 +1,113 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from src.schedule_cache import ScheduleCache
+
+
+class Upstream:
+    """fetch() stand-in: counts calls and holds them until `release` is set."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = 0
+        self.fail = fail
+        self.release = asyncio.Event()
+
+    async def fetch(self) -> pd.DataFrame:
+        self.calls += 1
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return pd.DataFrame({"home_team": ["SE Palmeiras"], "call": [self.calls]})
+
+
+def test_concurrent_gets_share_one_fetch():
+    async def run():
+        cache = ScheduleCache(ttl_s=60)
+        upstream = Upstream()
+        waiters = [asyncio.ensure_future(cache.get("bsa", 2024, upstream.fetch)) for _ in range(10)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        results = await asyncio.gather(*waiters)
+
+        assert upstream.calls == 1
+        assert all(df is results[0] for df in results)
+        assert (cache.misses, cache.coalesced, cache.hits) == (1, 9, 0)
+
+        # Served from the entry afterwards, and the key is case-insensitive
+        assert await cache.get("BSA", 2024, upstream.fetch) is results[0]
+        assert cache.hits == 1 and upstream.calls == 1
+
+    asyncio.run(run())
+
+
+def test_expired_entry_is_fetched_again():
+    async def run():
+        cache = ScheduleCache(ttl_s=0)
+        upstream = Upstream()
+        upstream.release.set()
+        first = await cache.get("BSA", 2024, upstream.fetch)
+        second = await cache.get("BSA", 2024, upstream.fetch)
+        assert upstream.calls == 2
+        assert second["call"].iloc[0] == 2 and first["call"].iloc[0] == 1
+
+    asyncio.run(run())
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    async def run():
+        cache = ScheduleCache(ttl_s=60)
+        upstream = Upstream(fail=True)
+        waiters = [asyncio.ensure_future(cache.get("BSA", 2024, upstream.fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert upstream.calls == 1
+
+        upstream.fail = False
+        df = await cache.get("BSA", 2024, upstream.fetch)
+        assert upstream.calls == 2 and len(df) == 1
+
+    asyncio.run(run())
+
+
+def test_a_cancelled_waiter_does_not_cancel_the_fetch():
+    async def run():
+        cache = ScheduleCache(ttl_s=60)
+        upstream = Upstream()
+        leaving = asyncio.ensure_future(cache.get("BSA", 2024, upstream.fetch))
+        staying = asyncio.ensure_future(cache.get("BSA", 2024, upstream.fetch))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        upstream.release.set()
+
+        assert len(await staying) == 1
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        assert upstream.calls == 1
+
+    asyncio.run(run())
+
+
+def test_invalidate_one_competition_or_all():
+    async def run():
+        cache = ScheduleCache(ttl_s=60)
+        upstream = Upstream()
+        upstream.release.set()
+        for code, season in (("BSA", 2024), ("BSA", 2023), ("PL", 2024)):
+            await cache.get(code, season, upstream.fetch)
+        assert upstream.calls == 3
+
+        cache.invalidate("bsa")
+        await cache.get("PL", 2024, upstream.fetch)
+        assert upstream.calls == 3
+        await cache.get("BSA", 2024, upstream.fetch)
+        assert upstream.calls == 4
+
+        cache.invalidate()
+        await cache.get("PL", 2024, upstream.fetch)
+        assert upstream.calls == 5
+
+    asyncio.run(run())
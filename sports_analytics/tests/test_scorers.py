@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from src import feature_cache, features
+from src.advanced_model import build_dataset_cached
+from src.features import get_team_top_scorer_goals, merge_scorer_features
+
+
+@pytest.fixture
+def scorers(tmp_path, monkeypatch):
+    """scorers_bsa.csv in a temp data/ dir, seen by both the lookup and the cache key."""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    get_path = lambda name: str(data_dir / name)  # noqa: E731
+    monkeypatch.setattr(features, "get_data_path", get_path)
+    monkeypatch.setattr(feature_cache, "get_data_path", get_path)
+    return data_dir / "scorers_bsa.csv"
+
+
+def _rewrite(path, text: str) -> None:
+    """Write and move the mtime forward (a rewrite within the same tick keeps it)."""
+    mtime_ns = os.stat(path).st_mtime_ns if path.exists() else 0
+    path.write_text(text)
+    os.utime(path, ns=(mtime_ns + 10**9, mtime_ns + 10**9))
+
+
+def test_lookup_is_per_team_max_and_follows_the_file(scorers):
+    assert get_team_top_scorer_goals("BSA") is None
+
+    _rewrite(scorers, "team_name,goals\nSE Palmeiras,10\nSE Palmeiras,7\nEC Bahia,5\n")
+    assert get_team_top_scorer_goals("bsa") == {"SE Palmeiras": 10.0, "EC Bahia": 5.0}
+
+    _rewrite(scorers, "team_name,goals\nEC Bahia,6\n")
+    assert get_team_top_scorer_goals("BSA") == {"EC Bahia": 6.0}
+
+    scorers.unlink()
+    assert get_team_top_scorer_goals("BSA") is None
+
+
+def test_merge_fills_teams_without_scorers_with_zero(matches, scorers):
+    _rewrite(scorers, "team_name,goals\nSE Palmeiras,10\n")
+    merged = merge_scorer_features(matches, "BSA")
+
+    palmeiras = merged["home_team"] == "SE Palmeiras"
+    assert merged.loc[palmeiras, "home_top_scorer_goals"].eq(10.0).all()
+    assert merged.loc[~palmeiras, "home_top_scorer_goals"].eq(0.0).all()
+
+
+def test_cached_dataset_is_rebuilt_when_scorers_change(matches, scorers, isolated_feature_cache):
+    _rewrite(scorers, "team_name,goals\nSE Palmeiras,10\n")
+    _, _, feat_df, _ = build_dataset_cached(matches, competition_code="BSA")
+    assert feat_df.loc[feat_df["home_team"] == "SE Palmeiras", "home_top_scorer_goals"].eq(10).all()
+
+    _rewrite(scorers, "team_name,goals\nSE Palmeiras,12\n")
+    _, _, feat_df, _ = build_dataset_cached(matches, competition_code="BSA")
+    assert feat_df.loc[feat_df["home_team"] == "SE Palmeiras", "home_top_scorer_goals"].eq(12).all()
+    assert isolated_feature_cache.hits == 0
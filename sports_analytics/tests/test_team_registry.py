@@ -0,0 +1,58 @@
+import threading
+
+import numpy as np
+
+from src.advanced_model import build_dataset
+from src.serving_index import FeatureIndex
+from src.team_registry import TeamRegistry, compact_feature_table
+
+
+def test_ids_are_per_competition_and_stable():
+    registry = TeamRegistry()
+    registry.register("bsa", ["A", "B"])
+    registry.register("BSA", ["B", "C", np.nan])
+    registry.register("PL", ["C"])
+
+    assert registry.ids("BSA") == {"A": 0, "B": 1, "C": 2}
+    assert registry.ids("PL") == {"C": 0}
+    assert registry.team_id("BSA", "Z") is None
+    assert registry.teams("BSA") == ["A", "B", "C"]  # lookups never register
+    assert registry.name("BSA", 2) == "C"
+
+
+def test_concurrent_registration_gives_unique_ids():
+    registry = TeamRegistry()
+    names = [f"Team {i}" for i in range(200)]
+
+    threads = [threading.Thread(target=registry.register, args=("BSA", names[i::3] + names)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    ids = registry.ids("BSA")
+    assert sorted(ids) == sorted(names)
+    assert sorted(ids.values()) == list(range(len(names)))
+
+
+def test_compact_table_and_index_lookups(matches):
+    _, _, feat_df, _ = build_dataset(matches, competition_code="BSA")
+    registry = TeamRegistry()
+    compact = compact_feature_table(feat_df, registry, "BSA")
+
+    assert compact["home_team_id"].dtype == np.int16
+    assert compact["home_team"].dtype == "category"
+    assert (compact.select_dtypes(include="floating").dtypes == np.float32).all()
+    names = compact["home_team_id"].map(lambda i: registry.name("BSA", i))
+    assert names.tolist() == feat_df["home_team"].tolist()
+
+    index = FeatureIndex(compact, registry.ids("BSA"))
+    ordered = feat_df.sort_values("date", kind="stable")
+    for team in feat_df["home_team"].unique()[:5]:
+        expected = ordered[ordered["home_team"] == team].iloc[-1]
+        assert index.home_row(team)["match_idx"] == expected["match_idx"]
+    home, away = feat_df[["home_team", "away_team"]].iloc[-1]
+    assert index.pair_row(home, away)["match_idx"] == ordered[
+        (ordered["home_team"] == home) & (ordered["away_team"] == away)
+    ].iloc[-1]["match_idx"]
+    assert index.home_row("Nobody FC") is None
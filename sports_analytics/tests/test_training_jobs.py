@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src import training_jobs
+from src.advanced_model import build_dataset
+from src.model_artifacts import FlatForest
+from src.model_registry import ModelRegistry
+from src.training_jobs import TrainingJob, TrainingJobConflict, TrainingJobError, TrainingJobManager
+
+PARAMS = {"competition_code": "BSA", "season": 2025, "n_past_seasons": 2, "n_games": 5}
+
+
+@pytest.fixture
+def fetched(monkeypatch, matches):
+    """fetch_training_matches without the API; set `gate` to hold jobs in the fetch."""
+    gate = threading.Event()
+    gate.set()
+
+    def fetch(params):
+        gate.wait(10)
+        if params["season"] == 2030:
+            raise TrainingJobError("Nenhuma partida encontrada")
+        return [2024, 2023], matches
+
+    monkeypatch.setattr(training_jobs, "fetch_training_matches", fetch)
+    return gate
+
+
+@pytest.fixture(autouse=True)
+def small_training(monkeypatch):
+    """10-tree forest instead of the full CV + 400-tree fit."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    def train(df, n_games=5, competition_code=None, progress=None, **kwargs):
+        progress("features")
+        X, y, _, feature_cols = build_dataset(df, n_games=n_games, competition_code=competition_code)
+        model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+        return model, 0.5, "report", (X.iloc[-100:], y.iloc[-100:]), feature_cols
+
+    monkeypatch.setattr(training_jobs, "train_match_outcome_model", train)
+
+
+@pytest.fixture
+def published():
+    return []
+
+
+@pytest.fixture
+def manager(tmp_path, published):
+    models_dir = tmp_path / "models"
+    paths = {
+        "models_dir": str(models_dir),
+        "model_path": str(models_dir / "advanced_model_generic.joblib"),
+        "flat_model_path": str(models_dir / "advanced_model_generic_flat"),
+        "feature_cols_path": str(models_dir / "advanced_model_feature_cols_generic.txt"),
+    }
+    manager = TrainingJobManager(
+        published.append, paths, use_processes=False, progress_dir=str(tmp_path / "train_jobs")
+    )
+    yield manager
+    manager.shutdown()
+
+
+def _wait(manager, job, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while manager.get(job.job_id).active:
+        assert time.monotonic() < deadline, f"job {job.job_id} still {job.status}"
+        time.sleep(0.05)
+    return job
+
+
+def test_job_publishes_league_and_generic_artifacts(manager, published, fetched, matches):
+    job = _wait(manager, manager.submit(dict(PARAMS)))
+
+    assert job.status == "succeeded", job.error
+    assert (job.stage, job.progress) == ("done", 1.0)
+    assert published == [job.result]
+    assert job.result["seasons_used"] == [2024, 2023]
+
+    paths, registry = manager.paths, ModelRegistry(manager.paths["models_dir"])
+    assert registry.seasons_on_disk("BSA") == [2025]
+    league = FlatForest.load(registry.flat_model_path("BSA", 2025))
+    generic = FlatForest.load(paths["flat_model_path"])
+    X, _, _, feature_cols = build_dataset(matches, competition_code="BSA")
+    np.testing.assert_array_equal(generic.predict_proba(X.to_numpy()), league.predict_proba(X.to_numpy()))
+
+    with open(paths["feature_cols_path"], encoding="utf-8") as f:
+        assert f.read().splitlines() == feature_cols == job.result["feature_cols"]
+    assert os.path.exists(paths["model_path"])
+    leftovers = [n for n in os.listdir(paths["models_dir"]) if ".tmp" in n or ".old" in n]
+    assert leftovers == []
+    assert os.listdir(manager.progress_dir) == []
+
+
+def test_same_request_is_deduplicated_and_conflicting_one_rejected(manager, fetched):
+    fetched.clear()
+    job = manager.submit(dict(PARAMS))
+    assert manager.submit(dict(PARAMS)) is job
+    with pytest.raises(TrainingJobConflict):
+        manager.submit({**PARAMS, "n_games": 3})
+
+    other_season = manager.submit({**PARAMS, "season": 2024})
+    fetched.set()
+    _wait(manager, job)
+    _wait(manager, other_season)
+    assert job.status == other_season.status == "succeeded"
+
+    # Once the first job is done, new parameters for the league are accepted
+    assert _wait(manager, manager.submit({**PARAMS, "n_games": 3})).status == "succeeded"
+
+
+def test_failed_fetch_marks_the_job_failed(manager, published, fetched):
+    job = _wait(manager, manager.submit({**PARAMS, "season": 2030}))
+
+    assert job.status == "failed"
+    assert job.error.startswith("TrainingJobError")
+    assert published == []
+    assert not os.path.exists(manager.paths["model_path"])
+
+
+def test_failed_publish_marks_the_job_failed(manager, fetched):
+    def publish(result):
+        raise RuntimeError("reload failed")
+
+    manager.publish = publish
+    job = _wait(manager, manager.submit(dict(PARAMS)))
+
+    assert job.status == "failed"
+    assert job.error == "RuntimeError: reload failed"
+
+
+def test_late_progress_file_does_not_rewind_the_stage(manager):
+    os.makedirs(manager.progress_dir, exist_ok=True)
+    job = TrainingJob("late", dict(PARAMS))
+    manager._jobs[job.job_id] = job
+    training_jobs._write_progress(manager._progress_path(job.job_id), "holdout_fit")
+
+    assert manager.get(job.job_id).stage == "holdout_fit"
+    assert job.status == "running"
+
+    job.stage, job.progress = "publishing", training_jobs.STAGE_PROGRESS["publishing"]
+    training_jobs._write_progress(manager._progress_path(job.job_id), "saving")
+    assert manager.get(job.job_id).stage == "publishing"
+
+    job.status, job.stage, job.progress = "succeeded", "done", 1.0
+    assert (manager.get(job.job_id).stage, job.progress) == ("done", 1.0)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from src.xg_utils import poisson_outcome_probs_batch, skellam_outcome_probs_batch
+
+
+LAMBDA_HOME = np.array([0.05, 0.4, 1.1, 1.6, 2.3, 3.8, 6.5])
+LAMBDA_AWAY = np.array([0.07, 1.9, 1.1, 0.7, 3.1, 0.3, 5.0])
+
+
+def test_skellam_matches_a_wide_grid():
+    # With 40 goals per side the grid's truncation error is far below 1e-10
+    grid = poisson_outcome_probs_batch(LAMBDA_HOME, LAMBDA_AWAY, max_goals=40, method="grid")
+    skellam = skellam_outcome_probs_batch(LAMBDA_HOME, LAMBDA_AWAY)
+    for g, s in zip(grid, skellam):
+        np.testing.assert_allclose(s, g, rtol=0, atol=1e-9)
+
+
+def test_method_switch_and_symmetry():
+    home, draw, away = poisson_outcome_probs_batch(LAMBDA_HOME, LAMBDA_AWAY, method="skellam")
+    np.testing.assert_allclose(home + draw + away, 1.0)
+
+    # Swapping the teams swaps home and away
+    s_home, s_draw, s_away = skellam_outcome_probs_batch(LAMBDA_AWAY, LAMBDA_HOME)
+    np.testing.assert_allclose(s_home, away, atol=1e-12)
+    np.testing.assert_allclose(s_draw, draw, atol=1e-12)
+    np.testing.assert_allclose(s_away, home, atol=1e-12)
+
+
+def test_high_lambdas_do_not_overflow():
+    home, draw, away = skellam_outcome_probs_batch([40.0, 120.0], [35.0, 118.0])
+    assert np.isfinite(home).all() and np.isfinite(draw).all() and np.isfinite(away).all()
+    np.testing.assert_allclose(home + draw + away, 1.0)
+    assert (home > away).all()
+
+
+def test_invalid_lambdas_follow_the_grid_method():
+    lam_home = [0.0, -1.0, np.nan, 1.2]
+    lam_away = [1.0, 1.0, 1.0, 1.0]
+    grid = poisson_outcome_probs_batch(lam_home, lam_away, method="grid")
+    skellam = poisson_outcome_probs_batch(lam_home, lam_away, method="skellam")
+
+    for g, s in zip(grid, skellam):
+        assert s[0] == g[0] == 0.0
+        assert s[1] == 0.0
+        assert np.isnan(s[2]) and np.isnan(g[2])
+        assert s[3] == pytest.approx(g[3], abs=1e-3)  # grid default truncates at 8 goals
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        poisson_outcome_probs_batch([1.0], [1.0], method="normal")
@@ -6,6 +6,9 @@ Uso:
 
 Por padrão, testa n_games em [3, 5, 7, 10] para uma liga/temporada específica.
 Ajuste competition_code e season conforme necessário.
+
+A feature table é construída UMA vez com todas as janelas (modo multi-janela
+do build_match_feature_table) e reaproveitada em cada treino.
 """
 
 from typing import Optional, List
@@ -13,6 +16,7 @@ from datetime import datetime
 
 from src.football_data_api import fetch_competition_matches_df
 from src.advanced_model import train_match_outcome_model
+from src.features import build_match_feature_table, select_feature_window
 
 
 def run_sweep(
@@ -30,11 +34,18 @@ def run_sweep(
     print(f"Carregando dados para {competition_code} - season {season}...")
     df = fetch_competition_matches_df(competition_code=competition_code, season=season)
 
+    # Long table + features de forma para todas as janelas de uma vez
+    multi_df = build_match_feature_table(
+        df, windows=n_values, competition_code=competition_code
+    )
+
     for n in n_values:
         print("\n" + "=" * 60)
         print(f"Treinando modelo com n_games={n}")
         print("=" * 60)
-        model, acc, report, _, _ = train_match_outcome_model(df, n_games=n)
+        model, acc, report, _, _ = train_match_outcome_model(
+            df, n_games=n, feat_df=select_feature_window(multi_df, n)
+        )
         print(f"Holdout accuracy (n_games={n}): {acc:.3f}")
         print("\nClassification report:")
         print(report)
@@ -444,6 +444,30 @@ document.addEventListener("DOMContentLoaded", () => {
         return;
       }
 
+      // O treino roda em background: acompanha o job até terminar
+      let job = data;
+      while (job.status === "queued" || job.status === "running") {
+        const pct = Math.round((job.progress || 0) * 100);
+        trainResult.innerHTML =
+          '<span class="text-slate-300">Training model... ' +
+          `${job.stage} (${pct}%)</span>`;
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        const jobRes = await fetch(`${API_BASE}/train_jobs/${job.job_id}`);
+        job = await jobRes.json();
+        if (!jobRes.ok) {
+          trainResult.innerHTML =
+            '<span class="text-red-400">Error: ' + (job.detail || jobRes.status) + "</span>";
+          return;
+        }
+      }
+
+      if (job.status !== "succeeded") {
+        trainResult.innerHTML =
+          '<span class="text-red-400">Error: ' + (job.error || "training failed") + "</span>";
+        return;
+      }
+      data = job.result || {};
+
       const acc = data.holdout_accuracy ?? data.accuracy ?? null;
       const f1 = data.cv_f1_macro ?? data.f1_macro ?? null;
       const seasonsUsed = Array.isArray(data.seasons_used)
@@ -3,7 +3,7 @@ xg_season_xg_demo.py
 
 Script de demonstração para:
 - Carregar uma temporada de uma liga (via API ou CSV).
-- Construir a feature table usando advanced_model.build_dataset.
+- Construir a feature table usando advanced_model.build_dataset (com cache em disco).
 - Calcular λ_home / λ_away (expected goals) com base em home_xg_ability / away_xg_ability.
 - Mostrar estatísticas e exemplos de probabilidades de resultado.
 
@@ -13,12 +13,13 @@ Uso:
 """
 
 import os
+import time
 from typing import Tuple
 
 import pandas as pd
 
-from src.advanced_model import build_dataset
-from src.xg_utils import calibrate_goal_expectancy, match_outcome_probabilities
+from src.advanced_model import build_dataset_cached
+from src.xg_utils import calibrate_goal_expectancy_batch, match_outcome_probabilities_batch
 from src.football_data_api import fetch_competition_matches_df
 
 
@@ -52,8 +53,11 @@ def build_xg_table(
     df = load_season_df(competition_code, season)
 
     # build_dataset já chama build_match_feature_table internamente
-    # e já calcula home_xg_ability / away_xg_ability.
-    _, _, feat_df, _ = build_dataset(df, n_games=n_games)
+    # e já calcula home_xg_ability / away_xg_ability. A versão cached lê a
+    # tabela do disco quando a temporada não mudou desde a última execução.
+    _, _, feat_df, _ = build_dataset_cached(
+        df, n_games=n_games, competition_code=competition_code
+    )
 
     # Garante que as colunas existem (devem existir com o advanced_model atual)
     if "home_xg_ability" not in feat_df.columns or "away_xg_ability" not in feat_df.columns:
@@ -62,40 +66,25 @@ def build_xg_table(
             "Verifique se advanced_model.build_dataset está atualizado."
         )
 
-    lambda_home_list = []
-    lambda_away_list = []
-    p_home_list = []
-    p_draw_list = []
-    p_away_list = []
-
-    for _, row in feat_df.iterrows():
-        home_xg_ability = float(row["home_xg_ability"])
-        away_xg_ability = float(row["away_xg_ability"])
-
-        lam_home, lam_away = calibrate_goal_expectancy(
-            home_xg_ability=home_xg_ability,
-            away_xg_ability=away_xg_ability,
-            base_total_goals=2.6,  # pode ajustar por liga
-        )
-
-        probs = match_outcome_probabilities(
-            lambda_home=lam_home,
-            lambda_away=lam_away,
-            max_goals=8,
-        )
+    # λ e H/D/A da temporada inteira em poucas operações vetorizadas
+    lam_home, lam_away = calibrate_goal_expectancy_batch(
+        feat_df["home_xg_ability"].to_numpy(dtype=float),
+        feat_df["away_xg_ability"].to_numpy(dtype=float),
+        base_total_goals=2.6,  # pode ajustar por liga
+    )
 
-        lambda_home_list.append(lam_home)
-        lambda_away_list.append(lam_away)
-        p_home_list.append(probs["H"])
-        p_draw_list.append(probs["D"])
-        p_away_list.append(probs["A"])
+    probs = match_outcome_probabilities_batch(
+        lambda_home=lam_home,
+        lambda_away=lam_away,
+        max_goals=8,
+    )
 
     feat_df = feat_df.copy()
-    feat_df["lambda_home"] = lambda_home_list
-    feat_df["lambda_away"] = lambda_away_list
-    feat_df["p_home"] = p_home_list
-    feat_df["p_draw"] = p_draw_list
-    feat_df["p_away"] = p_away_list
+    feat_df["lambda_home"] = lam_home
+    feat_df["lambda_away"] = lam_away
+    feat_df["p_home"] = probs["H"]
+    feat_df["p_draw"] = probs["D"]
+    feat_df["p_away"] = probs["A"]
 
     return feat_df
 
@@ -114,7 +103,10 @@ def main():
         )
         return
 
+    t0 = time.perf_counter()
     feat_df = build_xg_table(competition_code, season, n_games=n_games)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    print(f"\nbuild_xg_table: {len(feat_df)} jogos em {elapsed_ms:.1f} ms")
 
     print("\n==============================")
     print(f"Estatísticas de expected goals - {competition_code} {season}")